@@ -0,0 +1,172 @@
+"""
+Alerion AI — Alert Debouncing
+
+A machine in a sustained failure state is scored as failing on every
+reading; publishing each of those floods prediction-data, the websocket
+server and the dashboard with identical alerts. With ALERT_DEBOUNCE=on the
+consumer publishes a reading only when the debouncer returns an event for
+it, per machine_id:
+
+• raised     — the machine enters the alert state: `raise_after`
+               consecutive failing readings (hysteresis against one-off
+               spikes)
+• changed    — still alerting, but with a different failure_type
+• cleared    — the machine leaves the alert state: `clear_after`
+               consecutive healthy readings
+• heartbeat  — nothing published for the machine for `heartbeat_s`
+               (and its first reading), so downstream sees its latest
+               values and state at a bounded rate
+
+raised / changed are deduplicated per failure_type: the same type is not
+alerted again for a machine within `min_repeat_s` of its previous alert,
+so a machine flapping across the thresholds does not re-alert. Types in
+`muted_types` never count as failing. Readings without an event are not
+published to prediction-data; the optional firehose topic still receives
+every prediction.
+
+State is a few fields per machine in an LRU-bounded dict (`max_machines`).
+Machines are partitioned by machine_id, so each one's readings reach one
+consumer; after a rebalance the new owner starts the machine afresh.
+
+USAGE:
+    debouncer = AlertDebouncer(raise_after=2, clear_after=3, min_repeat_s=300, heartbeat_s=60)
+    events = debouncer.observe_many(machine_ids, predictions, failure_types)
+    events[i]                               # "raised" | "changed" | "cleared" | "heartbeat" | None
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+EVENTS = ("raised", "changed", "cleared", "heartbeat")
+# Events that count as alerts (alerts_generated, alerion_alerts_total)
+ALERT_EVENTS = frozenset(("raised", "changed"))
+
+
+class _MachineAlertState:
+    __slots__ = ("alerting", "failure_type", "streak", "last_alerts", "last_emitted")
+
+    def __init__(self):
+        self.alerting = False
+        self.failure_type = "No Failure"
+        self.streak = 0  # consecutive readings disagreeing with `alerting`
+        self.last_alerts = {}  # failure_type → time of its last raised / changed event
+        self.last_emitted = None  # time of the last published reading
+
+
+class AlertDebouncer:
+    """Per-machine alert state machine with hysteresis, dedup and heartbeats."""
+
+    def __init__(
+        self,
+        raise_after: int = 2,
+        clear_after: int = 3,
+        min_repeat_s: float = 300.0,
+        heartbeat_s: float = 60.0,
+        muted_types=(),
+        max_machines: int = 50_000,
+    ):
+        if raise_after < 1 or clear_after < 1:
+            raise ValueError("raise_after and clear_after must be at least 1")
+        if max_machines < 1:
+            raise ValueError("max_machines must be at least 1")
+        self.raise_after = raise_after
+        self.clear_after = clear_after
+        self.min_repeat_s = min_repeat_s
+        self.heartbeat_s = heartbeat_s
+        self.muted_types = frozenset(muted_types)
+        self.max_machines = max_machines
+
+        self._lock = threading.Lock()
+        self._machines = OrderedDict()  # machine_id → _MachineAlertState, least recently seen first
+        self.events = dict.fromkeys(EVENTS, 0)
+        self.readings = 0
+        self.suppressed = 0  # readings not published
+        self.repeats_suppressed = 0  # raised / changed dropped within min_repeat_s
+        self.evictions = 0
+
+    def observe_many(self, machine_ids, predictions, failure_types, now: float | None = None) -> list:
+        """Event (or None) for each reading, in order; updates machine state."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [
+                self._observe(machine_id, prediction, failure_type, now)
+                for machine_id, prediction, failure_type in zip(machine_ids, predictions, failure_types)
+            ]
+
+    def _observe(self, machine_id, prediction: int, failure_type: str, now: float) -> str | None:
+        state = self._machines.get(machine_id)
+        if state is None:
+            state = self._machines[machine_id] = _MachineAlertState()
+            if len(self._machines) > self.max_machines:
+                self._machines.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._machines.move_to_end(machine_id)
+        self.readings += 1
+
+        failing = prediction == 1 and failure_type not in self.muted_types
+        event = None
+        if failing == state.alerting:
+            state.streak = 0
+            if failing and failure_type != state.failure_type:
+                state.failure_type = failure_type
+                event = "changed"
+        else:
+            state.streak += 1
+            if state.streak >= (self.raise_after if failing else self.clear_after):
+                state.alerting = failing
+                state.streak = 0
+                state.failure_type = failure_type if failing else "No Failure"
+                event = "raised" if failing else "cleared"
+
+        if event in ALERT_EVENTS:
+            last = state.last_alerts.get(failure_type)
+            if last is not None and now - last < self.min_repeat_s:
+                self.repeats_suppressed += 1
+                event = None
+            else:
+                state.last_alerts[failure_type] = now
+
+        if event is None and self.heartbeat_s > 0 and (
+            state.last_emitted is None or now - state.last_emitted >= self.heartbeat_s
+        ):
+            event = "heartbeat"
+
+        if event is None:
+            self.suppressed += 1
+        else:
+            state.last_emitted = now
+            self.events[event] += 1
+        return event
+
+    def get(self, machine_id) -> dict | None:
+        with self._lock:
+            state = self._machines.get(machine_id)
+            if state is None:
+                return None
+            return {
+                "alerting": state.alerting,
+                "failure_type": state.failure_type,
+                "pending_readings": state.streak,
+            }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "machines": len(self._machines),
+                "alerting": sum(1 for state in self._machines.values() if state.alerting),
+                "readings": self.readings,
+                "published": self.readings - self.suppressed,
+                "suppressed": self.suppressed,
+                "repeats_suppressed": self.repeats_suppressed,
+                "events": dict(self.events),
+                "evictions": self.evictions,
+                "config": {
+                    "raise_after": self.raise_after,
+                    "clear_after": self.clear_after,
+                    "min_repeat_s": self.min_repeat_s,
+                    "heartbeat_s": self.heartbeat_s,
+                    "muted_types": sorted(self.muted_types),
+                },
+            }
@@ -0,0 +1,211 @@
+"""
+Alerion AI — Dynamic Request Batching
+
+Coalesces concurrent HTTP predictions into batched model calls that run
+on a bounded thread pool, so CPU-bound inference never blocks the event
+loop (/health and /stats stay responsive under load).
+
+A batch is dispatched when it reaches max_batch_size or when its oldest
+request has waited max_wait_ms. While every worker is busy, new requests
+keep queueing and go out together in the next batch. If a batched call
+raises, its inputs are scored again one by one, so the exception reaches
+only the requests that cause it.
+
+Backpressure:
+• more than max_queue requests waiting   → QueueFullError   (HTTP 503)
+• no result within timeout_ms             → BatchTimeoutError (HTTP 504)
+
+USAGE:
+    batcher = DynamicBatcher(predictor.predict_batch, max_batch_size=64)
+    result = await batcher.submit(machine_data_dict)
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when the request queue is at max_queue."""
+
+
+class BatchTimeoutError(Exception):
+    """Raised by submit() when a request waits longer than timeout_ms."""
+
+
+class DynamicBatcher:
+    """
+    asyncio front-end that batches submit() calls into predict_batch calls.
+
+    predict_batch receives a list of inputs and must return one result per
+    input, in order. It runs on a ThreadPoolExecutor with `workers` threads.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[list], list],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5,
+        max_queue: int = 1024,
+        timeout_ms: float = 5000,
+        workers: int = 1,
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.timeout = timeout_ms / 1000
+        self.workers = workers
+
+        self._queue = None
+        self._slots = None
+        self._executor = None
+        self._task = None
+
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._batches = 0
+        self._batched_requests = 0
+        self._recent_sizes = deque(maxlen=1000)
+
+    # ─── Lifecycle ───────────────────────────────────────────
+
+    def start(self):
+        """Start the dispatch task on the running event loop (idempotent)."""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="predict")
+        self._task = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Stop dispatching and fail any requests still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(QueueFullError("Service shutting down"))
+        self._executor.shutdown(wait=True)
+        self._task = None
+
+    # ─── Requests ────────────────────────────────────────────
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one input and wait for its result."""
+        self.start()
+        if self._queue.qsize() >= self.max_queue:
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(f"Prediction queue full ({self.max_queue} waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        with self._lock:
+            self._submitted += 1
+
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timed_out += 1
+            raise BatchTimeoutError(f"Prediction not completed within {self.timeout * 1000:.0f}ms")
+
+    async def _dispatch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for a free worker first: while all are busy, requests
+            # accumulate in the queue and leave together in the next batch
+            await self._slots.acquire()
+            batch = await self._collect_batch(loop)
+            if batch:
+                loop.create_task(self._run_batch(loop, batch))
+            else:
+                self._slots.release()
+
+    async def _collect_batch(self, loop) -> list:
+        batch = []
+        item = await self._queue.get()
+        deadline = loop.time() + self.max_wait
+        while True:
+            # Requests that timed out while queued are dropped unscored
+            if not item[1].done():
+                batch.append(item)
+            if len(batch) >= self.max_batch_size:
+                return batch
+            if self._queue.empty():
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return batch
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    return batch
+            else:
+                item = self._queue.get_nowait()
+
+    async def _run_batch(self, loop, batch: list):
+        try:
+            inputs = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_batch, inputs)
+            except Exception as e:
+                if len(inputs) == 1:
+                    results = [e]
+                else:
+                    # One bad input must not fail the requests batched with it
+                    results = await loop.run_in_executor(self._executor, self._predict_each, inputs)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            with self._lock:
+                self._batches += 1
+                self._batched_requests += len(batch)
+                self._recent_sizes.append(len(batch))
+        finally:
+            self._slots.release()
+
+    def _predict_each(self, inputs: list) -> list:
+        """predict_batch() per input: its result, or the exception it raised."""
+        results = []
+        for item in inputs:
+            try:
+                results.append(self.predict_batch([item])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    # ─── Stats ───────────────────────────────────────────────
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent_sizes)
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "max_queue": self.max_queue,
+                "timeout_ms": self.timeout * 1000,
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "batches": self._batches,
+                "mean_batch_size": round(self._batched_requests / max(self._batches, 1), 2),
+                "recent_p95_batch_size": recent[int(0.95 * (len(recent) - 1))] if recent else 0,
+            }
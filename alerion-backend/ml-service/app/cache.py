@@ -0,0 +1,125 @@
+"""
+Alerion AI — Prediction Cache
+
+Bounded, thread-safe LRU cache with optional TTL for model outputs.
+ModelPredictor keys it on the feature vector quantized to sensor
+precision, so repeated (or practically identical) readings skip model
+inference entirely.
+
+Entries are tagged with the model generation that produced them. Lookups
+only match entries of the caller's generation, put() drops values from
+any generation but the current one, and invalidate() clears the cache
+and moves it to the next generation — so a batch still being scored by
+the previous model when it was reloaded can neither read nor repopulate
+the cache with outputs of the wrong model.
+
+USAGE:
+    cache = PredictionCache(max_size=100_000, ttl_s=60)
+    values = cache.get_many(keys, generation)  # None for misses
+    cache.put_many(missed_keys, outputs, generation)
+    cache.invalidate(generation + 1)           # after swapping in a new model
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+
+class PredictionCache:
+    """OrderedDict LRU with per-entry expiry and hit/miss/eviction counters."""
+
+    def __init__(self, max_size: int, ttl_s: float | None = None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl_s = ttl_s if ttl_s and ttl_s > 0 else None
+        self.generation = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key → (expires_at, generation, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, generation: int) -> Any | None:
+        return self.get_many((key,), generation)[0]
+
+    def get_many(self, keys: Iterable[Hashable], generation: int) -> list[Any | None]:
+        """Look up several keys under one lock; None marks a miss."""
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            entries = self._entries
+            for key in keys:
+                entry = entries.get(key)
+                if entry is None or entry[1] != generation:
+                    self.misses += 1
+                    results.append(None)
+                elif entry[0] is not None and entry[0] <= now:
+                    del entries[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[2])
+        return results
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        self.put_many((key,), (value,), generation)
+
+    def put_many(self, keys: Iterable[Hashable], values: Iterable[Any], generation: int):
+        """Insert values computed under `generation`; stale generations are dropped."""
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s else None
+        with self._lock:
+            if generation != self.generation:
+                return
+            entries = self._entries
+            for key, value in zip(keys, values):
+                entries[key] = (expires_at, generation, value)
+                entries.move_to_end(key)
+            overflow = len(entries) - self.max_size
+            for _ in range(max(overflow, 0)):
+                entries.popitem(last=False)
+            self.evictions += max(overflow, 0)
+
+    def invalidate(self, generation: int | None = None):
+        """Drop every entry and move to `generation` (default: the next one)."""
+        with self._lock:
+            self._entries.clear()
+            self.generation = self.generation + 1 if generation is None else generation
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def event_counts(self) -> dict[tuple, int]:
+        """Counters keyed by (event,) label tuples, for metrics collection."""
+        with self._lock:
+            return {
+                ("hit",): self.hits,
+                ("miss",): self.misses,
+                ("eviction",): self.evictions,
+                ("expiration",): self.expirations,
+                ("invalidation",): self.invalidations,
+            }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "generation": self.generation,
+            }
@@ -0,0 +1,146 @@
+"""
+Alerion AI — Cascade Gate
+
+Cheap vectorized pre-filter in front of the forest. A reading whose
+derived signals all fall inside a "clearly healthy" box is answered as
+No Failure without running the model; only readings outside the box
+(the ambiguous ones) are scored by the forest.
+
+The box is derived from labelled training data by peeling (PRIM-style):
+starting from the full data range, repeatedly trim `peel` of the
+remaining rows off whichever side of whichever signal lowers the
+in-box failure rate most, until it is at most `target_failure_rate` or
+the box would cover less than `min_coverage` of the data. The signals
+are the ones the heuristic rules look at, so the learned limits read
+like those rules (e.g. "torque × wear ≤ 10,500").
+
+The gate is stored as JSON next to the model; ml/tune_cascade.py derives
+it and reports the skip rate and disagreement with full-model scoring on
+a holdout so the accuracy cost is known before it is enabled.
+
+USAGE:
+    gate = CascadeGate.load("./model/cascade.json")
+    healthy = gate.passes(gate_signals(air, process, rpm, torque, wear))
+"""
+
+import json
+import math
+
+import numpy as np
+
+# Derived signals the gate thresholds, in column order
+GATE_SIGNALS = (
+    "temp_diff",
+    "rotational_speed",
+    "torque",
+    "tool_wear",
+    "power_W",
+    "torque_x_wear",
+)
+
+
+def gate_signals(air_temp, process_temp, rotational_speed, torque, tool_wear) -> np.ndarray:
+    """(n, len(GATE_SIGNALS)) matrix of the gate's signals from raw sensor columns."""
+    rotational_speed = np.asarray(rotational_speed, dtype=np.float64)
+    torque = np.asarray(torque, dtype=np.float64)
+    tool_wear = np.asarray(tool_wear, dtype=np.float64)
+    return np.column_stack((
+        np.asarray(process_temp, dtype=np.float64) - np.asarray(air_temp, dtype=np.float64),
+        rotational_speed,
+        torque,
+        tool_wear,
+        torque * rotational_speed * 2 * math.pi / 60,
+        torque * tool_wear,
+    ))
+
+
+class CascadeGate:
+    """Axis-aligned healthy box: lo[j] <= signal[j] <= hi[j] for every signal."""
+
+    def __init__(self, lo, hi, confidence: float, info: dict | None = None):
+        self.lo = np.asarray(lo, dtype=np.float64)
+        self.hi = np.asarray(hi, dtype=np.float64)
+        if self.lo.shape != (len(GATE_SIGNALS),) or self.hi.shape != self.lo.shape:
+            raise ValueError(f"Gate limits must have {len(GATE_SIGNALS)} entries")
+        # Reported for gated readings: 1 − the box's training failure rate
+        self.confidence = float(confidence)
+        self.info = info or {}
+
+    def passes(self, signals: np.ndarray) -> np.ndarray:
+        """Boolean mask of rows that are clearly healthy (NaN never passes)."""
+        return ((signals >= self.lo) & (signals <= self.hi)).all(axis=1)
+
+    @classmethod
+    def derive(
+        cls,
+        signals: np.ndarray,
+        is_failure: np.ndarray,
+        target_failure_rate: float = 0.002,
+        min_coverage: float = 0.3,
+        peel: float = 0.02,
+    ) -> "CascadeGate":
+        """Peel a healthy box from training data (see module docstring)."""
+        signals = np.asarray(signals, dtype=np.float64)
+        is_failure = np.asarray(is_failure, dtype=bool)
+        n = len(signals)
+        lo, hi = signals.min(axis=0), signals.max(axis=0)
+        inside = np.ones(n, dtype=bool)
+
+        while is_failure[inside].mean() > target_failure_rate:
+            best = None
+            for j in range(signals.shape[1]):
+                column = signals[inside, j]
+                for side, q in (("lo", peel), ("hi", 1 - peel)):
+                    cut = np.quantile(column, q)
+                    keep = inside & (signals[:, j] >= cut if side == "lo" else signals[:, j] <= cut)
+                    kept = keep.sum()
+                    if kept == inside.sum() or kept < min_coverage * n:
+                        continue
+                    rate = is_failure[keep].mean()
+                    if best is None or rate < best[0]:
+                        best = (rate, j, side, cut, keep)
+            if best is None:
+                break
+            _, j, side, cut, inside = best
+            if side == "lo":
+                lo[j] = cut
+            else:
+                hi[j] = cut
+
+        failure_rate = float(is_failure[inside].mean())
+        return cls(lo, hi, 1.0 - failure_rate, {
+            "train_rows": int(n),
+            "train_coverage": round(float(inside.mean()), 4),
+            "train_failure_rate": round(failure_rate, 5),
+            "target_failure_rate": target_failure_rate,
+        })
+
+    def describe(self) -> dict:
+        return {
+            "limits": {
+                name: [float(lo), float(hi)]
+                for name, lo, hi in zip(GATE_SIGNALS, self.lo, self.hi)
+            },
+            "confidence": round(self.confidence, 5),
+            **self.info,
+        }
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.describe(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "CascadeGate":
+        with open(path) as f:
+            spec = json.load(f)
+        limits = spec["limits"]
+        missing = [name for name in GATE_SIGNALS if name not in limits]
+        if missing:
+            raise ValueError(f"{path}: missing gate limits for {missing}")
+        info = {k: v for k, v in spec.items() if k not in ("limits", "confidence")}
+        return cls(
+            [limits[name][0] for name in GATE_SIGNALS],
+            [limits[name][1] for name in GATE_SIGNALS],
+            spec["confidence"],
+            info,
+        )
@@ -0,0 +1,142 @@
+"""
+Alerion AI — Message Codecs
+
+Pluggable (de)serialization for Kafka message values. Codecs take and
+return bytes; the fast paths (orjson, msgpack) parse the message bytes
+directly and encode straight to bytes with no intermediate str.
+
+Codecs:
+• json    — orjson when installed (fast path), stdlib json otherwise.
+            Same wire format either way.
+• msgpack — compact binary encoding of the same objects; needs msgpack.
+
+The input codec is picked per message when MESSAGE_CODEC=auto, from the
+message's content-type header (JSON when the header is absent), so JSON
+and msgpack producers can share a topic.
+
+USAGE:
+    codec = get_codec("json")
+    data = codec.decode(msg.value())
+    payload = codec.encode(result)
+"""
+
+import json
+from typing import Any
+
+# Optional imports — gracefully handle missing packages
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+CONTENT_TYPE_HEADER = "content-type"
+
+
+class DecodeError(ValueError):
+    """Raised by Codec.decode for a payload that cannot be parsed."""
+
+
+class Codec:
+    name = "codec"
+    content_type = "application/octet-stream"
+
+    def decode(self, payload: bytes) -> Any:
+        raise NotImplementedError
+
+    def encode(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+
+class StdlibJsonCodec(Codec):
+    name = "json"
+    content_type = "application/json"
+
+    # Explicit UTF-8 decode beats json.loads(bytes), which sniffs the
+    # encoding first; default dumps() reuses json's cached C encoder
+    def decode(self, payload: bytes) -> Any:
+        try:
+            return json.loads(payload.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise DecodeError(str(e)) from e
+
+    def encode(self, obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
+class OrjsonCodec(Codec):
+    name = "json"
+    content_type = "application/json"
+
+    def decode(self, payload: bytes) -> Any:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError as e:
+            raise DecodeError(str(e)) from e
+
+    def encode(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    def decode(self, payload: bytes) -> Any:
+        try:
+            return msgpack.unpackb(payload, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise DecodeError(str(e)) from e
+
+    def encode(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+
+CODEC_NAMES = ("json", "msgpack")
+
+
+def get_codec(name: str) -> Codec:
+    """
+    Codec instance for a wire format name.
+
+    Raises:
+        ValueError: for an unknown name, or msgpack without the package.
+    """
+    if name == "json":
+        return OrjsonCodec() if ORJSON_AVAILABLE else StdlibJsonCodec()
+    if name == "msgpack":
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("msgpack codec requested but msgpack is not installed")
+        return MsgpackCodec()
+    raise ValueError(f"Unknown codec {name!r}, expected one of {CODEC_NAMES}")
+
+
+class HeaderCodecSelector:
+    """
+    Picks the decoder for each message from its content-type header.
+    Messages without the header (or with an unknown one) use the default.
+    """
+
+    def __init__(self, default: Codec):
+        self.default = default
+        self._by_content_type = {default.content_type: default}
+        for name in CODEC_NAMES:
+            try:
+                codec = get_codec(name)
+            except ValueError:
+                continue
+            self._by_content_type.setdefault(codec.content_type, codec)
+
+    def for_headers(self, headers: list | None) -> Codec:
+        if headers:
+            for key, value in headers:
+                if key.lower() == CONTENT_TYPE_HEADER and value is not None:
+                    content_type = value.decode("latin-1") if isinstance(value, bytes) else value
+                    return self._by_content_type.get(content_type.split(";")[0].strip(), self.default)
+        return self.default
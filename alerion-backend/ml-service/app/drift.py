@@ -0,0 +1,274 @@
+"""
+Alerion AI — Telemetry Drift Monitor
+
+Tells when live telemetry stops resembling the training data. For each
+monitored signal the reference (drift_reference.json, written by
+ml/train.py or ml/build_drift_reference.py) holds bin edges at the
+training data's quantiles and the training share of each bin. Live
+readings are counted into the same fixed bins over a sliding window:
+
+    window = `slices` sub-histograms of `window // slices` readings each;
+    the oldest slice is dropped when a new one starts, so the window
+    holds the last window - slice .. window readings
+
+Memory is constant (slices × signals × bins counters) and a batch costs
+one searchsorted per signal plus one bincount, i.e. O(1) per reading.
+Scores are computed on demand (/drift, /metrics) from the window totals:
+
+• psi  — population stability index Σ (live − ref) · ln(live / ref)
+         over the bins; < 0.1 stable, 0.1–0.25 shifting, > 0.25 drifted
+• ks   — Kolmogorov–Smirnov distance between the binned CDFs (max gap)
+
+USAGE:
+    reference = DriftReference.from_raw(training_raw_matrix)     # (n, 6) raw rows
+    reference.save("./model/drift_reference.json")
+    monitor = DriftMonitor(DriftReference.load("./model/drift_reference.json"), window=10_000)
+    monitor.observe(raw_matrix)             # rows from ModelPredictor._extract_features
+    monitor.scores()["signals"]["torque"]["psi"]
+"""
+
+import json
+import math
+import threading
+from operator import itemgetter
+
+import numpy as np
+
+from features import (
+    COL_AIR_TEMP, COL_MACHINE_TYPE, COL_PROCESS_TEMP, COL_ROTATIONAL_SPEED,
+    COL_TOOL_WEAR, COL_TORQUE, ENGINEERED_FEATURES,
+)
+
+# Monitored signals, computed from raw feature columns (rows of c)
+SIGNALS = {
+    "air_temperature": itemgetter(COL_AIR_TEMP),
+    "process_temperature": itemgetter(COL_PROCESS_TEMP),
+    "rotational_speed": itemgetter(COL_ROTATIONAL_SPEED),
+    "torque": itemgetter(COL_TORQUE),
+    "tool_wear": itemgetter(COL_TOOL_WEAR),
+    "machine_type": itemgetter(COL_MACHINE_TYPE),
+    "temp_diff": ENGINEERED_FEATURES["temp_diff"],
+    "power_W": ENGINEERED_FEATURES["power_W"],
+}
+
+# Reference file name, looked up next to the model by ModelPredictor
+REFERENCE_FILE = "drift_reference.json"
+DEFAULT_BINS = 10
+# Floor for bin shares in PSI, so an empty bin does not make it infinite
+PSI_EPSILON = 1e-4
+PSI_SHIFTING = 0.1
+PSI_DRIFTED = 0.25
+
+
+def reference_edges(values: np.ndarray, bins: int) -> np.ndarray:
+    """
+    Inner bin edges: quantiles of `values` (equal-mass bins), or the
+    midpoints between distinct values for discrete signals (machine type).
+    """
+    distinct = np.unique(values)
+    if len(distinct) <= bins:
+        return (distinct[:-1] + distinct[1:]) / 2
+    return np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+
+
+class DriftReference:
+    """Per-signal inner bin edges and training bin shares."""
+
+    def __init__(self, edges: dict, proportions: dict, info: dict | None = None):
+        unknown = set(edges) - set(SIGNALS)
+        if unknown:
+            raise ValueError(f"Unknown drift signals: {sorted(unknown)}")
+        self.signals = [name for name in SIGNALS if name in edges]
+        self.edges = {name: np.asarray(edges[name], dtype=np.float64) for name in self.signals}
+        self.proportions = {
+            name: np.asarray(proportions[name], dtype=np.float64) for name in self.signals
+        }
+        for name in self.signals:
+            if len(self.proportions[name]) != len(self.edges[name]) + 1:
+                raise ValueError(f"{name}: expected {len(self.edges[name]) + 1} bin shares")
+        self.info = info or {}
+
+    @classmethod
+    def from_raw(cls, raw: np.ndarray, bins: int = DEFAULT_BINS, info: dict | None = None):
+        """Reference from an (n, 6) raw training matrix."""
+        columns = raw.T
+        edges, proportions = {}, {}
+        for name, signal in SIGNALS.items():
+            values = np.asarray(signal(columns), dtype=np.float64)
+            values = values[np.isfinite(values)]
+            edges[name] = reference_edges(values, bins)
+            counts = np.bincount(
+                np.searchsorted(edges[name], values, side="right"), minlength=len(edges[name]) + 1)
+            proportions[name] = counts / max(len(values), 1)
+        return cls(edges, proportions, {"rows": int(len(raw)), "bins": bins, **(info or {})})
+
+    @classmethod
+    def load(cls, path: str) -> "DriftReference":
+        with open(path) as f:
+            data = json.load(f)
+        signals = data["signals"]
+        return cls(
+            {name: s["edges"] for name, s in signals.items()},
+            {name: s["proportions"] for name, s in signals.items()},
+            data.get("info"),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "signals": {
+                name: {
+                    "edges": self.edges[name].tolist(),
+                    "proportions": np.round(self.proportions[name], 6).tolist(),
+                }
+                for name in self.signals
+            },
+            "info": self.info,
+        }
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def drift_scores(reference: DriftReference, counts: np.ndarray) -> dict:
+    """psi / ks per signal for window counts of shape (signals, max bins)."""
+    scores = {}
+    for k, name in enumerate(reference.signals):
+        expected = reference.proportions[name]
+        observed = counts[k, :len(expected)]
+        total = observed.sum()
+        if not total:
+            scores[name] = {"psi": None, "ks": None, "readings": 0}
+            continue
+        live = observed / total
+        ks = float(np.abs(np.cumsum(live) - np.cumsum(expected)).max())
+        live_s = np.maximum(live, PSI_EPSILON)
+        ref_s = np.maximum(expected, PSI_EPSILON)
+        psi = float(np.sum((live_s - ref_s) * np.log(live_s / ref_s)))
+        scores[name] = {"psi": round(psi, 5), "ks": round(ks, 5), "readings": int(total)}
+    return scores
+
+
+def drift_status(psi: float | None) -> str:
+    if psi is None or math.isnan(psi):
+        return "insufficient_data"
+    if psi > PSI_DRIFTED:
+        return "drifted"
+    if psi > PSI_SHIFTING:
+        return "shifting"
+    return "stable"
+
+
+class DriftMonitor:
+    """Sliding-window bin counts of live readings against a DriftReference."""
+
+    def __init__(
+        self, reference: DriftReference, window: int = 10_000, slices: int = 10,
+        min_readings: int = 500,
+    ):
+        if slices < 1 or window < slices:
+            raise ValueError("window must be at least slices (>= 1)")
+        self.reference = reference
+        self.window = window
+        self.slices = slices
+        self.slice_size = window // slices
+        self.min_readings = min_readings
+
+        self._edges = [reference.edges[name] for name in reference.signals]
+        self._signals = [SIGNALS[name] for name in reference.signals]
+        self._n_bins = max(len(edges) + 1 for edges in self._edges)
+        n_signals = len(self._signals)
+        # Flat bin index of (signal k, bin b) is k * _n_bins + b; non-finite → the extra last one
+        self._offsets = (np.arange(n_signals) * self._n_bins)[:, None]
+        self._dropped = n_signals * self._n_bins
+
+        self._lock = threading.Lock()
+        self._slice_counts = np.zeros((slices, n_signals, self._n_bins), dtype=np.int64)
+        self._counts = np.zeros((n_signals, self._n_bins), dtype=np.int64)
+        self._current = 0
+        self._fill = 0  # readings in the current slice
+        self._slice_rows = np.zeros(slices, dtype=np.int64)
+        self.readings = 0
+
+    def observe(self, raw: np.ndarray):
+        """Count an (n, 6) raw feature matrix into the window."""
+        n = len(raw)
+        if not n:
+            return
+        columns = raw.T
+        index = np.empty((len(self._signals), n), dtype=np.int64)
+        finite = np.ones((len(self._signals), n), dtype=bool)
+        for k, (signal, edges) in enumerate(zip(self._signals, self._edges)):
+            values = np.asarray(signal(columns), dtype=np.float64)
+            index[k] = np.searchsorted(edges, values, side="right")
+            finite[k] = np.isfinite(values)
+        flat = np.where(finite, index + self._offsets, self._dropped)
+
+        with self._lock:
+            start = 0
+            while start < n:
+                take = min(n - start, self.slice_size - self._fill)
+                counts = np.bincount(
+                    flat[:, start:start + take].ravel(), minlength=self._dropped + 1,
+                )[:self._dropped].reshape(self._counts.shape)
+                self._slice_counts[self._current] += counts
+                self._counts += counts
+                self._fill += take
+                self._slice_rows[self._current] += take
+                start += take
+                if self._fill == self.slice_size:
+                    self._rotate()
+            self.readings += n
+
+    def _rotate(self):
+        self._current = (self._current + 1) % self.slices
+        self._counts -= self._slice_counts[self._current]
+        self._slice_counts[self._current] = 0
+        self._slice_rows[self._current] = 0
+        self._fill = 0
+
+    def counts(self) -> list:
+        """Window counts (signals × bins) as nested lists, e.g. for worker reports."""
+        with self._lock:
+            return self._counts.tolist()
+
+    def scores(self, other_counts=()) -> dict:
+        """
+        Per-signal psi / ks / status for the window, combined with the
+        counts() of other monitors (e.g. those of consumer workers).
+        """
+        with self._lock:
+            counts = self._counts.copy()
+            window_readings = int(self._slice_rows.sum())
+        for other in other_counts:
+            other = np.asarray(other, dtype=np.int64)
+            counts += other
+            window_readings += int(other[0].sum())
+        signals = drift_scores(self.reference, counts)
+        for score in signals.values():
+            if score["readings"] < self.min_readings:
+                score["status"] = "insufficient_data"
+            else:
+                score["status"] = drift_status(score["psi"])
+        statuses = [score["status"] for score in signals.values()]
+        overall = next(
+            (s for s in ("drifted", "shifting", "stable") if s in statuses), "insufficient_data")
+        return {
+            "status": overall,
+            "window": self.window,
+            "window_readings": window_readings,
+            "min_readings": self.min_readings,
+            "signals": signals,
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            window_readings = int(self._slice_rows.sum())
+        return {
+            "signals": len(self._signals),
+            "window": self.window,
+            "slices": self.slices,
+            "window_readings": window_readings,
+            "readings": self.readings,
+            "reference_rows": self.reference.info.get("rows"),
+        }
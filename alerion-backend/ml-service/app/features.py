@@ -0,0 +1,220 @@
+"""
+Alerion AI — Feature Pipeline
+
+One feature pipeline for the Flask API (ml/app.py) and the Kafka
+predictor, so a model trained by ml/ can be served by either. The
+pipeline is compiled from the `feature_cols` list in the artifact
+directory's metadata.json:
+
+    raw row   air, process, rpm, torque, wear, type   (ModelPredictor._extract_features order)
+       │      one step per feature column — a raw column or an engineered
+       ▼      feature (temp_diff, power_W, torque_x_wear, rpm_per_torque)
+    features  preallocated (n, k) float64 matrix in feature_cols order
+       │      StandardScaler as one in-place affine step (mean, scale)
+       ▼
+    model input
+
+The scaler's mean_/scale_ are taken once at load time, so scoring needs
+neither a DataFrame nor scaler.transform(). The affine step subtracts
+and divides exactly as StandardScaler does rather than multiplying by a
+precomputed reciprocal: the results stay bit-identical to
+scaler.transform(), and a last-bit difference can move a reading across
+a tree threshold.
+
+Without metadata.json (the ML service's original 6-feature model) the
+pipeline is LEGACY_FEATURE_COLS with no scaler and passes the raw matrix
+straight through.
+
+USAGE:
+    pipeline, metadata = load_pipeline("./model")          # metadata.json + scaler.pkl if present
+    pipeline = FeaturePipeline.from_metadata(metadata, scaler)
+    x = pipeline.transform_one({"air_temperature": 301.2, ..., "machine_type": "L"})
+    x = pipeline.transform({"air_temperature": array, ..., "type_encoded": array})
+    x = pipeline.transform_raw(raw_matrix)                  # (n, 6) rows from _extract_features
+"""
+
+import json
+import math
+import os
+from operator import itemgetter
+
+import joblib
+import numpy as np
+
+# Reading fields in raw column order; the encoded machine type is the last column
+RAW_FIELDS = (
+    "air_temperature",
+    "process_temperature",
+    "rotational_speed",
+    "torque",
+    "tool_wear",
+)
+TYPE_MAP = {"L": 0, "M": 1, "H": 2}
+# Values the service assumes for sensor fields a reading leaves out
+READING_DEFAULTS = {
+    "air_temperature": 300,
+    "process_temperature": 310,
+    "rotational_speed": 1500,
+    "torque": 40,
+    "tool_wear": 100,
+}
+
+# Raw column positions
+COL_AIR_TEMP = 0
+COL_PROCESS_TEMP = 1
+COL_ROTATIONAL_SPEED = 2
+COL_TORQUE = 3
+COL_TOOL_WEAR = 4
+COL_MACHINE_TYPE = 5
+
+# Training column names (predictive_maintenance.csv) of the raw columns
+RAW_COLUMNS = {
+    "Air temperature [K]": COL_AIR_TEMP,
+    "Process temperature [K]": COL_PROCESS_TEMP,
+    "Rotational speed [rpm]": COL_ROTATIONAL_SPEED,
+    "Torque [Nm]": COL_TORQUE,
+    "Tool wear [min]": COL_TOOL_WEAR,
+    "type_encoded": COL_MACHINE_TYPE,
+}
+
+# Engineered features over raw columns. Each works on a row of floats and
+# on a sequence of column arrays alike, with the operations in the order
+# the training notebook applies them.
+ENGINEERED_FEATURES = {
+    "temp_diff": lambda c: c[COL_PROCESS_TEMP] - c[COL_AIR_TEMP],
+    "power_W": lambda c: c[COL_TORQUE] * (c[COL_ROTATIONAL_SPEED] * 2 * math.pi / 60),
+    "torque_x_wear": lambda c: c[COL_TORQUE] * c[COL_TOOL_WEAR],
+    "rpm_per_torque": lambda c: c[COL_ROTATIONAL_SPEED] / (c[COL_TORQUE] + 1e-6),
+}
+
+# Feature layout of models trained without metadata.json
+LEGACY_FEATURE_COLS = tuple(RAW_COLUMNS)
+
+METADATA_FILE = "metadata.json"
+SCALER_FILE = "scaler.pkl"
+
+
+def parse_reading(data: dict, defaults: dict | None = None) -> list[float]:
+    """
+    One validated reading as a raw row. Missing sensor fields raise
+    KeyError, or are taken from `defaults` (e.g. READING_DEFAULTS).
+    """
+    if defaults:
+        data = {**defaults, **data}
+    return [
+        float(data["air_temperature"]),
+        float(data["process_temperature"]),
+        float(data["rotational_speed"]),
+        float(data["torque"]),
+        float(data["tool_wear"]),
+        float(TYPE_MAP.get(str(data.get("machine_type", "M")).upper(), 1)),
+    ]
+
+
+class FeaturePipeline:
+    """
+    feature_cols compiled to one step per output column, plus the folded
+    scaler (mean/scale of length k, or None for unscaled features).
+    """
+
+    def __init__(self, feature_cols, mean=None, scale=None):
+        self.feature_cols = tuple(feature_cols)
+        steps = []
+        for name in self.feature_cols:
+            if name in RAW_COLUMNS:
+                steps.append(itemgetter(RAW_COLUMNS[name]))
+            elif name in ENGINEERED_FEATURES:
+                steps.append(ENGINEERED_FEATURES[name])
+            else:
+                raise ValueError(f"Unknown feature column: {name!r}")
+        self._steps = tuple(steps)
+        self.width = len(steps)
+
+        if (mean is None) != (scale is None):
+            raise ValueError("mean and scale must be given together")
+        if mean is not None:
+            mean = np.asarray(mean, dtype=np.float64)
+            scale = np.asarray(scale, dtype=np.float64)
+            if mean.shape != (self.width,) or scale.shape != (self.width,):
+                raise ValueError(
+                    f"scaler has {mean.size} columns, feature_cols has {self.width}")
+        self.mean = mean
+        self.scale = scale
+        # Raw matrix in, raw matrix out: nothing to compute per batch
+        self.passthrough = self.feature_cols == LEGACY_FEATURE_COLS and mean is None
+
+    @classmethod
+    def from_metadata(cls, metadata: dict, scaler=None) -> "FeaturePipeline":
+        """Pipeline for metadata["feature_cols"], folding in a fitted StandardScaler."""
+        feature_cols = metadata["feature_cols"]
+        if scaler is None:
+            return cls(feature_cols)
+
+        names = getattr(scaler, "feature_names_in_", None)
+        if names is not None and list(names) != list(feature_cols):
+            raise ValueError("scaler was fitted on different columns than metadata feature_cols")
+        width = len(feature_cols)
+        mean = scaler.mean_ if getattr(scaler, "mean_", None) is not None else np.zeros(width)
+        scale = scaler.scale_ if getattr(scaler, "scale_", None) is not None else np.ones(width)
+        return cls(feature_cols, mean, scale)
+
+    def transform_one(self, data: dict) -> np.ndarray:
+        """(1, k) model input for one reading dict."""
+        return self.transform_row(parse_reading(data))
+
+    def transform_row(self, raw: list[float]) -> np.ndarray:
+        """(1, k) model input for one raw row."""
+        features = np.array([[step(raw) for step in self._steps]], dtype=np.float64)
+        return self._affine(features)
+
+    def transform(self, columns: dict) -> np.ndarray:
+        """
+        (n, k) model input for columnar readings: RAW_FIELDS arrays plus
+        "type_encoded" (e.g. the parsed columns of a validated batch).
+        """
+        raw = [np.asarray(columns[field], dtype=np.float64) for field in RAW_FIELDS]
+        raw.append(np.asarray(columns["type_encoded"], dtype=np.float64))
+        return self._assemble(raw, len(raw[0]))
+
+    def transform_raw(self, raw: np.ndarray) -> np.ndarray:
+        """(n, k) model input for an (n, 6) raw matrix; the matrix itself when passthrough."""
+        if self.passthrough:
+            return raw
+        return self._assemble(raw.T, len(raw))
+
+    def _assemble(self, raw, n: int) -> np.ndarray:
+        features = np.empty((n, self.width), dtype=np.float64)
+        for j, step in enumerate(self._steps):
+            features[:, j] = step(raw)
+        return self._affine(features)
+
+    def _affine(self, features: np.ndarray) -> np.ndarray:
+        if self.mean is not None:
+            np.subtract(features, self.mean, out=features)
+            np.divide(features, self.scale, out=features)
+        return features
+
+    def describe(self) -> dict:
+        return {
+            "feature_cols": list(self.feature_cols),
+            "scaled": self.mean is not None,
+            "passthrough": self.passthrough,
+        }
+
+
+def load_pipeline(directory: str) -> tuple[FeaturePipeline, dict | None]:
+    """
+    Pipeline and metadata of an artifact directory: metadata.json and,
+    when present, scaler.pkl. Without metadata.json the legacy raw layout.
+    """
+    metadata_path = os.path.join(directory, METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        return FeaturePipeline(LEGACY_FEATURE_COLS), None
+
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    scaler = None
+    scaler_path = os.path.join(directory, SCALER_FILE)
+    if os.path.exists(scaler_path):
+        scaler = joblib.load(scaler_path)
+    return FeaturePipeline.from_metadata(metadata, scaler), metadata
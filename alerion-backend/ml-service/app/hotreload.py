@@ -0,0 +1,201 @@
+"""
+Alerion AI — Model Hot Reload
+
+Zero-downtime model replacement for both ML APIs. A reload loads the new
+artifacts on the calling thread (the watcher thread or an HTTP worker),
+runs a warm-up batch through them, and only then swaps them in with a
+single reference assignment. Request and consumer code reads `current`
+once per batch, so in-flight work finishes on the version it started
+with and nothing is paused; a failed load or warm-up leaves the active
+version serving.
+
+Artifacts are versioned by the `version` field of a metadata.json next
+to the model when present, otherwise by the model file's SHA-256 prefix.
+
+USAGE:
+    swap = ArtifactSwap(load_artifacts, warm_up_artifacts, current=initial)
+    swap.reload("/models/v42")               # ReloadError / ReloadInProgressError
+    watcher = ModelWatcher(["/models/current/model.pkl"], lambda: swap.reload(...))
+    watcher.start()
+    watcher.watch(["/models/v43/model.pkl"])  # after a reload from another path
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from logs import LOGGER_NAME
+
+METADATA_FILE = "metadata.json"
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class ReloadError(RuntimeError):
+    """Raised when new artifacts fail to load or warm up; the old ones stay active."""
+
+
+class ReloadInProgressError(RuntimeError):
+    """Raised when a reload is requested while another one is running."""
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_version(directory: str, sha256: str) -> str:
+    """metadata.json `version` in `directory`, else the checksum prefix."""
+    try:
+        with open(os.path.join(directory, METADATA_FILE)) as f:
+            version = json.load(f).get("version")
+    except (OSError, ValueError, AttributeError):
+        version = None
+    return str(version) if version else sha256[:12]
+
+
+class ArtifactSwap:
+    """
+    Holds the active artifacts and replaces them atomically on reload().
+
+    load(source) builds a new artifact object and warm_up(artifacts) must
+    exercise it end to end; either raising aborts the reload.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], Any],
+        warm_up: Callable[[Any], None] | None = None,
+        current: Any = None,
+    ):
+        self._load = load
+        self._warm_up = warm_up
+        self._reload_lock = threading.Lock()
+        self.current = current
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_reload_seconds = None
+        self.last_reload_at = None
+
+    def reload(self, source: str) -> Any:
+        """Load, warm up and activate new artifacts; returns them."""
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("A model reload is already in progress")
+        try:
+            start = time.perf_counter()
+            try:
+                artifacts = self._load(source)
+                if self._warm_up is not None:
+                    self._warm_up(artifacts)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{source}: {e}"
+                raise ReloadError(f"Reload from {source} failed: {e}") from e
+
+            self.current = artifacts
+            self.reloads += 1
+            self.last_error = None
+            self.last_reload_seconds = round(time.perf_counter() - start, 4)
+            self.last_reload_at = time.time()
+            return artifacts
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def in_progress(self) -> bool:
+        return self._reload_lock.locked()
+
+    def snapshot(self) -> dict:
+        return {
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "in_progress": self.in_progress,
+            "last_error": self.last_error,
+            "last_reload_seconds": self.last_reload_seconds,
+            "last_reload_at": self.last_reload_at,
+        }
+
+
+class ModelWatcher:
+    """
+    Polls artifact paths and calls on_change() once they have changed and
+    then stayed the same for one more interval (so half-written files and
+    multi-file deploys are not picked up early). Symlinks are resolved, so
+    repointing a `current -> v42` link counts as a change. watch() moves
+    it to other paths, so it follows what a manual reload started serving.
+    """
+
+    def __init__(self, paths: list[str], on_change: Callable[[], Any], interval_s: float = 10.0):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._active = self._signature(self.paths)
+
+    def watch(self, paths: list[str]):
+        """Watch `paths` from now on; their current state counts as loaded."""
+        paths = list(paths)
+        signature = self._signature(paths)
+        with self._lock:
+            self.paths, self._active = paths, signature
+
+    @staticmethod
+    def _signature(paths: list[str]) -> tuple:
+        signature = []
+        for path in paths:
+            real = os.path.realpath(path)
+            try:
+                st = os.stat(real)
+                signature.append((real, st.st_size, st.st_mtime_ns))
+            except OSError:
+                signature.append((real, None, None))
+        return tuple(signature)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_s + 1)
+            self._thread = None
+
+    def _run(self):
+        pending = None
+        while not self._stop.wait(self.interval_s):
+            with self._lock:
+                paths, active = self.paths, self._active
+            signature = self._signature(paths)
+            if signature == active:
+                pending = None
+            elif signature != pending:
+                pending = signature
+            else:
+                # Changed and stable for one interval; a failed reload is not
+                # retried until the files change again
+                with self._lock:
+                    if self.paths is not paths:
+                        pending = None
+                        continue  # re-targeted meanwhile
+                    self._active = signature
+                pending = None
+                try:
+                    self.on_change()
+                except ReloadInProgressError:
+                    with self._lock:
+                        if self.paths is paths:
+                            self._active = None
+                except Exception as e:
+                    logger.error("model reload failed", extra={"fields": {"error": str(e)}})
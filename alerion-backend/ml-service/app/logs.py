@@ -0,0 +1,202 @@
+"""
+Alerion AI — Structured Logging
+
+Hot-path logging for the ML service. Records are handed to a background
+thread through a bounded queue (QueueHandler → QueueListener), so the
+consumer loop never formats JSON or blocks on stdout; if the queue fills
+up, records are dropped and counted rather than stalling inference.
+
+Per-message prediction logs go through PredictionLogger:
+• alerts (prediction == 1) are always logged
+• normal predictions are counted, and only a LOG_SAMPLE_RATE fraction
+  of them is logged (0 = none)
+• a summary line with the counts is emitted every summary_interval_s
+
+USAGE:
+    setup_logging(level="INFO", fmt="json")
+    prediction_log = PredictionLogger(sample_rate=0.01)
+    prediction_log.record(machine_data, prediction_output)
+    ...
+    shutdown_logging()
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+LOGGER_NAME = "alerion.ml"
+LOG_FORMATS = ("json", "text")
+
+# Records buffered for the writer thread before new ones are dropped
+QUEUE_SIZE = 10000
+
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus record fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable line with record fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json") -> logging.Logger:
+    """
+    Route the service logger through a background writer thread.
+
+    Raises:
+        ValueError: for an unknown format.
+    """
+    global _listener, _queue_handler
+
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format {fmt!r}, expected one of {LOG_FORMATS}")
+
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream_handler)
+    _listener.start()
+
+    logger.addHandler(_queue_handler)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    return logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+class PredictionLogger:
+    """Sampled per-prediction logging with always-on alert logs."""
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        summary_interval_s: float = 60.0,
+        logger: logging.Logger | None = None,
+    ):
+        self.sample_rate = sample_rate
+        self.summary_interval_s = summary_interval_s
+        self.logger = logger or logging.getLogger(LOGGER_NAME)
+
+        self._lock = threading.Lock()
+        self._alerts = 0
+        self._normals = 0
+        self._sampled = 0
+        self._window_alerts = 0
+        self._window_normals = 0
+        self._next_summary = time.monotonic() + summary_interval_s
+
+    def record(self, machine_data: dict[str, Any], output: dict[str, Any]):
+        """Count one prediction; log it if it is an alert or sampled."""
+        is_alert = output.get("prediction") == 1
+        sampled = not is_alert and self.sample_rate > 0 and random.random() < self.sample_rate
+
+        with self._lock:
+            if is_alert:
+                self._alerts += 1
+                self._window_alerts += 1
+            else:
+                self._normals += 1
+                self._window_normals += 1
+                self._sampled += sampled
+
+        if is_alert or sampled:
+            self.logger.log(
+                logging.WARNING if is_alert else logging.INFO,
+                "alert" if is_alert else "prediction",
+                extra={"fields": {
+                    "machine_id": machine_data.get("machine_id"),
+                    "prediction": output.get("prediction"),
+                    "confidence": output.get("confidence"),
+                    "anomaly_score": output.get("anomalyScore"),
+                    "failure_type": output.get("failure_type"),
+                }},
+            )
+
+        if time.monotonic() >= self._next_summary:
+            self._log_summary()
+
+    def _log_summary(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_summary:
+                return
+            fields = {
+                "alerts": self._window_alerts,
+                "normals": self._window_normals,
+                "interval_s": self.summary_interval_s,
+            }
+            self._window_alerts = self._window_normals = 0
+            self._next_summary = now + self.summary_interval_s
+        self.logger.info("prediction summary", extra={"fields": fields})
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "sample_rate": self.sample_rate,
+                "alerts_logged": self._alerts,
+                "normals_counted": self._normals,
+                "normals_logged": self._sampled,
+                "dropped_records": dropped_records(),
+            }
@@ -0,0 +1,244 @@
+"""
+Alerion AI — Per-Machine Streaming State
+
+Rolling-window features per machine_id, so predictions can look at a
+machine's recent trend instead of a single reading. Tracked signals:
+
+• torque       — Nm, as reported
+• temp_delta   — process minus air temperature (K)
+• wear_rate    — tool-wear minutes added since the machine's previous
+                 reading (0 on the first reading and after a tool change)
+
+For each signal the store keeps the last `window` samples in a ring
+buffer and running sums Σx, Σx² and Σk·x (k = sample index), from which
+mean, variance and least-squares slope (per reading) follow in O(1) per
+update. The sums are recomputed from the buffer once per `window`
+readings, which bounds floating-point drift at amortized O(1) cost.
+
+Everything lives in preallocated numpy arrays indexed by slot — no
+per-reading Python objects. Slots grow by doubling up to max_machines;
+beyond that the least recently seen machine is evicted, so memory is
+bounded at roughly max_machines × (window + 5) × 3 × 8 bytes.
+
+USAGE:
+    store = MachineStateStore(window=32, max_machines=50_000)
+    trends = store.update_many(machine_ids, torque, temp_delta, tool_wear)
+    trends["slope"][i, SIGNALS.index("torque")]
+    store.get("CNC-MILL-001")
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+SIGNALS = ("torque", "temp_delta", "wear_rate")
+STATS = ("mean", "var", "slope")
+
+
+class MachineStateStore:
+    """LRU-bounded ring buffers of recent readings, one slot per machine."""
+
+    def __init__(self, window: int = 32, max_machines: int = 50_000, initial_capacity: int = 1024):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        if max_machines < 1:
+            raise ValueError("max_machines must be at least 1")
+        self.window = window
+        self.max_machines = max_machines
+
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()  # machine_id → slot, least recently seen first
+        self._capacity = 0
+        n_signals = len(SIGNALS)
+        self._buffer = np.zeros((0, window, n_signals))
+        self._sum = np.zeros((0, n_signals))
+        self._sumsq = np.zeros((0, n_signals))
+        self._sumk = np.zeros((0, n_signals))
+        self._count = np.zeros(0, dtype=np.int64)  # readings ever seen by the slot
+        self._base = np.zeros(0, dtype=np.int64)  # sample index that k is relative to
+        self._last_wear = np.zeros(0)
+        self._grow(min(initial_capacity, max_machines))
+
+        self.readings = 0
+        self.evictions = 0
+
+    def _grow(self, capacity: int):
+        def extend(array: np.ndarray, fill: float = 0.0) -> np.ndarray:
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+
+        self._buffer = extend(self._buffer)
+        self._sum = extend(self._sum)
+        self._sumsq = extend(self._sumsq)
+        self._sumk = extend(self._sumk)
+        self._count = extend(self._count)
+        self._base = extend(self._base)
+        self._last_wear = extend(self._last_wear, np.nan)
+        self._capacity = capacity
+
+    def _slot_for(self, machine_id: Any) -> tuple[int, bool]:
+        """(slot, fresh) — fresh slots are reset when their first reading is applied."""
+        slot = self._slots.get(machine_id)
+        if slot is not None:
+            self._slots.move_to_end(machine_id)
+            return slot, False
+
+        if len(self._slots) >= self._capacity and self._capacity < self.max_machines:
+            self._grow(min(self._capacity * 2, self.max_machines))
+        if len(self._slots) < self._capacity:
+            slot = len(self._slots)
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self.evictions += 1
+
+        self._slots[machine_id] = slot
+        return slot, True
+
+    def update_many(
+        self,
+        machine_ids: list,
+        torque: np.ndarray,
+        temp_delta: np.ndarray,
+        tool_wear: np.ndarray,
+    ) -> dict[str, np.ndarray]:
+        """
+        Add one reading per row (in order) and return each row's rolling
+        features including that reading.
+
+        Returns:
+            mean, var, slope: (n, len(SIGNALS)) arrays
+            samples: (n,) readings in the window
+        """
+        n = len(machine_ids)
+        out = {stat: np.zeros((n, len(SIGNALS))) for stat in STATS}
+        out["samples"] = np.zeros(n, dtype=np.int64)
+        if n == 0:
+            return out
+
+        torque = np.asarray(torque, dtype=np.float64)
+        temp_delta = np.asarray(temp_delta, dtype=np.float64)
+        tool_wear = np.asarray(tool_wear, dtype=np.float64)
+
+        with self._lock:
+            assigned = [self._slot_for(m) for m in machine_ids]
+            slots = np.fromiter((slot for slot, _ in assigned), np.int64, n)
+            fresh = np.fromiter((is_fresh for _, is_fresh in assigned), bool, n)
+
+            # A slot used k times in the batch (same machine, or a machine
+            # evicted and its slot reused) is updated in k rounds, so its
+            # readings are applied in order; usually there is one round
+            seen = {}
+            rounds = np.empty(n, dtype=np.int64)
+            for i, slot in enumerate(slots.tolist()):
+                rounds[i] = seen.get(slot, 0)
+                seen[slot] = rounds[i] + 1
+
+            for r in range(int(rounds.max()) + 1):
+                rows = np.flatnonzero(rounds == r) if r or len(seen) < n else np.arange(n)
+                self._reset(slots[rows][fresh[rows]])
+                self._update(slots[rows], rows, torque, temp_delta, tool_wear, out)
+            self.readings += n
+        return out
+
+    def _reset(self, slots: np.ndarray):
+        if len(slots):
+            self._sum[slots] = self._sumsq[slots] = self._sumk[slots] = 0.0
+            self._count[slots] = self._base[slots] = 0
+            self._last_wear[slots] = np.nan
+
+    def _update(self, slots, rows, torque, temp_delta, tool_wear, out):
+        """Vectorized update of distinct slots, writing features into out[rows]."""
+        window = self.window
+
+        wear = tool_wear[rows]
+        last = self._last_wear[slots]
+        rate = np.where(np.isnan(last), 0.0, np.maximum(wear - last, 0.0))
+        self._last_wear[slots] = wear
+        x = np.column_stack((torque[rows], temp_delta[rows], rate))
+
+        count = self._count[slots]
+        pos = count % window
+        full = (count >= window)[:, None]
+        old = np.where(full, self._buffer[slots, pos], 0.0)
+        k_new = (count - self._base[slots]).astype(np.float64)[:, None]
+
+        self._sum[slots] += x - old
+        self._sumsq[slots] += x * x - old * old
+        self._sumk[slots] += k_new * x - (k_new - window) * old
+        self._buffer[slots, pos] = x
+        count = count + 1
+        self._count[slots] = count
+
+        # Buffer just wrapped: it is in chronological order, so rebuild the
+        # sums exactly with k = 0..window-1
+        resync = count % window == 0
+        if resync.any():
+            rs = slots[resync]
+            buf = self._buffer[rs]
+            self._sum[rs] = buf.sum(axis=1)
+            self._sumsq[rs] = (buf * buf).sum(axis=1)
+            self._sumk[rs] = (buf * np.arange(window)[None, :, None]).sum(axis=1)
+            self._base[rs] = count[resync] - window
+
+        self._features(slots, count, rows, out)
+
+    def _features(self, slots, count, rows, out):
+        n = np.minimum(count, self.window).astype(np.float64)[:, None]
+        total = self._sum[slots]
+        mean = total / n
+        k_last = (count - 1 - self._base[slots]).astype(np.float64)[:, None]
+        sum_k = n * (2 * k_last - n + 1) / 2
+        # n·Σk² − (Σk)² for n consecutive integers
+        denom = n * n * (n * n - 1) / 12
+
+        out["mean"][rows] = mean
+        out["var"][rows] = np.maximum(self._sumsq[slots] / n - mean * mean, 0.0)
+        out["slope"][rows] = np.where(
+            n > 1, (n * self._sumk[slots] - sum_k * total) / np.maximum(denom, 1.0), 0.0
+        )
+        out["samples"][rows] = n[:, 0]
+
+    def get(self, machine_id: Any) -> dict[str, float] | None:
+        """Current rolling features of one machine (without touching its LRU position)."""
+        with self._lock:
+            slot = self._slots.get(machine_id)
+            if slot is None:
+                return None
+            out = {stat: np.zeros((1, len(SIGNALS))) for stat in STATS}
+            out["samples"] = np.zeros(1, dtype=np.int64)
+            self._features(np.array([slot]), self._count[[slot]], np.array([0]), out)
+        return trend_dicts(out)[0]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            nbytes = sum(
+                a.nbytes for a in (
+                    self._buffer, self._sum, self._sumsq, self._sumk,
+                    self._count, self._base, self._last_wear,
+                )
+            )
+            return {
+                "machines": len(self._slots),
+                "capacity": self._capacity,
+                "max_machines": self.max_machines,
+                "window": self.window,
+                "readings": self.readings,
+                "evictions": self.evictions,
+                "array_bytes": nbytes,
+            }
+
+
+def trend_dicts(features: dict[str, np.ndarray]) -> list[dict[str, float]]:
+    """Per-row {"torque_mean": ..., ..., "samples": n} dicts from update_many output."""
+    names = [f"{signal}_{stat}" for stat in STATS for signal in SIGNALS]
+    values = np.round(np.hstack([features[stat] for stat in STATS]), 4).tolist()
+    return [
+        {**dict(zip(names, row)), "samples": samples}
+        for row, samples in zip(values, features["samples"].tolist())
+    ]
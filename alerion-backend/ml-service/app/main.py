@@ -9,42 +9,302 @@ FastAPI service that:
 SCALABILITY:
 • Multiple replicas can run simultaneously using Kafka consumer groups.
 • Each replica auto-balances partitions via Kafka rebalancing protocol.
-• For GPU-intensive models: use batched inference with async queue.
-• Model loading happens once at startup — inference is in-memory.
+• Micro-batching: the consumer pulls up to BATCH_SIZE messages per
+  consume() call (waiting at most BATCH_MAX_WAIT_MS) and scores them with a
+  single model call. Larger batches trade latency for throughput.
+• Model loading happens once at startup — inference is in-memory. New
+  model versions are hot-swapped (POST /model/reload or MODEL_WATCH_INTERVAL_S)
+  without restarting, so the consumer keeps its group membership.
+• CONSUMER_MODE=processes runs one consumer worker process per core
+  (same consumer group) under a supervisor instead of a single consumer
+  thread, so scoring is no longer limited to one core (see supervisor.py).
 """
 
-import json
+import asyncio
+import functools
 import os
 import signal
+import tempfile
 import threading
 import time
+from collections import deque
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from confluent_kafka import Consumer, Producer, KafkaError, KafkaException
-from fastapi import FastAPI
+from confluent_kafka import Consumer, Producer, KafkaError, KafkaException, TopicPartition
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 import uvicorn
 
+from alerts import ALERT_EVENTS, AlertDebouncer
+from batching import BatchTimeoutError, DynamicBatcher, QueueFullError
+from codec import CONTENT_TYPE_HEADER, DecodeError, HeaderCodecSelector, get_codec
+from hotreload import ModelWatcher, ReloadError, ReloadInProgressError
+from logs import PredictionLogger, setup_logging, shutdown_logging
+from metrics import (
+    ALERT_EVENTS_TOTAL, ALERTS_TOTAL, BATCH_SIZES, COMMIT_FAILURES_TOTAL, COMMIT_SECONDS, CONSUMER_LAG,
+    CONSUMER_PAUSED, CONSUMER_PAUSES_TOTAL, DELIVERY_FAILURES_TOTAL, DELIVERY_RETRIES_TOTAL,
+    COMMIT_STALL_SECONDS, DELIVERY_SECONDS, DRIFT_WINDOW_READINGS, FEATURE_DRIFT_KS, FEATURE_DRIFT_PSI,
+    INVALID_MESSAGES_TOTAL, MESSAGES_TOTAL, PREDICTION_CACHE_ENTRIES,
+    PREDICTION_CACHE_EVENTS, PREDICTIONS_TOTAL, PRODUCER_QUEUE_FULL_TOTAL, READINGS_DEBOUNCED_TOTAL,
+    REGISTRY, SHADOW_BATCHES_DROPPED_TOTAL, SHADOW_READINGS_TOTAL, STAGE_SECONDS, UNCOMMITTED_MESSAGES,
+    UNDELIVERED_OUTPUTS_TOTAL,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+)
+from modelstore import process_memory
+from offsets import OffsetTracker
 from predictor import ModelPredictor
+from streaming import RecordError, chunked, detect_format, iter_records, to_ndjson
+from supervisor import ConsumerSupervisor, default_worker_count
+from transport import get_transport
 
 # ─────────────────────────────────────────────────────────────
 # Configuration
 # ─────────────────────────────────────────────────────────────
 
 KAFKA_BROKERS = os.getenv("KAFKA_BROKERS", "localhost:9092")
+# Kafka client transport: kafka (confluent_kafka) | memory (in-process
+# broker for profiling and load tests without Kafka, see transport.py)
+KAFKA_TRANSPORT = os.getenv("KAFKA_TRANSPORT", "kafka").lower()
 MACHINE_DATA_TOPIC = os.getenv("MACHINE_DATA_TOPIC", "machine-data")
 PREDICTION_DATA_TOPIC = os.getenv("PREDICTION_DATA_TOPIC", "prediction-data")
 CONSUMER_GROUP = os.getenv("CONSUMER_GROUP", "ml-python-consumers")
 MODEL_PATH = os.getenv("MODEL_PATH", "./model/model.pkl")
 
+# Tree-model inference engine: sklearn | compiled | auto (see forest.py)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "sklearn")
+COMPILED_MAX_BATCH = int(os.getenv("COMPILED_MAX_BATCH", "256"))
+
+# Model loading: pickle (private copy per process) | mmap (shared array
+# export, see modelstore.py). MODEL_ARRAY_DIR defaults to <model>_arrays/
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "pickle")
+MODEL_ARRAY_DIR = os.getenv("MODEL_ARRAY_DIR") or None
+
+# Micro-batching: max messages per consume() call and max time to wait for
+# a batch to fill. BATCH_SIZE=1 keeps strict per-message latency.
+BATCH_SIZE = max(1, int(os.getenv("BATCH_SIZE", "1")))
+BATCH_MAX_WAIT_MS = max(1, int(os.getenv("BATCH_MAX_WAIT_MS", "100")))
+
+# HTTP /predict dynamic batching: requests arriving within PREDICT_MAX_WAIT_MS
+# are scored together on PREDICT_WORKERS threads. Beyond PREDICT_MAX_QUEUE
+# waiting requests → 503; no result within PREDICT_TIMEOUT_MS → 504.
+PREDICT_BATCH_SIZE = max(1, int(os.getenv("PREDICT_BATCH_SIZE", "64")))
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", "5"))
+PREDICT_MAX_QUEUE = max(1, int(os.getenv("PREDICT_MAX_QUEUE", "1024")))
+PREDICT_TIMEOUT_MS = float(os.getenv("PREDICT_TIMEOUT_MS", "5000"))
+PREDICT_WORKERS = max(1, int(os.getenv("PREDICT_WORKERS", "1")))
+
+# Cascade mode: readings inside the healthy box of cascade.json (next to
+# the model, see ml/tune_cascade.py) are answered as No Failure without
+# running the model. off | on
+CASCADE_MODE = os.getenv("CASCADE_MODE", "off").lower()
+
+# Hot reload: poll MODEL_PATH (symlinks resolved) every MODEL_WATCH_INTERVAL_S
+# seconds and swap in a changed model after a warm-up batch (0 = disabled;
+# POST /model/reload works either way, and moves the watch to its path)
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "0"))
+
+# Prediction cache: up to PREDICTION_CACHE_SIZE model outputs keyed on the
+# reading quantized to sensor precision (0 disables). Entries expire after
+# PREDICTION_CACHE_TTL_S seconds (0 = only LRU eviction / model reload).
+PREDICTION_CACHE_SIZE = max(0, int(os.getenv("PREDICTION_CACHE_SIZE", "0")))
+PREDICTION_CACHE_TTL_S = float(os.getenv("PREDICTION_CACHE_TTL_S", "300"))
+
+# Per-machine rolling features (mean / variance / slope of torque, temperature
+# delta and tool-wear rate over the last MACHINE_STATE_WINDOW readings),
+# added to each prediction as "trend". 0 disables; at most
+# MACHINE_STATE_MAX_MACHINES machines are tracked (least recently seen evicted)
+MACHINE_STATE_WINDOW = max(0, int(os.getenv("MACHINE_STATE_WINDOW", "0")))
+MACHINE_STATE_MAX_MACHINES = max(1, int(os.getenv("MACHINE_STATE_MAX_MACHINES", "50000")))
+
+# Drift monitor: per-signal histograms of the last DRIFT_WINDOW readings
+# (0 disables), kept as DRIFT_SLICES sub-windows, scored (PSI / KS) against
+# the training distribution in DRIFT_REFERENCE (default drift_reference.json
+# next to the model, written by ml/train.py or ml/build_drift_reference.py).
+# Scores are reported once the window holds DRIFT_MIN_READINGS readings.
+# See drift.py; GET /drift
+DRIFT_WINDOW = max(0, int(os.getenv("DRIFT_WINDOW", "0")))
+DRIFT_SLICES = max(1, int(os.getenv("DRIFT_SLICES", "10")))
+DRIFT_MIN_READINGS = max(1, int(os.getenv("DRIFT_MIN_READINGS", "500")))
+DRIFT_REFERENCE = os.getenv("DRIFT_REFERENCE", "") or None
+
+# Shadow model: a candidate model file (e.g. xgboost.pkl written by
+# ml/train.py next to model.pkl, sharing its metadata.json / scaler.pkl)
+# scores SHADOW_FRACTION of the model-scored batches on a background
+# thread; agreement, confusion and latency against the primary go to
+# /stats and /metrics, never to prediction-data. Sampled batches beyond
+# SHADOW_MAX_PENDING queued ones are dropped. Empty = disabled
+SHADOW_MODEL_PATH = os.getenv("SHADOW_MODEL_PATH", "")
+SHADOW_FRACTION = min(1.0, max(0.0, float(os.getenv("SHADOW_FRACTION", "0.1"))))
+SHADOW_MAX_PENDING = max(1, int(os.getenv("SHADOW_MAX_PENDING", "8")))
+
+# Offset commits: auto (librdkafka commits consumed offsets every second,
+# delivered or not) | delivery (at-least-once: every COMMIT_INTERVAL_MS,
+# commit only offsets whose predictions the broker acknowledged, see
+# offsets.py). Failed deliveries are produced again while retriable.
+COMMIT_MODE = os.getenv("COMMIT_MODE", "auto").lower()
+COMMIT_MODES = ("auto", "delivery")
+if COMMIT_MODE not in COMMIT_MODES:
+    raise ValueError(f"Unknown commit mode {COMMIT_MODE!r}, expected one of {COMMIT_MODES}")
+COMMIT_INTERVAL_MS = max(1, int(os.getenv("COMMIT_INTERVAL_MS", "1000")))
+# Outputs that fail for good (non-retriable error) are produced to
+# DEAD_LETTER_TOPIC, headed with their original topic and the error, and
+# their offsets committed; empty = dropped (logged, counted) and committed.
+# /health turns "degraded" when a partition's commit point has not moved
+# for COMMIT_STALL_WARN_S seconds while messages wait behind it.
+DEAD_LETTER_TOPIC = os.getenv("DEAD_LETTER_TOPIC", "")
+COMMIT_STALL_WARN_S = float(os.getenv("COMMIT_STALL_WARN_S", "60"))
+
+# Backpressure: pause consumption while more than PRODUCER_MAX_IN_FLIGHT
+# predictions await delivery (COMMIT_MODE=delivery: await commit), resume
+# below half of it. Keep it under the producer's queue.buffering.max.messages.
+PRODUCER_MAX_IN_FLIGHT = max(1, int(os.getenv("PRODUCER_MAX_IN_FLIGHT", "50000")))
+
+# Consumer mode: thread (one consumer thread in this process) | processes
+# (CONSUMER_WORKERS worker processes, default one per core, each with its
+# own model copy and consumer; restarted if they crash, drained for up to
+# CONSUMER_DRAIN_TIMEOUT_S on shutdown). MODEL_LOAD_MODE=mmap lets the
+# workers share the model's page cache.
+CONSUMER_MODE = os.getenv("CONSUMER_MODE", "thread").lower()
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "0")) or default_worker_count()
+CONSUMER_DRAIN_TIMEOUT_S = float(os.getenv("CONSUMER_DRAIN_TIMEOUT_S", "30"))
+CONSUMER_REPORT_INTERVAL_S = float(os.getenv("CONSUMER_REPORT_INTERVAL_S", "2"))
+if CONSUMER_MODE == "processes" and KAFKA_TRANSPORT == "memory":
+    raise ValueError("KAFKA_TRANSPORT=memory is in-process only; use CONSUMER_MODE=thread")
+
+# Alert debouncing: off (every prediction is published to PREDICTION_DATA_TOPIC)
+# | on (per machine_id, publish only state transitions — raised after
+# ALERT_RAISE_AFTER consecutive failing readings, cleared after
+# ALERT_CLEAR_AFTER healthy ones, failure_type changed — plus a heartbeat
+# when nothing was published for ALERT_HEARTBEAT_S; the same failure_type
+# is not re-alerted within ALERT_MIN_REPEAT_S, ALERT_MUTED_TYPES never
+# alert). PREDICTION_FIREHOSE_TOPIC, if set, still receives every
+# prediction. See alerts.py
+ALERT_DEBOUNCE = os.getenv("ALERT_DEBOUNCE", "off").lower()
+ALERT_RAISE_AFTER = max(1, int(os.getenv("ALERT_RAISE_AFTER", "2")))
+ALERT_CLEAR_AFTER = max(1, int(os.getenv("ALERT_CLEAR_AFTER", "3")))
+ALERT_MIN_REPEAT_S = float(os.getenv("ALERT_MIN_REPEAT_S", "300"))
+ALERT_HEARTBEAT_S = float(os.getenv("ALERT_HEARTBEAT_S", "60"))
+ALERT_MUTED_TYPES = [t.strip() for t in os.getenv("ALERT_MUTED_TYPES", "").split(",") if t.strip()]
+ALERT_MAX_MACHINES = max(1, int(os.getenv("ALERT_MAX_MACHINES", "50000")))
+PREDICTION_FIREHOSE_TOPIC = os.getenv("PREDICTION_FIREHOSE_TOPIC", "")
+
+# Seconds between consumer-lag refreshes (one watermark query per partition)
+METRICS_LAG_INTERVAL_S = float(os.getenv("METRICS_LAG_INTERVAL_S", "10"))
+
+# Message value codecs: json (orjson fast path when installed) | msgpack.
+# MESSAGE_CODEC=auto picks the input codec per message from its
+# content-type header; OUTPUT_CODEC sets the prediction-data encoding.
+MESSAGE_CODEC = os.getenv("MESSAGE_CODEC", "json")
+OUTPUT_CODEC = os.getenv("OUTPUT_CODEC", "json")
+
+# Structured logging: alerts are always logged, normal predictions are
+# counted and only LOG_SAMPLE_RATE of them logged. LOG_FORMAT: json | text
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATE = min(1.0, max(0.0, float(os.getenv("LOG_SAMPLE_RATE", "0"))))
+LOG_SUMMARY_INTERVAL_S = float(os.getenv("LOG_SUMMARY_INTERVAL_S", "60"))
+
+# Records scored per chunk by the streaming /predict/stream endpoint
+STREAM_CHUNK_SIZE = max(1, int(os.getenv("STREAM_CHUNK_SIZE", "5000")))
+STREAM_SPOOL_BYTES = int(os.getenv("STREAM_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
 # ─────────────────────────────────────────────────────────────
 # Global State
 # ─────────────────────────────────────────────────────────────
 
-predictor = ModelPredictor(MODEL_PATH)
+predictor = ModelPredictor(
+    MODEL_PATH, INFERENCE_ENGINE, COMPILED_MAX_BATCH, MODEL_LOAD_MODE, MODEL_ARRAY_DIR,
+    cache_size=PREDICTION_CACHE_SIZE, cache_ttl_s=PREDICTION_CACHE_TTL_S,
+    state_window=MACHINE_STATE_WINDOW, state_max_machines=MACHINE_STATE_MAX_MACHINES,
+    cascade=CASCADE_MODE == "on",
+    drift_window=DRIFT_WINDOW, drift_slices=DRIFT_SLICES,
+    drift_min_readings=DRIFT_MIN_READINGS, drift_reference=DRIFT_REFERENCE,
+    shadow_model_path=SHADOW_MODEL_PATH, shadow_fraction=SHADOW_FRACTION,
+    shadow_max_pending=SHADOW_MAX_PENDING,
+)
+transport = get_transport(KAFKA_TRANSPORT)
+input_codec = get_codec("json" if MESSAGE_CODEC == "auto" else MESSAGE_CODEC)
+input_codecs = HeaderCodecSelector(input_codec) if MESSAGE_CODEC == "auto" else None
+output_codec = get_codec(OUTPUT_CODEC)
+logger = setup_logging(LOG_LEVEL, LOG_FORMAT)
+prediction_log = PredictionLogger(LOG_SAMPLE_RATE, LOG_SUMMARY_INTERVAL_S, logger)
+batcher = DynamicBatcher(
+    predictor.predict_batch,
+    max_batch_size=PREDICT_BATCH_SIZE,
+    max_wait_ms=PREDICT_MAX_WAIT_MS,
+    max_queue=PREDICT_MAX_QUEUE,
+    timeout_ms=PREDICT_TIMEOUT_MS,
+    workers=PREDICT_WORKERS,
+)
+model_watcher = (
+    ModelWatcher([MODEL_PATH], lambda: predictor.reload(predictor.model_path),
+                 MODEL_WATCH_INTERVAL_S)
+    if MODEL_WATCH_INTERVAL_S > 0 else None
+)
+debouncer = (
+    AlertDebouncer(
+        ALERT_RAISE_AFTER, ALERT_CLEAR_AFTER, ALERT_MIN_REPEAT_S, ALERT_HEARTBEAT_S,
+        ALERT_MUTED_TYPES, ALERT_MAX_MACHINES,
+    )
+    if ALERT_DEBOUNCE == "on" else None
+)
 running = True
-message_count = 0
-alert_count = 0
+supervisor = None  # ConsumerSupervisor when CONSUMER_MODE=processes
+
+if predictor.drift is not None:
+    FEATURE_DRIFT_PSI.set_function(lambda: drift_metric("psi"))
+    FEATURE_DRIFT_KS.set_function(lambda: drift_metric("ks"))
+    DRIFT_WINDOW_READINGS.set_function(lambda: {(): drift_summary()["window_readings"]})
+if predictor.cache is not None:
+    PREDICTION_CACHE_EVENTS.set_function(predictor.cache.event_counts)
+    PREDICTION_CACHE_ENTRIES.set_function(lambda: {(): len(predictor.cache)})
+
+
+class BatchStats:
+    """Thread-safe record of the batch sizes the consumer actually achieved."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.batches = 0
+        self.messages = 0
+        self.max_size = 0
+
+    def record(self, size: int):
+        with self._lock:
+            self._recent.append(size)
+            self.batches += 1
+            self.messages += size
+            self.max_size = max(self.max_size, size)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            batches, messages, max_size = self.batches, self.messages, self.max_size
+
+        if not recent:
+            return {"batches": 0, "mean_size": 0.0, "max_size": 0}
+
+        return {
+            "batches": batches,
+            "mean_size": round(messages / batches, 2),
+            "max_size": max_size,
+            "recent_p50": recent[len(recent) // 2],
+            "recent_p95": recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+            "recent_window": len(recent),
+        }
+
+
+batch_stats = BatchStats()
+offset_tracker = OffsetTracker() if COMMIT_MODE == "delivery" else None
+if offset_tracker is not None:
+    UNCOMMITTED_MESSAGES.set_function(lambda: {(): offset_tracker.outstanding()})
+    COMMIT_STALL_SECONDS.set_function(lambda: commit_stalls())
+
+# Headers of dead-lettered outputs
+DEAD_LETTER_TOPIC_HEADER = "x-original-topic"
+DEAD_LETTER_ERROR_HEADER = "x-delivery-error"
 
 
 # ─────────────────────────────────────────────────────────────
@@ -53,11 +313,12 @@ alert_count = 0
 
 def create_kafka_consumer() -> Consumer:
     """Create a Kafka consumer with production-grade settings."""
-    return Consumer({
+    return transport.consumer({
         "bootstrap.servers": KAFKA_BROKERS,
         "group.id": CONSUMER_GROUP,
         "auto.offset.reset": "latest",
-        "enable.auto.commit": True,
+        # COMMIT_MODE=delivery commits explicitly once outputs are delivered
+        "enable.auto.commit": COMMIT_MODE == "auto",
         "auto.commit.interval.ms": 1000,
         # SCALABILITY: session.timeout.ms and heartbeat.interval.ms control
         # how quickly Kafka detects a dead consumer and rebalances.
@@ -71,7 +332,7 @@ def create_kafka_consumer() -> Consumer:
 
 def create_kafka_producer() -> Producer:
     """Create a Kafka producer with delivery guarantees."""
-    return Producer({
+    return transport.producer({
         "bootstrap.servers": KAFKA_BROKERS,
         "acks": "all",  # Wait for all replicas to acknowledge
         # Batching for throughput (accumulate messages for 5ms before sending)
@@ -80,109 +341,501 @@ def create_kafka_producer() -> Producer:
     })
 
 
+def update_consumer_lag(consumer):
+    """Refresh the per-partition lag gauge (high watermark − position)."""
+    try:
+        assignment = consumer.assignment()
+        if not assignment:
+            return
+        CONSUMER_LAG.clear()
+        for tp in consumer.position(assignment):
+            _, high = consumer.get_watermark_offsets(tp, timeout=1.0)
+            # Before the first fetch the position is still a logical offset (< 0)
+            lag = high - tp.offset if tp.offset >= 0 else high
+            CONSUMER_LAG.set(max(lag, 0), (tp.topic, str(tp.partition)))
+    except KafkaException as e:
+        logger.warning("lag check failed", extra={"fields": {"error": str(e)}})
+
+
 def delivery_callback(err, msg):
     """Kafka producer delivery report callback."""
     if err:
-        print(f"[Producer] ❌ Delivery failed: {err}")
+        DELIVERY_FAILURES_TOTAL.inc()
+        logger.error("delivery failed", extra={"fields": {"error": str(err), "topic": msg.topic()}})
     # else: successful delivery (no log for normal flow to reduce noise)
 
 
-def kafka_consumer_loop():
+def tracked_delivery(source: tuple, produced_at: float, redeliver: list, err, msg, remaining=None):
+    """
+    Delivery callback for COMMIT_MODE=delivery: finishes the source
+    (topic, partition, offset) so its offset can be committed — once all
+    of its outputs are delivered, when `remaining` ([count], shared by
+    them) is given. Retriable failures are queued to be produced again;
+    others are queued for DEAD_LETTER_TOPIC when it is set, or else
+    dropped, so one undeliverable output never holds the commit point.
+    """
+    if err is None:
+        DELIVERY_SECONDS.observe(time.perf_counter() - produced_at)
+    elif err.retriable() or err.code() == KafkaError._MSG_TIMED_OUT:
+        redeliver.append((source, msg, remaining, None))
+        return
+    else:
+        DELIVERY_FAILURES_TOTAL.inc()
+        fields = {
+            "error": str(err), "topic": msg.topic(),
+            "source_topic": source[0], "partition": source[1], "offset": source[2],
+        }
+        if DEAD_LETTER_TOPIC and msg.topic() != DEAD_LETTER_TOPIC:
+            logger.error("delivery failed, dead-lettering output", extra={"fields": fields})
+            redeliver.append((source, msg, remaining, str(err)))
+            return
+        UNDELIVERED_OUTPUTS_TOTAL.inc(1, ("dropped",))
+        logger.error("delivery failed, output dropped", extra={"fields": fields})
+    if remaining is not None:
+        remaining[0] -= 1
+        if remaining[0] > 0:
+            return
+    offset_tracker.done(*source)
+
+
+def produce_message(producer, **kwargs):
+    """producer.produce() that waits for queue space instead of raising BufferError."""
+    while True:
+        try:
+            producer.produce(**kwargs)
+            return
+        except BufferError:
+            PRODUCER_QUEUE_FULL_TOTAL.inc()
+            producer.poll(0.1)  # serve delivery reports to free space
+
+
+def commit_offsets(consumer, partitions=None):
+    """Commit the tracker's new commit points (optionally only for `partitions`)."""
+    offsets = offset_tracker.committable(partitions)
+    if not offsets:
+        return
+    start = time.perf_counter()
+    try:
+        consumer.commit(
+            offsets=[TopicPartition(topic, partition, offset) for topic, partition, offset in offsets],
+            asynchronous=False,
+        )
+    except KafkaException as e:
+        COMMIT_FAILURES_TOTAL.inc()
+        logger.warning("offset commit failed", extra={"fields": {"error": str(e)}})
+        return
+    COMMIT_SECONDS.observe(time.perf_counter() - start)
+    offset_tracker.committed(offsets)
+
+
+def apply_backpressure(consumer, producer, paused: bool) -> bool:
+    """
+    Pause / resume the assignment around PRODUCER_MAX_IN_FLIGHT; returns
+    paused. While paused the whole assignment is paused again on every
+    call, so partitions a rebalance assigned meanwhile are held too.
+    """
+    backlog = offset_tracker.outstanding() if offset_tracker is not None else len(producer)
+    if not paused and backlog > PRODUCER_MAX_IN_FLIGHT:
+        consumer.pause(consumer.assignment())
+        CONSUMER_PAUSES_TOTAL.inc()
+        CONSUMER_PAUSED.set(1)
+        logger.warning("consumption paused", extra={"fields": {"in_flight": backlog}})
+        return True
+    if paused and backlog <= PRODUCER_MAX_IN_FLIGHT // 2:
+        consumer.resume(consumer.assignment())
+        CONSUMER_PAUSED.set(0)
+        logger.info("consumption resumed", extra={"fields": {"in_flight": backlog}})
+        return False
+    if paused:
+        consumer.pause(consumer.assignment())
+    return paused
+
+
+def kafka_consumer_loop(consumer=None, producer=None):
     """
     Background thread: consume machine-data, predict, publish to prediction-data.
 
-    SCALABILITY: This loop runs in a background thread. For multi-core scaling,
-    run multiple FastAPI replicas — each gets its own consumer thread, and Kafka
-    distributes partitions across them automatically.
+    SCALABILITY: This loop runs in a background thread and is GIL-bound, so
+    it uses one core. For multi-core scaling set CONSUMER_MODE=processes
+    (one loop per worker process, see consumer_worker) or run more replicas;
+    Kafka distributes partitions across all consumers in the group.
+
+    consumer / producer default to real Kafka clients; benchmarks pass
+    in-process fakes with the same interface.
     """
-    global running, message_count, alert_count
+    # (a Producer is falsy while its queue is empty, so test for None)
+    if consumer is None:
+        consumer = create_kafka_consumer()
+    if producer is None:
+        producer = create_kafka_producer()
+
+    tracker = offset_tracker
+    redeliver = []  # (source, msg, remaining, dead-letter error or None) to produce again
 
-    consumer = create_kafka_consumer()
-    producer = create_kafka_producer()
+    def on_revoke(consumer, partitions):
+        # Finish and commit what we can before another consumer takes over
+        revoked = {(tp.topic, tp.partition) for tp in partitions}
+        producer.flush(timeout=10)
+        commit_offsets(consumer, revoked)
+        tracker.revoke(revoked)
+        redeliver[:] = [r for r in redeliver if r[0][:2] not in revoked]
 
-    consumer.subscribe([MACHINE_DATA_TOPIC])
-    print(f"[ML Service] Subscribed to '{MACHINE_DATA_TOPIC}' (group: {CONSUMER_GROUP})")
+    if tracker is None:
+        consumer.subscribe([MACHINE_DATA_TOPIC])
+    else:
+        consumer.subscribe([MACHINE_DATA_TOPIC], on_revoke=on_revoke)
+    print(f"[ML Service] Subscribed to '{MACHINE_DATA_TOPIC}' (group: {CONSUMER_GROUP}, "
+          f"commits: {COMMIT_MODE})")
     print(f"[ML Service] Model loaded: {predictor.model_loaded}")
 
+    print(f"[ML Service] Batching: up to {BATCH_SIZE} msgs / {BATCH_MAX_WAIT_MS}ms")
+    print(f"[ML Service] Codecs: in={MESSAGE_CODEC} out={OUTPUT_CODEC} "
+          f"({type(output_codec).__name__})")
+    if debouncer is not None:
+        print(f"[ML Service] Alert debouncing: raise after {ALERT_RAISE_AFTER}, "
+              f"clear after {ALERT_CLEAR_AFTER}, heartbeat {ALERT_HEARTBEAT_S}s, "
+              f"firehose: {PREDICTION_FIREHOSE_TOPIC or 'off'}")
+
+    encode = output_codec.encode
+    # Tag non-JSON output so downstream consumers can tell the formats apart
+    produce_headers = (
+        {} if output_codec.name == "json"
+        else {"headers": [(CONTENT_TYPE_HEADER, output_codec.content_type.encode("ascii"))]}
+    )
+
     try:
+        next_lag_check = next_commit = time.monotonic()
+        paused = False
         while running:
-            msg = consumer.poll(timeout=1.0)
+            paused = apply_backpressure(consumer, producer, paused)
+            if paused:
+                # Nothing to fetch; wait on delivery reports instead
+                producer.poll(BATCH_MAX_WAIT_MS / 1000)
+            msgs = consumer.consume(
+                num_messages=BATCH_SIZE, timeout=0 if paused else BATCH_MAX_WAIT_MS / 1000
+            )
+
+            if time.monotonic() >= next_lag_check:
+                update_consumer_lag(consumer)
+                next_lag_check = time.monotonic() + METRICS_LAG_INTERVAL_S
 
-            if msg is None:
+            if tracker is not None:
+                if redeliver:
+                    retry, redeliver[:] = redeliver[:], []
+                    for source, failed, remaining, error in retry:
+                        topic, headers = failed.topic(), failed.headers()
+                        if error is None:
+                            DELIVERY_RETRIES_TOTAL.inc()
+                        else:
+                            UNDELIVERED_OUTPUTS_TOTAL.inc(1, ("dead_lettered",))
+                            topic = DEAD_LETTER_TOPIC
+                            headers = [
+                                *(headers or []),
+                                (DEAD_LETTER_TOPIC_HEADER, failed.topic().encode("utf-8")),
+                                (DEAD_LETTER_ERROR_HEADER, error.encode("utf-8")),
+                            ]
+                        produce_message(
+                            producer, topic=topic, key=failed.key(), value=failed.value(),
+                            callback=functools.partial(
+                                tracked_delivery, source, time.perf_counter(), redeliver,
+                                remaining=remaining),
+                            **({"headers": headers} if headers else {}),
+                        )
+                if time.monotonic() >= next_commit:
+                    commit_offsets(consumer)
+                    next_commit = time.monotonic() + COMMIT_INTERVAL_MS / 1000
+
+            if not msgs:
                 continue
 
-            if msg.error():
-                if msg.error().code() == KafkaError._PARTITION_EOF:
+            # Parse incoming machine data
+            decode_start = time.perf_counter()
+            batch = []
+            sources = []  # (topic, partition, offset) per batch entry, when tracking
+            for msg in msgs:
+                if msg.error():
+                    if msg.error().code() == KafkaError._PARTITION_EOF:
+                        continue
+                    raise KafkaException(msg.error())
+
+                if tracker is not None:
+                    source = (msg.topic(), msg.partition(), msg.offset())
+                    tracker.track(*source)
+                    # Finished right away unless it reaches the batch below
+                    sources.append(source)
+
+                codec = input_codec if input_codecs is None else input_codecs.for_headers(msg.headers())
+                try:
+                    machine_data = codec.decode(msg.value())
+                except DecodeError as e:
+                    INVALID_MESSAGES_TOTAL.inc()
+                    logger.warning("invalid message", extra={"fields": {"error": str(e)}})
+                    if tracker is not None:
+                        tracker.done(*sources.pop())
                     continue
-                raise KafkaException(msg.error())
-
-            try:
-                # Parse incoming machine data
-                machine_data = json.loads(msg.value().decode("utf-8"))
-
-                # Run ML prediction
-                prediction_output = predictor.predict(machine_data)
-
-                # Build enriched result
-                result = {
-                    **machine_data,
-                    **prediction_output,
-                    "processed_at": datetime.now(timezone.utc).isoformat(),
-                }
-
-                # Publish to prediction-data topic
-                producer.produce(
-                    topic=PREDICTION_DATA_TOPIC,
-                    key=machine_data.get("machine_id", "unknown").encode("utf-8"),
-                    value=json.dumps(result).encode("utf-8"),
-                    callback=delivery_callback,
-                )
-                producer.poll(0)  # Trigger delivery callbacks
-
-                message_count += 1
-                if prediction_output["prediction"] == 1:
-                    alert_count += 1
-
-                icon = "🚨" if prediction_output["prediction"] == 1 else "✅"
-                print(
-                    f"[ML Service] {icon} {machine_data['machine_id']} | "
-                    f"pred: {prediction_output['prediction']} | "
-                    f"conf: {prediction_output['confidence']:.3f} | "
-                    f"anomaly: {prediction_output['anomalyScore']:.3f} | "
-                    f"type: {prediction_output['failure_type']}"
-                )
 
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"[ML Service] ⚠️  Error processing message: {e}")
+                if not isinstance(machine_data, dict):
+                    INVALID_MESSAGES_TOTAL.inc()
+                    logger.warning("invalid message", extra={"fields": {"error": "payload is not an object"}})
+                    if tracker is not None:
+                        tracker.done(*sources.pop())
+                    continue
+
+                batch.append(machine_data)
+
+            STAGE_SECONDS.observe(time.perf_counter() - decode_start, ("decode",))
+            if not batch:
                 continue
 
+            batch_stats.record(len(batch))
+            BATCH_SIZES.observe(len(batch))
+
+            # Run ML prediction for the whole batch in one model call
+            # (features / inference stages are timed inside the predictor)
+            prediction_outputs = predictor.predict_batch(batch)
+            # Readings with unparseable sensor values are skipped like
+            # undecodable messages (their offsets count as processed)
+            if any("error" in output for output in prediction_outputs):
+                kept = []
+                for i, output in enumerate(prediction_outputs):
+                    if "error" not in output:
+                        kept.append(i)
+                        continue
+                    INVALID_MESSAGES_TOTAL.inc()
+                    logger.warning("invalid message", extra={"fields": {"error": output["error"]}})
+                    if tracker is not None:
+                        tracker.done(*sources[i])
+                batch = [batch[i] for i in kept]
+                prediction_outputs = [prediction_outputs[i] for i in kept]
+                if tracker is not None:
+                    sources = [sources[i] for i in kept]
+                if not batch:
+                    continue
+            processed_at = datetime.now(timezone.utc).isoformat()
+
+            # Alert events per reading (None: not published to prediction-data)
+            events = None
+            if debouncer is not None:
+                events = debouncer.observe_many(
+                    [data.get("machine_id", "unknown") for data in batch],
+                    [output["prediction"] for output in prediction_outputs],
+                    [output["failure_type"] for output in prediction_outputs],
+                )
+
+            # Build enriched results in place (the decoded dicts are not
+            # reused) — same keys and order as {**data, **output, processed_at}.
+            # Each reading gets its (topic, payload) messages: the prediction,
+            # or with debouncing the firehose copy and / or the alert event
+            serialize_start = time.perf_counter()
+            outgoing = []
+            for i, (machine_data, prediction_output) in enumerate(zip(batch, prediction_outputs)):
+                machine_data.update(prediction_output)
+                machine_data["processed_at"] = processed_at
+                messages = []
+                try:
+                    if events is None:
+                        messages.append((PREDICTION_DATA_TOPIC, encode(machine_data)))
+                    else:
+                        if PREDICTION_FIREHOSE_TOPIC:
+                            messages.append((PREDICTION_FIREHOSE_TOPIC, encode(machine_data)))
+                        if events[i] is not None:
+                            machine_data["alert_event"] = events[i]
+                            messages.append((PREDICTION_DATA_TOPIC, encode(machine_data)))
+                except (TypeError, ValueError) as e:
+                    logger.warning("unencodable result", extra={"fields": {"error": str(e)}})
+                    messages = None
+                outgoing.append(messages)
+
+            # Publish to prediction-data topic
+            produce_start = time.perf_counter()
+            STAGE_SECONDS.observe(produce_start - serialize_start, ("serialize",))
+            produced = alerts = debounced = 0
+            produced_at = time.perf_counter()
+            for i, (machine_data, prediction_output, messages) in enumerate(
+                zip(batch, prediction_outputs, outgoing)
+            ):
+                if not messages:
+                    if tracker is not None:
+                        tracker.done(*sources[i])
+                    if messages is None:
+                        continue
+                try:
+                    key = machine_data.get("machine_id", "unknown").encode("utf-8")
+                    remaining = [len(messages)]
+                    for topic, payload in messages:
+                        produce_message(
+                            producer,
+                            topic=topic,
+                            key=key,
+                            value=payload,
+                            callback=(
+                                delivery_callback if tracker is None else functools.partial(
+                                    tracked_delivery, sources[i], produced_at, redeliver,
+                                    remaining=remaining)
+                            ),
+                            **produce_headers,
+                        )
+
+                    produced += 1
+                    if events is None:
+                        if prediction_output["prediction"] == 1:
+                            alerts += 1
+                    elif events[i] is None:
+                        debounced += 1
+                    else:
+                        ALERT_EVENTS_TOTAL.inc(1, (events[i],))
+                        if events[i] in ALERT_EVENTS:
+                            alerts += 1
+
+                    prediction_log.record(machine_data, prediction_output)
+
+                except KeyError as e:
+                    logger.warning("invalid message", extra={"fields": {"error": f"missing {e}"}})
+                    continue
+
+            producer.poll(0)  # Trigger delivery callbacks
+            STAGE_SECONDS.observe(time.perf_counter() - produce_start, ("produce",))
+            MESSAGES_TOTAL.inc(produced)
+            ALERTS_TOTAL.inc(alerts)
+            if debounced:
+                READINGS_DEBOUNCED_TOTAL.inc(debounced)
+
     except KeyboardInterrupt:
         pass
     finally:
         print("[ML Service] Shutting down consumer...")
         producer.flush(timeout=5)
+        if tracker is not None:
+            commit_offsets(consumer)
+        CONSUMER_PAUSED.set(0)
         consumer.close()
         print("[ML Service] Consumer closed")
 
 
+# ─────────────────────────────────────────────────────────────
+# Consumer Worker Processes (CONSUMER_MODE=processes)
+# ─────────────────────────────────────────────────────────────
+
+# Counters a worker reports; the supervisor adds their increase to this
+# process's counters, so /health, /stats and /metrics cover all workers
+WORKER_COUNTERS = {
+    "messages": MESSAGES_TOTAL,
+    "alerts": ALERTS_TOTAL,
+    "invalid": INVALID_MESSAGES_TOTAL,
+    "delivery_failures": DELIVERY_FAILURES_TOTAL,
+    "delivery_retries": DELIVERY_RETRIES_TOTAL,
+    "undelivered": UNDELIVERED_OUTPUTS_TOTAL,
+    "commit_failures": COMMIT_FAILURES_TOTAL,
+    "pauses": CONSUMER_PAUSES_TOTAL,
+    "predictions": PREDICTIONS_TOTAL,
+    "alert_events": ALERT_EVENTS_TOTAL,
+    "debounced": READINGS_DEBOUNCED_TOTAL,
+    "shadow_readings": SHADOW_READINGS_TOTAL,
+    "shadow_dropped": SHADOW_BATCHES_DROPPED_TOTAL,
+}
+
+
+def worker_report() -> dict:
+    """Snapshot a worker process sends to the supervisor."""
+    return {
+        "counters": {name: counter.values() for name, counter in WORKER_COUNTERS.items()},
+        "lag": CONSUMER_LAG.values(),
+        "batches": batch_stats.snapshot(),
+        "model_version": predictor.model_info()["version"],
+        "alert_debounce": debouncer.snapshot() if debouncer is not None else None,
+        "drift_counts": predictor.drift.counts() if predictor.drift is not None else None,
+        "shadow": predictor.shadow_info() if predictor.shadow is not None else None,
+        "commit_stalls": offset_tracker.stalls() if offset_tracker is not None else None,
+    }
+
+
+def stop_consuming(*_):
+    global running
+    running = False
+
+
+def consumer_worker(link):
+    """
+    Entry point of one worker process: this module is imported afresh in
+    the child (loading the model once), then the consumer loop runs on the
+    main thread until the supervisor sends stop or SIGTERM arrives.
+    """
+    # Ctrl-C reaches the whole process group; the supervisor drains workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, stop_consuming)
+    link.start(worker_report, on_stop=stop_consuming, on_reload=reload_model_path)
+    if model_watcher is not None:
+        model_watcher.start()
+    try:
+        kafka_consumer_loop()
+    finally:
+        if model_watcher is not None:
+            model_watcher.stop()
+        shutdown_logging()
+        link.close(worker_report)
+
+
+def merge_worker_report(worker_id: int, report: dict, deltas: dict):
+    """Supervisor callback: fold a worker's counter increase into ours."""
+    for name, values in deltas.items():
+        counter = WORKER_COUNTERS[name]
+        for labels, amount in values.items():
+            counter.inc(amount, labels)
+    # Partitions are assigned to one worker each; rebuild from the latest reports
+    CONSUMER_LAG.clear()
+    for latest in supervisor.reports():
+        for labels, lag in latest["lag"].items():
+            CONSUMER_LAG.set(lag, labels)
+
+
+def commit_stalls() -> dict:
+    """Commit-point stall seconds per (topic, partition), of this process or its workers."""
+    if supervisor is None:
+        stalls = offset_tracker.stalls()
+    else:
+        stalls = {}
+        for report in supervisor.reports():
+            stalls.update(report.get("commit_stalls") or {})
+    return {(topic, str(partition)): seconds for (topic, partition), seconds in stalls.items()}
+
+
 # ─────────────────────────────────────────────────────────────
 # FastAPI Application
 # ─────────────────────────────────────────────────────────────
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Start Kafka consumer in background thread on startup."""
-    global running
+    """Start the Kafka consumer (thread or supervised worker processes) on startup."""
+    global running, supervisor
 
-    consumer_thread = threading.Thread(target=kafka_consumer_loop, daemon=True)
-    consumer_thread.start()
-    print("[ML Service] Kafka consumer thread started")
+    consumer_thread = None
+    if CONSUMER_MODE == "processes":
+        supervisor = ConsumerSupervisor(
+            consumer_worker, CONSUMER_WORKERS, merge_worker_report,
+            report_interval_s=CONSUMER_REPORT_INTERVAL_S,
+            drain_timeout_s=CONSUMER_DRAIN_TIMEOUT_S,
+        )
+        supervisor.start()
+    else:
+        consumer_thread = threading.Thread(target=kafka_consumer_loop, daemon=True)
+        consumer_thread.start()
+        print("[ML Service] Kafka consumer thread started")
+    batcher.start()
+    if model_watcher is not None:
+        model_watcher.start()
 
     yield
 
     # Shutdown
     running = False
-    consumer_thread.join(timeout=10)
+    if model_watcher is not None:
+        model_watcher.stop()
+    await batcher.stop()
+    if supervisor is not None:
+        await asyncio.to_thread(supervisor.stop)
+    else:
+        consumer_thread.join(timeout=10)
+    shutdown_logging()
     print("[ML Service] Shutdown complete")
 
 
@@ -194,43 +847,303 @@ app = FastAPI(
 )
 
 
+def consumer_summary() -> dict:
+    if supervisor is None:
+        return {"mode": "thread", "workers": 1}
+    return {
+        "mode": "processes",
+        "workers": supervisor.n_workers,
+        "alive": supervisor.alive(),
+        "model_versions": sorted({r["model_version"] for r in supervisor.reports()}),
+    }
+
+
+def commit_summary() -> dict:
+    if offset_tracker is None:
+        return {"mode": COMMIT_MODE}
+    stall = max(commit_stalls().values(), default=0.0)
+    return {
+        "mode": COMMIT_MODE,
+        "max_commit_stall_s": round(stall, 3),
+        "stall_warn_s": COMMIT_STALL_WARN_S,
+        "stalled": stall > COMMIT_STALL_WARN_S,
+    }
+
+
 @app.get("/health")
 async def health():
-    """Health check endpoint for container orchestration."""
+    """
+    Health check endpoint for container orchestration. "degraded" when a
+    partition's commit point has been stuck for COMMIT_STALL_WARN_S.
+    """
+    model = predictor.model_info()
+    commits = commit_summary()
     return {
-        "status": "ok",
+        "status": "degraded" if commits.get("stalled") else "ok",
         "service": "ml-inference",
         "model_loaded": predictor.model_loaded,
-        "messages_processed": message_count,
-        "alerts_generated": alert_count,
+        "model_version": model["version"],
+        "model_sha256": model["sha256"],
+        "model_memory": {**predictor.load_info, "process": process_memory()},
+        "messages_processed": int(MESSAGES_TOTAL.value()),
+        "alerts_generated": int(ALERTS_TOTAL.value()),
         "uptime_topic": MACHINE_DATA_TOPIC,
+        "consumers": consumer_summary(),
+        "commits": commits,
     }
 
 
 @app.get("/stats")
 async def stats():
     """Detailed service statistics."""
+    message_count = MESSAGES_TOTAL.value()
+    alert_count = ALERTS_TOTAL.value()
+    predictions = PREDICTIONS_TOTAL.values()
     return {
-        "messages_processed": message_count,
-        "alerts_generated": alert_count,
+        "messages_processed": int(message_count),
+        "alerts_generated": int(alert_count),
         "alert_rate": f"{(alert_count / max(message_count, 1)) * 100:.2f}%",
         "model_loaded": predictor.model_loaded,
-        "model_path": MODEL_PATH,
+        "model_path": predictor.model_path,
+        "model": predictor.model_info(),
+        "inference_engine": (
+            predictor.engine.describe() if predictor.engine else {"engine": "sklearn"}
+        ),
         "kafka_brokers": KAFKA_BROKERS,
+        "kafka_transport": KAFKA_TRANSPORT,
         "consumer_group": CONSUMER_GROUP,
+        "batch_size_limit": BATCH_SIZE,
+        "batch_max_wait_ms": BATCH_MAX_WAIT_MS,
+        "batches": batch_stats.snapshot(),
+        "commits": (
+            {
+                "mode": COMMIT_MODE, "interval_ms": COMMIT_INTERVAL_MS,
+                "dead_letter_topic": DEAD_LETTER_TOPIC or None,
+                **offset_tracker.snapshot(), **commit_summary(),
+            }
+            if offset_tracker is not None else {"mode": COMMIT_MODE}
+        ),
+        "backpressure": {
+            "max_in_flight": PRODUCER_MAX_IN_FLIGHT,
+            "paused": bool(CONSUMER_PAUSED.value()),
+            "pauses": int(CONSUMER_PAUSES_TOTAL.value()),
+        },
+        "consumers": supervisor.snapshot() if supervisor else consumer_summary(),
+        "alert_debounce": alert_debounce_summary(),
+        "http_batching": batcher.snapshot(),
+        "logging": prediction_log.snapshot(),
+        "prediction_paths": {path: int(n) for (path,), n in predictions.items()},
+        "cascade": predictor.cascade_info(),
+        "prediction_cache": predictor.cache.snapshot() if predictor.cache else {"enabled": False},
+        "machine_state": (
+            predictor.machine_state.snapshot() if predictor.machine_state else {"enabled": False}
+        ),
+        "drift": drift_stats(),
+        "shadow": shadow_summary(),
+        "stage_seconds": {
+            stage: STAGE_SECONDS.snapshot((stage,))
+            for stage in ("decode", "features", "drift", "inference", "serialize", "produce")
+        },
     }
 
 
+def alert_debounce_summary() -> dict:
+    if debouncer is None:
+        return {"enabled": False}
+    events = {event: int(n) for (event,), n in ALERT_EVENTS_TOTAL.values().items()}
+    summary = {
+        "enabled": True,
+        "firehose_topic": PREDICTION_FIREHOSE_TOPIC or None,
+        "published_events": events,
+        "debounced": int(READINGS_DEBOUNCED_TOTAL.value()),
+    }
+    if supervisor is None:
+        summary.update(debouncer.snapshot())
+    else:
+        # Each worker debounces the machines of its own partitions
+        summary["workers"] = [
+            r["alert_debounce"] for r in supervisor.reports() if r.get("alert_debounce")
+        ]
+    return summary
+
+
+def shadow_summary() -> dict:
+    if predictor.shadow is None:
+        return {"enabled": False}
+    if supervisor is None:
+        return predictor.shadow_info()
+    # Each worker shadows a sample of its own batches
+    outcomes = {outcome: int(n) for (outcome,), n in SHADOW_READINGS_TOTAL.values().items()}
+    readings = sum(outcomes.values())
+    return {
+        "enabled": True,
+        "readings": readings,
+        "agreement": round(outcomes.get("agree", 0) / readings, 4) if readings else None,
+        "dropped_batches": int(SHADOW_BATCHES_DROPPED_TOTAL.value()),
+        "workers": [r["shadow"] for r in supervisor.reports() if r.get("shadow")],
+    }
+
+
+def drift_summary() -> dict:
+    """Drift scores of this process's window, or of all workers' windows combined."""
+    if predictor.drift is None:
+        return {"enabled": False}
+    if supervisor is None:
+        return {"enabled": True, **predictor.drift.scores()}
+    # Each worker counts the readings of its own partitions (and this
+    # process those sent to /predict); their windows add up
+    worker_counts = [r["drift_counts"] for r in supervisor.reports() if r.get("drift_counts")]
+    return {"enabled": True, **predictor.drift.scores(worker_counts)}
+
+
+def drift_stats() -> dict:
+    if predictor.drift is None:
+        return {"enabled": False}
+    summary = drift_summary()
+    return {
+        **predictor.drift.snapshot(),
+        "status": summary["status"],
+        "window_readings": summary["window_readings"],
+    }
+
+
+def drift_metric(score: str) -> dict:
+    summary = drift_summary()
+    return {
+        (name,): signal[score] for name, signal in summary["signals"].items()
+        if signal["status"] != "insufficient_data"
+    }
+
+
+@app.get("/drift")
+async def drift():
+    """
+    Per-signal drift of the recent readings from the training data
+    (DRIFT_WINDOW > 0): PSI, KS distance and stable / shifting / drifted.
+    """
+    if predictor.drift is None:
+        raise HTTPException(status_code=404, detail="Drift monitor disabled (DRIFT_WINDOW=0)")
+    return drift_summary()
+
+
+@app.get("/stats/machines/{machine_id}")
+async def machine_state(machine_id: str):
+    """
+    Rolling features (MACHINE_STATE_WINDOW > 0) and alert state
+    (ALERT_DEBOUNCE=on, thread consumer mode) of one machine.
+    """
+    trend = predictor.machine_state.get(machine_id) if predictor.machine_state else None
+    alert = debouncer.get(machine_id) if debouncer is not None else None
+    if trend is None and alert is None:
+        raise HTTPException(status_code=404, detail=f"No state for machine {machine_id!r}")
+    return {"machine_id": machine_id, "trend": trend, **({"alert": alert} if debouncer else {})}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the pipeline metrics."""
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def reload_model_path(path: str | None = None) -> dict:
+    """predictor.reload(path), then watch the model file now being served."""
+    result = predictor.reload(path)
+    if model_watcher is not None:
+        model_watcher.watch([predictor.model_path])
+    return result
+
+
+@app.post("/model/reload")
+async def reload_model(body: dict | None = None):
+    """
+    Load a new model version and swap it in without pausing inference.
+
+    Body (optional): {"path": "<model file or artifact directory>"};
+    defaults to reloading the current MODEL_PATH. The previous model keeps
+    serving while the new one loads and warms up, and if it fails.
+    MODEL_WATCH_INTERVAL_S then watches the new path instead.
+    In CONSUMER_MODE=processes the workers are told to reload the same
+    path once it has loaded here (see "consumers" in /health).
+    """
+    path = (body or {}).get("path")
+    try:
+        result = await asyncio.to_thread(reload_model_path, path)
+        if supervisor is not None:
+            result["workers_notified"] = supervisor.broadcast("reload", path)
+        return result
+    except ReloadInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ReloadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 @app.post("/predict")
 async def predict_endpoint(data: dict):
     """
     Direct HTTP inference endpoint (for testing or hybrid architecture).
     In production, inference happens via Kafka consumer loop.
+
+    Scored off the event loop; concurrent requests are batched together.
     """
-    result = predictor.predict(data)
+    try:
+        result = await batcher.submit(data)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except BatchTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    if "error" in result:
+        raise HTTPException(status_code=422, detail=result["error"])
     return result
 
 
+def score_stream_chunk(chunk: list, base: int) -> bytes:
+    """Score one chunk of parsed records and render it as NDJSON lines."""
+    outputs = iter(predictor.predict_batch([r for r in chunk if not isinstance(r, RecordError)]))
+    lines = []
+    for index, record in enumerate(chunk, start=base):
+        if isinstance(record, RecordError):
+            lines.append(to_ndjson({"index": index, "error": record.message}))
+        else:
+            lines.append(to_ndjson({"index": index, **next(outputs)}))
+    return b"".join(lines)
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request, format: str | None = None):
+    """
+    Bulk scoring for backfills: accepts NDJSON (one reading per line) or
+    CSV in the predictive_maintenance.csv schema (Content-Type: text/csv or
+    ?format=csv) and streams NDJSON results back chunk by chunk.
+
+    The upload is spooled (in memory up to STREAM_SPOOL_BYTES, then to a
+    temp file) because Starlette's StreamingResponse reads from the same
+    receive channel; scoring then reads it back in STREAM_CHUNK_SIZE
+    record chunks, so memory stays bounded regardless of upload size.
+    """
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    spool = tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_BYTES)
+    async for data in request.stream():
+        spool.write(data)
+    spool.seek(0)
+
+    def generate():
+        # Sync generator: Starlette iterates it in a worker thread, so
+        # scoring never blocks the event loop
+        try:
+            base = 0
+            for chunk in chunked(iter_records(spool, fmt), STREAM_CHUNK_SIZE):
+                yield score_stream_chunk(chunk, base)
+                base += len(chunk)
+        finally:
+            spool.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 # ─────────────────────────────────────────────────────────────
 # Entry Point
 # ─────────────────────────────────────────────────────────────
@@ -0,0 +1,379 @@
+"""
+Alerion AI — Pipeline Metrics
+
+Minimal, dependency-free Prometheus-style metrics (counters, gauges,
+histograms) rendered in the text exposition format on GET /metrics.
+
+Every update takes one short per-metric lock, so the consumer thread, the
+HTTP batcher threads and /metrics scrapes can touch the same metric
+safely. The consumer loop times whole batches, not single messages,
+which keeps the cost to a few lock acquisitions per batch.
+
+USAGE:
+    STAGE_SECONDS.observe(elapsed, ("inference",))
+    MESSAGES_TOTAL.inc(len(batch))
+    text = REGISTRY.render()
+"""
+
+import math
+import threading
+from bisect import bisect_left
+
+# Seconds; spans single-row inference up to multi-thousand-row batches
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+# Seconds; broker round trips, up to a stalled broker / retries
+BROKER_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _check_labels(self, labels: tuple):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {} if labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1, labels: tuple = ()):
+        with self._lock:
+            try:
+                self._values[labels] += amount
+            except KeyError:
+                self._check_labels(labels)
+                self._values[labels] = amount
+
+    def value(self, labels: tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def values(self) -> dict[tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in sorted(self.values().items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, labels: tuple = ()):
+        with self._lock:
+            if labels not in self._values:
+                self._check_labels(labels)
+            self._values[labels] = value
+
+    def dec(self, amount: float = 1, labels: tuple = ()):
+        self.inc(-amount, labels)
+
+    def clear(self):
+        with self._lock:
+            self._values = {} if self.labelnames else {(): 0.0}
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with sum and count, per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels → [bucket counts (non-cumulative) + overflow, sum]
+
+    def observe(self, value: float, labels: tuple = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                self._check_labels(labels)
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def snapshot(self, labels: tuple = ()) -> dict:
+        """Count, sum and approximate p50/p99 (bucket upper bounds)."""
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                return {"count": 0, "sum": 0.0}
+            counts, total = list(series[0]), series[1]
+
+        n = sum(counts)
+        return {
+            "count": n,
+            "sum": total,
+            "p50_le": self._quantile_bound(counts, n, 0.50),
+            "p99_le": self._quantile_bound(counts, n, 0.99),
+        }
+
+    def _quantile_bound(self, counts: list, n: int, q: float) -> float:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            if cumulative >= q * n:
+                return bound
+        return math.inf
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            series = {labels: (list(s[0]), s[1]) for labels, s in self._series.items()}
+
+        lines = []
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Collected(_Metric):
+    """
+    Counter or gauge whose samples are read from a callback at scrape
+    time, for components that already keep their own counts.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._collect = None
+
+    def set_function(self, collect):
+        """collect() → {labels tuple: value}; None detaches the source."""
+        with self._lock:
+            self._collect = collect
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            collect = self._collect
+        if collect is None:
+            return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in sorted(collect().items())
+        ]
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+# ─── Inference pipeline ──────────────────────────────────────
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "alerion_stage_seconds",
+    "Time per batch spent in each pipeline stage "
+    "(decode, features, drift, inference, serialize, produce).",
+    ("stage",),
+))
+BATCH_SIZES = REGISTRY.register(Histogram(
+    "alerion_batch_size",
+    "Messages per consumed batch.",
+    buckets=BATCH_SIZE_BUCKETS,
+))
+MESSAGES_TOTAL = REGISTRY.register(Counter(
+    "alerion_messages_processed_total",
+    "Consumed messages scored and published (ALERT_DEBOUNCE=on: including debounced ones).",
+))
+ALERTS_TOTAL = REGISTRY.register(Counter(
+    "alerion_alerts_total",
+    "Published predictions with prediction == 1 (ALERT_DEBOUNCE=on: raised / changed alerts).",
+))
+ALERT_EVENTS_TOTAL = REGISTRY.register(Counter(
+    "alerion_alert_events_total",
+    "Readings published by the alert debouncer, by event (raised, changed, cleared, heartbeat).",
+    ("event",),
+))
+READINGS_DEBOUNCED_TOTAL = REGISTRY.register(Counter(
+    "alerion_readings_debounced_total",
+    "Scored readings the alert debouncer kept off the prediction topic.",
+))
+INVALID_MESSAGES_TOTAL = REGISTRY.register(Counter(
+    "alerion_invalid_messages_total",
+    "Consumed messages skipped because they could not be decoded or parsed into a reading.",
+))
+PREDICTIONS_TOTAL = REGISTRY.register(Counter(
+    "alerion_predictions_total",
+    "Readings scored, by path (model or heuristic fallback).",
+    ("path",),
+))
+DELIVERY_FAILURES_TOTAL = REGISTRY.register(Counter(
+    "alerion_delivery_failures_total",
+    "Produced messages the broker failed to deliver.",
+))
+PREDICTION_CACHE_EVENTS = REGISTRY.register(Collected(
+    "alerion_prediction_cache_events_total",
+    "Prediction cache lookups and removals, by event "
+    "(hit, miss, eviction, expiration, invalidation).",
+    ("event",),
+    kind="counter",
+))
+PREDICTION_CACHE_ENTRIES = REGISTRY.register(Collected(
+    "alerion_prediction_cache_entries",
+    "Model outputs currently held in the prediction cache.",
+))
+FEATURE_DRIFT_PSI = REGISTRY.register(Collected(
+    "alerion_feature_drift_psi",
+    "Population stability index of the recent readings against the training data, per signal "
+    "(DRIFT_WINDOW > 0; only once the window holds DRIFT_MIN_READINGS readings).",
+    ("signal",),
+))
+FEATURE_DRIFT_KS = REGISTRY.register(Collected(
+    "alerion_feature_drift_ks",
+    "Kolmogorov-Smirnov distance of the recent readings from the training data, per signal.",
+    ("signal",),
+))
+DRIFT_WINDOW_READINGS = REGISTRY.register(Collected(
+    "alerion_drift_window_readings",
+    "Readings in the drift monitor's sliding window.",
+))
+SHADOW_READINGS_TOTAL = REGISTRY.register(Counter(
+    "alerion_shadow_readings_total",
+    "Readings scored by the shadow model (SHADOW_MODEL_PATH), by outcome against the primary "
+    "(agree, disagree on failure_type).",
+    ("outcome",),
+))
+SHADOW_BATCHES_DROPPED_TOTAL = REGISTRY.register(Counter(
+    "alerion_shadow_batches_dropped_total",
+    "Sampled batches not shadow-scored because the shadow queue was full.",
+))
+MODEL_INFERENCE_SECONDS = REGISTRY.register(Histogram(
+    "alerion_model_inference_seconds",
+    "Inference time of the primary and shadow models on the same shadow-sampled batches.",
+    ("model",),
+))
+CONSUMER_LAG = REGISTRY.register(Gauge(
+    "alerion_consumer_lag",
+    "High watermark minus consumer position, per assigned partition.",
+    ("topic", "partition"),
+))
+
+# ─── Delivery, commits and backpressure ──────────────────────
+
+DELIVERY_SECONDS = REGISTRY.register(Histogram(
+    "alerion_delivery_seconds",
+    "Time from produce() to the broker's delivery report (COMMIT_MODE=delivery).",
+    buckets=BROKER_BUCKETS,
+))
+COMMIT_SECONDS = REGISTRY.register(Histogram(
+    "alerion_commit_seconds",
+    "Offset commit round trip (COMMIT_MODE=delivery).",
+    buckets=BROKER_BUCKETS,
+))
+COMMIT_FAILURES_TOTAL = REGISTRY.register(Counter(
+    "alerion_commit_failures_total",
+    "Offset commits that failed (retried at the next commit interval).",
+))
+UNCOMMITTED_MESSAGES = REGISTRY.register(Collected(
+    "alerion_uncommitted_messages",
+    "Consumed messages whose offset cannot be committed yet (COMMIT_MODE=delivery).",
+))
+DELIVERY_RETRIES_TOTAL = REGISTRY.register(Counter(
+    "alerion_delivery_retries_total",
+    "Predictions produced again after a failed delivery.",
+))
+UNDELIVERED_OUTPUTS_TOTAL = REGISTRY.register(Counter(
+    "alerion_undelivered_outputs_total",
+    "Outputs whose delivery failed for good, by outcome (dead_lettered to DEAD_LETTER_TOPIC, "
+    "dropped); their offsets are committed either way.",
+    ("outcome",),
+))
+COMMIT_STALL_SECONDS = REGISTRY.register(Collected(
+    "alerion_commit_stall_seconds",
+    "Seconds since the partition's commit point last advanced while consumed messages wait "
+    "behind it (COMMIT_MODE=delivery).",
+    ("topic", "partition"),
+))
+PRODUCER_QUEUE_FULL_TOTAL = REGISTRY.register(Counter(
+    "alerion_producer_queue_full_total",
+    "produce() calls that found the producer queue full and waited.",
+))
+CONSUMER_PAUSES_TOTAL = REGISTRY.register(Counter(
+    "alerion_consumer_pauses_total",
+    "Times consumption was paused because too many outputs were in flight.",
+))
+CONSUMER_PAUSED = REGISTRY.register(Gauge(
+    "alerion_consumer_paused",
+    "1 while consumption is paused for producer backpressure.",
+))
@@ -0,0 +1,156 @@
+"""
+Alerion AI — Model Artifact Loading
+
+Loads the trained model either as a private per-process copy or
+memory-mapped from a flat array export, and records what the load cost
+the process so /health can report it.
+
+LOAD MODES:
+• pickle — joblib.load; every worker process holds its own copy.
+• mmap   — tree ensembles are exported once to uncompressed .npy files
+           (CompiledForest.save) next to the model and memory-mapped
+           read-only, so N workers on one host share a single physical
+           copy through the page cache. The export is rebuilt when the
+           model file changes. Models that cannot be compiled are loaded
+           with joblib's mmap_mode instead, which maps their numpy arrays
+           when the artifact is uncompressed.
+
+joblib's mmap_mode on its own does not help sklearn forests: every Tree
+copies its node arrays into private memory while being unpickled.
+
+USAGE:
+    model, info = load_model("./model/model.pkl", mode="mmap")
+    info   # {"load_mode": "mmap", "load_seconds": 0.004, "private_delta_bytes": ..., ...}
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from typing import Any
+
+import joblib
+
+LOAD_MODES = ("pickle", "mmap")
+
+# /proc/self/status fields reported by process_memory (values in kB)
+_STATUS_FIELDS = {"VmRSS": "rss_bytes", "RssAnon": "private_bytes", "RssFile": "file_backed_bytes"}
+
+
+def default_array_dir(model_path: str) -> str:
+    """Where the mmap export of model_path lives unless configured."""
+    return os.path.splitext(model_path)[0] + "_arrays"
+
+
+def process_memory() -> dict[str, int]:
+    """
+    Current RSS of this process, split into private (anonymous) and
+    file-backed pages. Memory-mapped model arrays count as file-backed and
+    are shared with every other process mapping the same files.
+    Returns {} where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            lines = f.readlines()
+    except OSError:
+        return {}
+
+    memory = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        if name in _STATUS_FIELDS:
+            memory[_STATUS_FIELDS[name]] = int(value.split()[0]) * 1024
+    return memory
+
+
+def load_model(model_path: str, mode: str = "pickle", array_dir: str | None = None) -> tuple[Any, dict]:
+    """
+    Load the model at model_path.
+
+    Returns the model (a CompiledForest in mmap mode when the model is a
+    tree ensemble) and a dict describing the load: effective mode, wall
+    time and the growth in this process's RSS / private memory.
+
+    Raises:
+        ValueError: for an unknown mode.
+    """
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown model load mode {mode!r}, expected one of {LOAD_MODES}")
+
+    before = process_memory()
+    start = time.perf_counter()
+
+    if mode == "mmap":
+        model, info = _load_mapped(model_path, array_dir or default_array_dir(model_path))
+    else:
+        model, info = joblib.load(model_path), {"load_mode": "pickle"}
+
+    info["load_seconds"] = round(time.perf_counter() - start, 4)
+    after = process_memory()
+    for key, delta_key in (("rss_bytes", "rss_delta_bytes"), ("private_bytes", "private_delta_bytes")):
+        if key in before and key in after:
+            info[delta_key] = after[key] - before[key]
+    info["pid"] = os.getpid()
+    return model, info
+
+
+def _load_mapped(model_path: str, array_dir: str) -> tuple[Any, dict]:
+    from forest import CompiledForest, read_export_meta
+
+    source = _source_stamp(model_path)
+    try:
+        fresh = read_export_meta(array_dir).get("source") == source
+    except (OSError, ValueError):
+        fresh = False
+
+    if not fresh:
+        model = joblib.load(model_path)
+        try:
+            forest = CompiledForest.from_sklearn(model)
+        except TypeError as e:
+            print(f"[ModelStore] ⚠️  Cannot export model arrays ({e}) — using joblib mmap_mode")
+            del model
+            return joblib.load(model_path, mmap_mode="r"), {"load_mode": "joblib-mmap"}
+        _export(forest, array_dir, source)
+        # Drop the private copies; this process maps the export like the others
+        del model, forest
+        print(f"[ModelStore] Exported model arrays to: {array_dir}")
+
+    forest = CompiledForest.load(array_dir, mmap_mode="r")
+    return forest, {
+        "load_mode": "mmap",
+        "array_dir": array_dir,
+        "mapped_bytes": forest.nbytes,
+        "exported": not fresh,
+    }
+
+
+def _source_stamp(model_path: str) -> dict:
+    stat = os.stat(model_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _export(forest, array_dir: str, source: dict):
+    """
+    Write the export beside array_dir and rename it into place, so workers
+    starting concurrently never map a half-written export. Processes still
+    mapping a replaced export keep their (unlinked) files until they exit.
+    """
+    parent = os.path.dirname(os.path.abspath(array_dir))
+    tmp_dir = tempfile.mkdtemp(prefix=".arrays-", dir=parent)
+    forest.save(tmp_dir, source=source)
+
+    stale_dir = None
+    if os.path.isdir(array_dir):
+        stale_dir = tempfile.mkdtemp(prefix=".arrays-stale-", dir=parent)
+        try:
+            os.replace(array_dir, os.path.join(stale_dir, "arrays"))
+        except OSError:
+            pass  # another worker moved it first
+    try:
+        os.rename(tmp_dir, array_dir)
+    except OSError:
+        # Another worker published its export first; use that one
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if stale_dir is not None:
+        shutil.rmtree(stale_dir, ignore_errors=True)
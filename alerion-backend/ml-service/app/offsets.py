@@ -0,0 +1,133 @@
+"""
+Alerion AI — At-Least-Once Offset Tracking
+
+With COMMIT_MODE=delivery the consumer commits an offset only once every
+message up to it is finished: its prediction was acknowledged by the
+broker (delivery callback), or it produced no output at all (undecodable
+or unparseable message, partition EOF). Outputs are delivered out of
+order across partitions and, after retries, within one, so each
+partition keeps its consumed offsets in order and the commit point
+advances over the longest finished prefix:
+
+    consumed   100 101 102 103 104
+    finished    ✓   ✓       ✓           → commit 102 (next offset to read)
+
+A crash therefore replays at most the uncommitted messages (duplicates
+downstream are possible, lost predictions are not). stalls() tells how
+long each partition's commit point has not moved while messages wait
+behind it, so a message that is never finished shows up (/health,
+/metrics) before backpressure stops consumption.
+
+Consumption, delivery callbacks and commits all run on the consumer
+thread; the lock only guards the counts read by /stats and /metrics.
+
+USAGE:
+    tracker = OffsetTracker()
+    tracker.track(msg.topic(), msg.partition(), msg.offset())
+    tracker.done(topic, partition, offset)        # from the delivery callback
+    for topic, partition, offset in tracker.committable(): ...
+    tracker.committed([(topic, partition, offset)])
+    tracker.stalls()                              # {(topic, partition): seconds}
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class _PartitionOffsets:
+    __slots__ = ("pending", "finished", "commit_point", "committed", "advanced_at")
+
+    def __init__(self):
+        self.pending = deque()  # consumed, in order, not yet behind the commit point
+        self.finished = set()  # finished offsets still in `pending`
+        self.commit_point = None  # next offset to read after the finished prefix
+        self.committed = None  # last commit_point acknowledged by the group coordinator
+        self.advanced_at = 0.0  # monotonic time the head of `pending` last changed
+
+
+class OffsetTracker:
+    """Per-partition commit points over the finished prefix of consumed offsets."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._partitions = {}  # (topic, partition) → _PartitionOffsets
+
+    def track(self, topic: str, partition: int, offset: int):
+        """Register a consumed message (call in consumption order)."""
+        key = (topic, partition)
+        with self._lock:
+            state = self._partitions.get(key)
+            if state is None:
+                state = self._partitions[key] = _PartitionOffsets()
+            if not state.pending:
+                state.advanced_at = time.monotonic()
+            state.pending.append(offset)
+
+    def done(self, topic: str, partition: int, offset: int):
+        """Mark a tracked message finished; advances the commit point if it can."""
+        with self._lock:
+            state = self._partitions.get((topic, partition))
+            if state is None:
+                return  # partition revoked meanwhile; its new owner replays it
+            state.finished.add(offset)
+            pending, finished = state.pending, state.finished
+            if pending and pending[0] in finished:
+                while pending and pending[0] in finished:
+                    finished.discard(pending[0])
+                    state.commit_point = pending.popleft() + 1
+                state.advanced_at = time.monotonic()
+
+    def committable(self, partitions=None) -> list[tuple[str, int, int]]:
+        """(topic, partition, offset) whose commit point moved since the last commit."""
+        with self._lock:
+            return [
+                (topic, partition, state.commit_point)
+                for (topic, partition), state in self._partitions.items()
+                if state.commit_point is not None
+                and state.commit_point != state.committed
+                and (partitions is None or (topic, partition) in partitions)
+            ]
+
+    def committed(self, offsets: list[tuple[str, int, int]]):
+        with self._lock:
+            for topic, partition, offset in offsets:
+                state = self._partitions.get((topic, partition))
+                if state is not None:
+                    state.committed = offset
+
+    def revoke(self, partitions):
+        """Forget revoked (topic, partition) pairs; late callbacks for them are ignored."""
+        with self._lock:
+            for key in partitions:
+                self._partitions.pop(key, None)
+
+    def outstanding(self) -> int:
+        """Consumed messages not yet behind a commit point."""
+        with self._lock:
+            return sum(len(state.pending) for state in self._partitions.values())
+
+    def stalls(self) -> dict:
+        """Seconds since each partition with waiting messages last advanced its commit point."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: now - state.advanced_at
+                for key, state in self._partitions.items() if state.pending
+            }
+
+    def snapshot(self) -> dict:
+        stalls = self.stalls()
+        with self._lock:
+            return {
+                "partitions": len(self._partitions),
+                "outstanding": sum(len(s.pending) for s in self._partitions.values()),
+                "awaiting_delivery": sum(
+                    len(s.pending) - len(s.finished) for s in self._partitions.values()
+                ),
+                "max_commit_stall_s": round(max(stalls.values(), default=0.0), 3),
+                "committed": {
+                    f"{topic}[{partition}]": s.committed
+                    for (topic, partition), s in sorted(self._partitions.items())
+                },
+            }
@@ -6,7 +6,15 @@ Falls back to heuristic-based prediction if model file is not found.
 
 USAGE:
     predictor = ModelPredictor("./model/model.pkl")
+    predictor = ModelPredictor("./model/model.pkl", load_mode="mmap")  # shared across workers
+    predictor = ModelPredictor("./model/model.pkl", cache_size=100_000, cache_ttl_s=300)
+    predictor = ModelPredictor("./model/model.pkl", state_window=32)  # adds per-machine "trend"
+    predictor = ModelPredictor("./model/model.pkl", cascade=True)     # gate from ./model/cascade.json
+    predictor = ModelPredictor("./model/model.pkl", drift_window=10_000)  # ./model/drift_reference.json
+    predictor = ModelPredictor("./model/model.pkl", shadow_model_path="./model/xgboost.pkl")
     result = predictor.predict(machine_data_dict)
+    results = predictor.predict_batch([machine_data_dict, ...])
+    predictor.reload("/models/v42")          # zero-downtime swap, see hotreload.py
 
 PRODUCTION NOTES:
 • Model file should be mounted as a Docker volume or baked into the image.
@@ -18,11 +26,16 @@ PRODUCTION NOTES:
 import os
 import math
 import random
+import time
 from typing import Any
 
+from cache import PredictionCache
+from hotreload import ArtifactSwap, artifact_version, file_sha256
+from metrics import PREDICTIONS_TOTAL, STAGE_SECONDS
+
 # Optional imports — gracefully handle missing packages
 try:
-    import joblib
+    from modelstore import load_model  # needs joblib
     JOBLIB_AVAILABLE = True
 except ImportError:
     JOBLIB_AVAILABLE = False
@@ -39,6 +52,126 @@ try:
 except ImportError:
     PANDAS_AVAILABLE = False
 
+try:
+    from forest import InferenceEngine
+    FOREST_AVAILABLE = True
+except ImportError:
+    FOREST_AVAILABLE = False
+
+try:
+    from features import READING_DEFAULTS, load_pipeline, parse_reading
+    FEATURES_AVAILABLE = True
+except ImportError:
+    FEATURES_AVAILABLE = False
+
+try:
+    from cascade import CascadeGate, gate_signals
+    CASCADE_AVAILABLE = True
+except ImportError:
+    CASCADE_AVAILABLE = False
+
+try:
+    from machinestate import MachineStateStore, trend_dicts
+    MACHINE_STATE_AVAILABLE = True
+except ImportError:
+    MACHINE_STATE_AVAILABLE = False
+
+try:
+    from drift import REFERENCE_FILE, DriftMonitor, DriftReference
+    DRIFT_AVAILABLE = True
+except ImportError:
+    DRIFT_AVAILABLE = False
+
+try:
+    from shadow import ShadowEvaluator
+    SHADOW_AVAILABLE = True
+except ImportError:
+    SHADOW_AVAILABLE = False
+
+
+# Column positions in the vector built by ModelPredictor._extract_features
+COL_AIR_TEMP = 0
+COL_PROCESS_TEMP = 1
+COL_ROTATIONAL_SPEED = 2
+COL_TORQUE = 3
+COL_TOOL_WEAR = 4
+COL_MACHINE_TYPE = 5
+
+# Sensor resolution per feature column (K, K, rpm, Nm, min, type code).
+# Prediction cache keys are the feature vector rounded to these steps, so
+# readings that differ only below sensor precision share one model output.
+FEATURE_QUANTA = (0.1, 0.1, 1.0, 0.1, 1.0, 1.0)
+# Rows with a feature outside ±CACHE_KEY_LIMIT (or NaN) bypass the cache
+CACHE_KEY_LIMIT = 1e12
+
+# Cascade gate limits, looked up next to the model file (see cascade.py)
+CASCADE_FILE = "cascade.json"
+
+# Synthetic readings scored by a reloaded model before it is swapped in
+WARMUP_ROWS = 64
+
+# Labels indexed by the failure codes of ModelPredictor.predict_array
+FAILURE_TYPES = (
+    "Tool Wear Failure",
+    "Heat Dissipation Failure",
+    "Overstrain Failure",
+    "Power Failure",
+    "Random Failures",
+    "No Failure",
+)
+NO_FAILURE = FAILURE_TYPES.index("No Failure")
+
+
+class ModelState:
+    """
+    One loaded model version: the model, its inference engine, its
+    cascade gate (if any), its feature pipeline and load details. Never
+    mutated after construction — a reload builds a new state and swaps
+    the reference, so a batch that captured a state scores entirely with
+    that version.
+
+    Model outputs are labels: 0/1 for a binary failure model, or an index
+    into FAILURE_TYPES for a failure-type model trained by ml/ (its
+    metadata.json "classes" name the model's classes).
+    """
+
+    def __init__(
+        self, model, engine, load_info: dict, model_path: str, generation: int,
+        gate=None, pipeline=None, classes=None,
+    ):
+        self.model = model
+        self.engine = engine
+        self.gate = gate
+        # None without numpy: raw feature rows go to the model unchanged
+        self.pipeline = pipeline
+        self.multiclass = classes is not None
+        if self.multiclass:
+            self.labels = np.array(
+                [FAILURE_TYPES.index(classes[int(c)]) for c in model.classes_], dtype=np.int64)
+            self.healthy_label = NO_FAILURE
+        else:
+            self.labels = (
+                np.asarray(model.classes_, dtype=np.int64)
+                if NUMPY_AVAILABLE and hasattr(model, "classes_") else None
+            )
+            self.healthy_label = 0
+        self.load_info = load_info
+        self.model_path = model_path
+        self.sha256 = file_sha256(model_path)
+        self.version = artifact_version(os.path.dirname(os.path.abspath(model_path)), self.sha256)
+        # Prediction cache generation owned by this model version
+        self.generation = generation
+        self.loaded_at = time.time()
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "sha256": self.sha256,
+            "path": self.model_path,
+            "loaded_at": self.loaded_at,
+            "features": self.pipeline.describe() if self.pipeline is not None else None,
+        }
+
 
 class ModelPredictor:
     """
@@ -49,11 +182,85 @@ class ModelPredictor:
     the predictive_maintenance dataset patterns.
     """
 
-    def __init__(self, model_path: str = "./model/model.pkl"):
+    def __init__(
+        self,
+        model_path: str = "./model/model.pkl",
+        engine: str = "sklearn",
+        compiled_max_batch: int = 256,
+        load_mode: str = "pickle",
+        array_dir: str | None = None,
+        cache_size: int = 0,
+        cache_ttl_s: float | None = None,
+        state_window: int = 0,
+        state_max_machines: int = 50_000,
+        cascade: bool = False,
+        drift_window: int = 0,
+        drift_slices: int = 10,
+        drift_min_readings: int = 500,
+        drift_reference: str | None = None,
+        shadow_model_path: str | None = None,
+        shadow_fraction: float = 0.1,
+        shadow_max_pending: int = 8,
+    ):
         self.model_path = model_path
-        self.model = None
-        self.model_loaded = False
+        self.engine_mode = engine
+        self.compiled_max_batch = compiled_max_batch
+        self.load_mode = load_mode
+        self.array_dir = array_dir
+        self.cascade = cascade
+        # Model outputs keyed on quantized features; cache_size=0 disables it
+        self.cache = PredictionCache(cache_size, cache_ttl_s) if cache_size > 0 else None
+        # Rolling per-machine features, attached to results as "trend"
+        # (state_window=0 disables it)
+        self.machine_state = None
+        if state_window > 0:
+            if MACHINE_STATE_AVAILABLE:
+                self.machine_state = MachineStateStore(state_window, state_max_machines)
+            else:
+                print("[Predictor] ⚠️  numpy not installed — machine state disabled")
+        # Sliding-window histograms of incoming readings against the training
+        # distribution (drift_window=0 disables it; see drift.py)
+        self.drift = None
+        if drift_window > 0:
+            self.drift = self._load_drift(
+                drift_reference, drift_window, drift_slices, drift_min_readings)
+        self.swap = ArtifactSwap(self._load_state, self._warm_up)
         self._load_model()
+        # Candidate model scoring a sample of batches in the background
+        # (see shadow.py); its results are compared, never published
+        self.shadow_state = None
+        self.shadow = None
+        if shadow_model_path:
+            self._load_shadow(shadow_model_path, shadow_fraction, shadow_max_pending)
+
+    # The active ModelState (None → heuristic fallback). Hot paths read it
+    # once per call; these properties are for status reporting.
+    @property
+    def model(self):
+        state = self.swap.current
+        return state.model if state is not None else None
+
+    @property
+    def engine(self):
+        state = self.swap.current
+        return state.engine if state is not None else None
+
+    @property
+    def model_loaded(self) -> bool:
+        return self.swap.current is not None
+
+    @property
+    def load_info(self) -> dict:
+        state = self.swap.current
+        return state.load_info if state is not None else {}
+
+    def model_info(self) -> dict:
+        """Active model version and checksum, plus reload history."""
+        state = self.swap.current
+        return {
+            **(state.describe() if state is not None else {"version": None, "sha256": None}),
+            "reload": self.swap.snapshot(),
+        }
 
     def _load_model(self):
         """Attempt to load trained model from file."""
@@ -67,14 +274,198 @@ class ModelPredictor:
             return
 
         try:
-            self.model = joblib.load(self.model_path)
-            self.model_loaded = True
+            state = self._load_state(self.model_path)
+            self.swap.current = state
+            if self.cache is not None:
+                self.cache.invalidate(state.generation)
             print(f"[Predictor] ✅ Model loaded from: {self.model_path}")
-            print(f"[Predictor] Model type: {type(self.model).__name__}")
+            print(f"[Predictor] Model type: {type(state.model).__name__}")
+            print(f"[Predictor] Version: {state.version} (sha256 {state.sha256[:12]})")
+            print(f"[Predictor] Load: {state.load_info['load_mode']} in {state.load_info['load_seconds']}s")
+            if state.engine is not None:
+                print(f"[Predictor] Inference engine: {state.engine.describe()}")
+            if state.pipeline is not None and not state.pipeline.passthrough:
+                print(f"[Predictor] Features: {state.pipeline.width} columns from metadata.json"
+                      f"{', scaled' if state.pipeline.mean is not None else ''}")
+            if state.gate is not None:
+                print(f"[Predictor] Cascade gate: {state.gate.info.get('train_coverage')} "
+                      f"training coverage, confidence {state.gate.confidence:.4f}")
         except Exception as e:
             print(f"[Predictor] ❌ Failed to load model: {e}")
             print("[Predictor] Using heuristic fallback prediction")
 
+    def reload(self, model_path: str | None = None) -> dict:
+        """
+        Load a new model (file, or artifact directory containing model.pkl),
+        warm it up and swap it in without pausing prediction.
+
+        Raises:
+            ReloadError: the new model failed to load or warm up; the
+                         current one keeps serving.
+            ReloadInProgressError: another reload is running.
+        """
+        path = model_path or self.model_path
+        if os.path.isdir(path):
+            path = os.path.join(path, "model.pkl")
+
+        state = self.swap.reload(path)
+        if self.cache is not None:
+            self.cache.invalidate(state.generation)
+        self.model_path = path
+        print(f"[Predictor] 🔄 Model reloaded: version {state.version} from {path} "
+              f"in {self.swap.last_reload_seconds}s")
+        return self.model_info()
+
+    def _load_state(self, model_path: str, shadow: bool = False) -> ModelState:
+        """
+        Load a model file into a new, not yet active ModelState. A shadow
+        state has no cascade gate and never shares MODEL_ARRAY_DIR.
+        """
+        if not JOBLIB_AVAILABLE:
+            raise RuntimeError("joblib not installed")
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+
+        pipeline, classes = self._load_pipeline(model_path)
+        model, load_info = load_model(
+            model_path, self.load_mode, None if shadow else self.array_dir)
+        n_features = getattr(model, "n_features_in_", None)
+        if pipeline is not None and n_features is not None and n_features != pipeline.width:
+            raise ValueError(
+                f"model expects {n_features} features, feature pipeline builds {pipeline.width}")
+        generation = self.cache.generation + 1 if self.cache is not None else 0
+        return ModelState(
+            model, self._build_engine(model), load_info, model_path, generation,
+            None if shadow else self._load_gate(model_path), pipeline, classes,
+        )
+
+    def _load_shadow(self, model_path: str, fraction: float, max_pending: int):
+        """Load the shadow model; on failure the primary keeps serving without one."""
+        if not SHADOW_AVAILABLE:
+            print("[Predictor] ⚠️  numpy not installed — shadow model disabled")
+            return
+        try:
+            state = self._load_state(model_path, shadow=True)
+            self._warm_up(state)
+        except Exception as e:
+            print(f"[Predictor] ⚠️  Shadow model not loaded ({e}) — shadow evaluation disabled")
+            return
+        self.shadow_state = state
+        self.shadow = ShadowEvaluator(
+            self._shadow_outputs, FAILURE_TYPES, fraction, max_pending,
+            info={"model": os.path.basename(model_path), "path": model_path, "sha256": state.sha256},
+        )
+        print(f"[Predictor] Shadow model: {type(state.model).__name__} from {model_path} "
+              f"on {fraction:.0%} of batches")
+
+    def _shadow_outputs(self, features: "np.ndarray") -> tuple["np.ndarray", "np.ndarray"]:
+        """Prediction and failure code arrays of the shadow model (no cache, no gate)."""
+        state = self.shadow_state
+        label, _ = self._model_outputs(features, state)
+        if state.multiclass:
+            return (label != NO_FAILURE).astype(np.int64), label
+        return label, self._classify_failure_array(features, label)
+
+    def shadow_info(self) -> dict:
+        """Agreement, confusion and latency of the shadow model against the primary."""
+        if self.shadow is None:
+            return {"enabled": False}
+        return {"enabled": True, "primary": self.model_info()["version"], **self.shadow.snapshot()}
+
+    def _load_pipeline(self, model_path: str):
+        """
+        Feature pipeline and class names from the metadata.json (and
+        scaler.pkl) beside the model; the raw 6-column layout without one.
+        """
+        if not FEATURES_AVAILABLE:
+            return None, None
+        pipeline, metadata = load_pipeline(os.path.dirname(os.path.abspath(model_path)))
+        classes = metadata.get("classes") if metadata is not None else None
+        if classes is not None:
+            unknown = set(classes) - set(FAILURE_TYPES)
+            if unknown:
+                raise ValueError(f"metadata classes are not failure types: {sorted(unknown)}")
+        return pipeline, classes
+
+    def _load_drift(
+        self, reference_path: str | None, window: int, slices: int, min_readings: int
+    ):
+        """Drift monitor over the reference beside the model (or at reference_path)."""
+        if not DRIFT_AVAILABLE:
+            print("[Predictor] ⚠️  numpy not installed — drift monitor disabled")
+            return None
+        if reference_path is None:
+            reference_path = os.path.join(
+                os.path.dirname(os.path.abspath(self.model_path)), REFERENCE_FILE)
+        if not os.path.exists(reference_path):
+            print(f"[Predictor] ⚠️  Drift reference not found: {reference_path} — drift monitor disabled")
+            return None
+        reference = DriftReference.load(reference_path)
+        print(f"[Predictor] Drift monitor: {len(reference.signals)} signals, window {window} readings")
+        return DriftMonitor(reference, window, slices, min_readings)
+
+    def _load_gate(self, model_path: str):
+        """Cascade gate stored beside the model, when cascade mode is on."""
+        if not self.cascade:
+            return None
+        if not CASCADE_AVAILABLE:
+            print("[Predictor] ⚠️  numpy not installed — cascade mode disabled")
+            return None
+        gate_path = os.path.join(os.path.dirname(os.path.abspath(model_path)), CASCADE_FILE)
+        if not os.path.exists(gate_path):
+            print(f"[Predictor] ⚠️  Cascade gate not found: {gate_path} — scoring every reading")
+            return None
+        return CascadeGate.load(gate_path)
+
+    def cascade_info(self) -> dict:
+        """Active gate limits and how many readings it answered without the model."""
+        state = self.swap.current
+        gate = state.gate if state is not None else None
+        skipped = PREDICTIONS_TOTAL.value(("cascade",))
+        scored = PREDICTIONS_TOTAL.value(("model",))
+        return {
+            "enabled": gate is not None,
+            **(gate.describe() if gate is not None else {}),
+            "skipped": int(skipped),
+            "scored": int(scored),
+            "skip_rate": round(skipped / (skipped + scored), 4) if skipped + scored else 0.0,
+        }
+
+    def _build_engine(self, model):
+        """Wrap the model in the configured inference engine (sklearn / compiled / auto)."""
+        if self.engine_mode == "sklearn" or not hasattr(model, "predict_proba"):
+            return None
+        if not FOREST_AVAILABLE:
+            print("[Predictor] ⚠️  numpy not installed — compiled engine unavailable")
+            return None
+        return InferenceEngine(model, self.engine_mode, self.compiled_max_batch)
+
+    def _warm_up(self, state: ModelState):
+        """Score a synthetic batch with a new state before it goes live."""
+        if not NUMPY_AVAILABLE:
+            return
+        readings = [
+            {
+                "machine_type": "LMH"[i % 3],
+                "air_temperature": 295.0 + (i % 10),
+                "process_temperature": 305.0 + (i % 12),
+                "rotational_speed": 1200.0 + 25 * i,
+                "torque": 10.0 + i,
+                "tool_wear": float(4 * i),
+            }
+            for i in range(WARMUP_ROWS)
+        ]
+        features = np.array([self._extract_features(data) for data in readings], dtype=np.float64)
+        prediction, confidence = self._model_outputs(features, state)
+        if len(prediction) != WARMUP_ROWS or not np.isfinite(confidence).all():
+            raise ValueError("warm-up batch returned malformed predictions")
+
+    def _predict_proba(self, features, state: ModelState) -> Any:
+        """Class probabilities from the state's engine."""
+        if state.engine is not None:
+            return state.engine.predict_proba(features)
+        return state.model.predict_proba(features)
+
     def predict(self, data: dict[str, Any]) -> dict[str, Any]:
         """
         Run prediction on machine telemetry data.
@@ -90,12 +481,269 @@ class ModelPredictor:
                 confidence: float 0.0–1.0
                 anomalyScore: float 0.0–1.0
                 failure_type: string
+                trend: rolling per-machine features (only with state_window)
         """
-        if self.model_loaded and self.model is not None:
-            return self._model_predict(data)
+        result = self._predict_one(data)
+        if self.drift is not None:
+            self._observe_drift([data])
+        if self.machine_state is not None:
+            self._attach_trends([data], [result])
+        return result
+
+    def _predict_one(self, data: dict[str, Any]) -> dict[str, Any]:
+        state = self.swap.current
+        if state is not None:
+            return self._model_predict(data, state)
         return self._heuristic_predict(data)
 
-    def _model_predict(self, data: dict[str, Any]) -> dict[str, Any]:
+    def predict_batch(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Run prediction on a batch of telemetry readings.
+
+        Each reading is parsed once into a row of a single feature matrix,
+        which is then scored by predict_array(). Output order matches input
+        order, and every entry is identical to what predict() returns for
+        the same reading. A reading predict() would reject (a sensor value
+        that is not a number) gets {"error": message} instead, so it cannot
+        fail the rest of the batch.
+        """
+        results = self._predict_batch(records)
+        if self.machine_state is not None and results:
+            self._attach_trends(records, results)
+        return results
+
+    def _predict_batch(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        if not records:
+            return []
+        state = self.swap.current
+        if state is None:
+            if self.drift is not None:
+                self._observe_drift(records)
+            return self._predict_rows(records, self._heuristic_predict)
+        if not NUMPY_AVAILABLE:
+            return self._predict_rows(records, lambda data: self._model_predict(data, state))
+
+        try:
+            start = time.perf_counter()
+            features = np.array(
+                [self._extract_features(data) for data in records], dtype=np.float64
+            )
+            extracted = time.perf_counter()
+            STAGE_SECONDS.observe(extracted - start, ("features",))
+            if self.drift is not None:
+                self.drift.observe(features)
+                observed = time.perf_counter()
+                STAGE_SECONDS.observe(observed - extracted, ("drift",))
+                extracted = observed
+            scored = self.predict_array(features, state)
+            inference_seconds = time.perf_counter() - extracted
+            STAGE_SECONDS.observe(inference_seconds, ("inference",))
+            if self.shadow is not None:
+                self.shadow.submit(
+                    features, scored["prediction"], scored["failure_code"], inference_seconds)
+            gated = int(scored["gated"].sum())
+            PREDICTIONS_TOTAL.inc(len(records) - gated, ("model",))
+            if gated:
+                PREDICTIONS_TOTAL.inc(gated, ("cascade",))
+        except Exception as e:
+            # One malformed reading must not take the whole batch down —
+            # score row by row so each row gets its own fallback.
+            print(f"[Predictor] Batch inference error: {e} — scoring rows individually")
+            return self._predict_rows(records, self._predict_one)
+
+        return [
+            {
+                "prediction": prediction,
+                "confidence": round(confidence, 4),
+                "anomalyScore": round(anomaly_score, 4),
+                "failure_type": FAILURE_TYPES[failure_code],
+            }
+            for prediction, confidence, anomaly_score, failure_code in zip(
+                scored["prediction"].tolist(),
+                scored["confidence"].tolist(),
+                scored["anomalyScore"].tolist(),
+                scored["failure_code"].tolist(),
+            )
+        ]
+
+    def _predict_rows(self, records: list[dict[str, Any]], predict) -> list[dict[str, Any]]:
+        """predict() each reading on its own; unparseable ones get an error marker."""
+        results = []
+        for data in records:
+            try:
+                results.append(predict(data))
+            except (TypeError, ValueError) as e:
+                results.append({"error": f"Invalid reading: {e}"})
+        return results
+
+    def _observe_drift(self, records: list[dict[str, Any]]):
+        """Count readings that parse into the drift monitor's window."""
+        rows = []
+        for data in records:
+            try:
+                rows.append(self._extract_features(data))
+            except (TypeError, ValueError):
+                continue
+        if rows:
+            self.drift.observe(np.array(rows, dtype=np.float64))
+
+    def _attach_trends(self, records: list[dict[str, Any]], results: list[dict[str, Any]]):
+        """Feed readings with a machine_id into the state store, in order, and
+        add each one's rolling features to its result."""
+        rows, machine_ids, values = [], [], []
+        for i, data in enumerate(records):
+            machine_id = data.get("machine_id")
+            if machine_id is None:
+                continue
+            try:
+                features = self._extract_features(data)
+            except (TypeError, ValueError):
+                continue
+            if all(math.isfinite(value) for value in features):
+                rows.append(i)
+                machine_ids.append(str(machine_id))
+                values.append(features)
+        if not rows:
+            return
+
+        values = np.array(values, dtype=np.float64)
+        trends = trend_dicts(self.machine_state.update_many(
+            machine_ids,
+            values[:, COL_TORQUE],
+            values[:, COL_PROCESS_TEMP] - values[:, COL_AIR_TEMP],
+            values[:, COL_TOOL_WEAR],
+        ))
+        for i, trend in zip(rows, trends):
+            results[i]["trend"] = trend
+
+    def predict_array(
+        self, features: "np.ndarray", state: ModelState | None = None
+    ) -> dict[str, "np.ndarray"]:
+        """
+        Score a feature matrix with one model call.
+
+        Args:
+            features: float array of shape (n, 6), columns in the order
+                      produced by _extract_features().
+            state: model version to use (default: the active one).
+
+        Returns:
+            Dictionary of length-n arrays:
+                prediction: int 0 or 1
+                confidence: float 0.0–1.0 (unrounded)
+                anomalyScore: float 0.0–1.0 (unrounded)
+                failure_code: int index into FAILURE_TYPES
+                gated: bool, answered by the cascade gate without the model
+        """
+        state = state or self.swap.current
+        gated = np.zeros(len(features), dtype=bool)
+        if state.gate is not None:
+            gated = state.gate.passes(gate_signals(
+                features[:, COL_AIR_TEMP], features[:, COL_PROCESS_TEMP],
+                features[:, COL_ROTATIONAL_SPEED], features[:, COL_TORQUE], features[:, COL_TOOL_WEAR],
+            ))
+
+        if gated.any():
+            label = np.full(len(features), state.healthy_label, dtype=np.int64)
+            confidence = np.full(len(features), state.gate.confidence)
+            ambiguous = np.flatnonzero(~gated)
+            if len(ambiguous):
+                label[ambiguous], confidence[ambiguous] = self._scored_outputs(
+                    features[ambiguous], state)
+        else:
+            label, confidence = self._scored_outputs(features, state)
+
+        if state.multiclass:
+            prediction = (label != NO_FAILURE).astype(np.int64)
+            failure_code = label
+        else:
+            prediction = label
+            failure_code = self._classify_failure_array(features, prediction)
+
+        return {
+            "prediction": prediction,
+            "confidence": confidence,
+            "anomalyScore": self._compute_anomaly_score_array(features, confidence, prediction),
+            "failure_code": failure_code,
+            "gated": gated,
+        }
+
+    def _scored_outputs(
+        self, features: "np.ndarray", state: ModelState
+    ) -> tuple["np.ndarray", "np.ndarray"]:
+        """Model label and confidence arrays, through the prediction cache when enabled."""
+        if self.cache is not None:
+            return self._cached_model_outputs(features, state)
+        return self._model_outputs(features, state)
+
+    def _model_outputs(
+        self, features: "np.ndarray", state: ModelState
+    ) -> tuple["np.ndarray", "np.ndarray"]:
+        """Label and confidence arrays for a raw feature matrix."""
+        if state.pipeline is not None:
+            features = state.pipeline.transform_raw(features)
+        if hasattr(state.model, "predict_proba"):
+            proba = self._predict_proba(features, state)
+            best = proba.argmax(axis=1)
+            label = state.labels[best]
+            confidence = proba[np.arange(len(best)), best]
+        else:
+            label = self._model_labels(state.model.predict(features), state)
+            confidence = np.full(len(label), 0.85)
+        return label, confidence
+
+    def _model_labels(self, predicted, state: ModelState) -> "np.ndarray":
+        """Labels for model.predict() output (class values, not positions)."""
+        predicted = np.asarray(predicted, dtype=np.int64)
+        if not state.multiclass:
+            return predicted
+        return state.labels[np.searchsorted(state.model.classes_, predicted)]
+
+    def _cached_model_outputs(
+        self, features: "np.ndarray", state: ModelState
+    ) -> tuple["np.ndarray", "np.ndarray"]:
+        """_model_outputs() with cache hits filled in and only misses scored."""
+        generation = state.generation
+        # NaN / out-of-range rows have no usable quantized key — always score them
+        keyable = (np.abs(features) < CACHE_KEY_LIMIT).all(axis=1)
+        quantized = np.rint(np.where(keyable[:, None], features, 0.0) / FEATURE_QUANTA)
+        keys = [
+            tuple(row) if ok else None
+            for row, ok in zip(quantized.astype(np.int64).tolist(), keyable.tolist())
+        ]
+        cached = self.cache.get_many([key for key in keys if key is not None], generation)
+        if len(cached) < len(keys):
+            hits = iter(cached)
+            cached = [next(hits) if key is not None else None for key in keys]
+
+        missed = [i for i, value in enumerate(cached) if value is None]
+        if len(missed) == len(keys):
+            prediction, confidence = self._model_outputs(features, state)
+        else:
+            prediction = np.empty(len(keys), dtype=np.int64)
+            confidence = np.empty(len(keys), dtype=np.float64)
+            for i, value in enumerate(cached):
+                if value is not None:
+                    prediction[i], confidence[i] = value
+            if missed:
+                prediction[missed], confidence[missed] = self._model_outputs(features[missed], state)
+
+        predictions, confidences = prediction.tolist(), confidence.tolist()
+        stored = [i for i in missed if keys[i] is not None]
+        self.cache.put_many(
+            [keys[i] for i in stored],
+            [(predictions[i], confidences[i]) for i in stored],
+            generation,
+        )
+        return prediction, confidence
+
+    def _cache_key(self, features: list[float]) -> tuple | None:
+        """Quantized cache key; None where _cached_model_outputs would not cache."""
+        if not all(abs(value) < CACHE_KEY_LIMIT for value in features):
+            return None
+        return tuple(int(round(value / step)) for value, step in zip(features, FEATURE_QUANTA))
+
+    def _model_predict(self, data: dict[str, Any], state: ModelState) -> dict[str, Any]:
         """
         Run the trained model for prediction.
         Feature extraction matches the training pipeline.
@@ -104,63 +752,94 @@ class ModelPredictor:
             # Extract features in the same order as training
             features = self._extract_features(data)
 
-            if NUMPY_AVAILABLE:
+            if state.gate is not None and state.gate.passes(
+                gate_signals(*([value] for value in features[:COL_MACHINE_TYPE]))
+            )[0]:
+                PREDICTIONS_TOTAL.inc(1, ("cascade",))
+                return self._label_result(data, state.healthy_label, state.gate.confidence, state)
+
+            key = self._cache_key(features) if self.cache is not None else None
+            if key is not None:
+                cached = self.cache.get(key, state.generation)
+                if cached is not None:
+                    PREDICTIONS_TOTAL.inc(1, ("model",))
+                    return self._label_result(data, *cached, state)
+
+            if state.pipeline is not None:
+                feature_array = state.pipeline.transform_row(features)
+            elif NUMPY_AVAILABLE:
                 feature_array = np.array([features])
             else:
                 feature_array = [features]
 
-            # Get prediction
-            prediction = int(self.model.predict(feature_array)[0])
-
-            # Get probability if available (for confidence score)
-            confidence = 0.85
-            if hasattr(self.model, "predict_proba"):
-                proba = self.model.predict_proba(feature_array)[0]
-                confidence = float(max(proba))
+            # One probability pass yields both the label (argmax) and the
+            # confidence — no separate predict() walk over the trees
+            if hasattr(state.model, "predict_proba"):
+                proba = self._predict_proba(feature_array, state)[0]
+                best = max(range(len(proba)), key=proba.__getitem__)
+                labels = state.labels if state.labels is not None else state.model.classes_
+                label = int(labels[best])
+                confidence = float(proba[best])
+            elif state.multiclass:
+                label = int(self._model_labels(state.model.predict(feature_array), state)[0])
+                confidence = 0.85
+            else:
+                label = int(state.model.predict(feature_array)[0])
+                confidence = 0.85
 
-            # Compute anomaly score from multiple signals
-            anomaly_score = self._compute_anomaly_score(data, confidence, prediction)
-
-            # Determine failure type
-            failure_type = self._classify_failure(data) if prediction == 1 else "No Failure"
-
-            return {
-                "prediction": prediction,
-                "confidence": round(confidence, 4),
-                "anomalyScore": round(anomaly_score, 4),
-                "failure_type": failure_type,
-            }
+            if key is not None:
+                self.cache.put(key, (label, confidence), state.generation)
+            PREDICTIONS_TOTAL.inc(1, ("model",))
+            return self._label_result(data, label, confidence, state)
 
         except Exception as e:
             print(f"[Predictor] Model inference error: {e} — falling back to heuristic")
             return self._heuristic_predict(data)
 
+    def _label_result(
+        self, data: dict[str, Any], label: int, confidence: float, state: ModelState
+    ) -> dict[str, Any]:
+        """_build_result() for a model label (see ModelState)."""
+        if state.multiclass:
+            return self._build_result(
+                data, int(label != NO_FAILURE), confidence, FAILURE_TYPES[label])
+        return self._build_result(data, label, confidence)
+
+    def _build_result(
+        self, data: dict[str, Any], prediction: int, confidence: float,
+        failure_type: str | None = None,
+    ) -> dict[str, Any]:
+        """Assemble the prediction payload from the model's label and confidence."""
+        # Compute anomaly score from multiple signals
+        anomaly_score = self._compute_anomaly_score(data, confidence, prediction)
+
+        # Determine failure type (heuristically for a binary model)
+        if failure_type is None:
+            failure_type = self._classify_failure(data) if prediction == 1 else "No Failure"
+
+        return {
+            "prediction": prediction,
+            "confidence": round(confidence, 4),
+            "anomalyScore": round(anomaly_score, 4),
+            "failure_type": failure_type,
+        }
+
     def _extract_features(self, data: dict[str, Any]) -> list[float]:
         """
-        Extract feature vector matching the training pipeline.
-
-        Adjust this to match your exact training feature set.
-        Common features from predictive_maintenance.csv:
+        Raw feature row of a reading, with defaults for missing sensors:
         [air_temp, process_temp, rotational_speed, torque, tool_wear, type_encoded]
-        """
-        # Encode machine type
-        type_map = {"L": 0, "M": 1, "H": 2}
-        machine_type_encoded = type_map.get(data.get("machine_type", "M"), 1)
 
-        return [
-            float(data.get("air_temperature", 300)),
-            float(data.get("process_temperature", 310)),
-            float(data.get("rotational_speed", 1500)),
-            float(data.get("torque", 40)),
-            float(data.get("tool_wear", 100)),
-            float(machine_type_encoded),
-        ]
+        The model's own feature columns (engineered features, scaling) are
+        built from these rows by the state's FeaturePipeline (features.py).
+        """
+        return parse_reading(data, READING_DEFAULTS)
 
     def _heuristic_predict(self, data: dict[str, Any]) -> dict[str, Any]:
         """
         Heuristic-based prediction fallback.
         Mimics trained model behavior using domain-specific rules.
         """
+        PREDICTIONS_TOTAL.inc(1, ("heuristic",))
         anomaly_score = 0.0
         confidence = 0.85
         failure_type = "No Failure"
@@ -274,3 +953,44 @@ class ModelPredictor:
         if rotational_speed > 2700:
             return "Power Failure"
         return "Random Failures"
+
+    def _compute_anomaly_score_array(
+        self, features: "np.ndarray", confidence: "np.ndarray", prediction: "np.ndarray"
+    ) -> "np.ndarray":
+        """Vectorized _compute_anomaly_score over a feature matrix."""
+        base = np.where(prediction == 1, confidence, 1 - confidence)
+
+        torque = features[:, COL_TORQUE]
+        tool_wear = features[:, COL_TOOL_WEAR]
+        temp_diff = features[:, COL_PROCESS_TEMP] - features[:, COL_AIR_TEMP]
+
+        # Added one rule at a time so the float sums match the scalar path
+        boost = np.zeros(len(features))
+        boost += np.where(torque > 65, 0.1, 0.0)
+        boost += np.where(tool_wear > 180, 0.1, 0.0)
+        boost += np.where(temp_diff > 45, 0.1, 0.0)
+
+        return np.minimum(base + boost, 1.0)
+
+    def _classify_failure_array(
+        self, features: "np.ndarray", prediction: "np.ndarray"
+    ) -> "np.ndarray":
+        """Vectorized _classify_failure, returning indices into FAILURE_TYPES."""
+        torque = features[:, COL_TORQUE]
+        tool_wear = features[:, COL_TOOL_WEAR]
+        temp_diff = features[:, COL_PROCESS_TEMP] - features[:, COL_AIR_TEMP]
+        rotational_speed = features[:, COL_ROTATIONAL_SPEED]
+
+        # np.select takes the first matching condition — same priority order
+        codes = np.select(
+            [
+                (tool_wear > 180) & (torque > 55),
+                temp_diff > 45,
+                (torque > 70) & (tool_wear > 150),
+                rotational_speed > 2700,
+            ],
+            [0, 1, 2, 3],
+            default=4,
+        )
+        codes[prediction != 1] = FAILURE_TYPES.index("No Failure")
+        return codes
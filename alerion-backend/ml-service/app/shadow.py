@@ -0,0 +1,164 @@
+"""
+Alerion AI — Shadow Model Evaluation
+
+Scores a share of live traffic with a candidate model next to the
+primary one, without touching what is published. ModelPredictor hands
+over a scored batch (its raw feature matrix plus the primary's labels
+and inference time) with submit(), which never blocks: the batch goes on
+a bounded queue, or is dropped when the queue is full. A background
+thread scores it with the candidate and records:
+
+• agreement       — share of readings where both models give the same
+                    failure_type (and the same alert decision)
+• confusion       — primary failure_type × shadow failure_type counts
+• latency         — inference seconds per reading of each model, over
+                    the same batches
+
+Whole batches are sampled (each with probability `fraction`), so both
+models are timed on identical rows and batch sizes. With CASCADE_MODE=on
+the primary's gated readings are compared as published (No Failure),
+while the candidate scores every reading.
+
+USAGE:
+    shadow = ShadowEvaluator(score, FAILURE_TYPES, fraction=0.1)   # score(features) → (prediction, failure_code)
+    shadow.submit(features, prediction, failure_code, primary_seconds)
+    shadow.snapshot()["agreement"]
+"""
+
+import queue
+import random
+import threading
+import time
+from typing import Callable
+
+import numpy as np
+
+from metrics import MODEL_INFERENCE_SECONDS, SHADOW_BATCHES_DROPPED_TOTAL, SHADOW_READINGS_TOTAL
+
+
+class ShadowEvaluator:
+    """Background comparison of a candidate model against the primary's outputs."""
+
+    def __init__(
+        self,
+        score: Callable,
+        labels,
+        fraction: float = 0.1,
+        max_pending: int = 8,
+        info: dict | None = None,
+    ):
+        if not 0.0 <= fraction <= 1.0:
+            raise ValueError("fraction must be between 0 and 1")
+        self.score = score
+        self.labels = tuple(labels)
+        self.fraction = fraction
+        self.info = info or {}
+
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._confusion = np.zeros((len(self.labels), len(self.labels)), dtype=np.int64)
+        self.batches = 0
+        self.readings = 0
+        self.alert_agreements = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self._seconds = {"primary": 0.0, "shadow": 0.0}
+
+    def submit(self, features: np.ndarray, prediction: np.ndarray, failure_code: np.ndarray,
+               primary_seconds: float):
+        """Queue a scored batch for the candidate, if sampled; never blocks."""
+        if not len(features) or random.random() >= self.fraction:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((features, prediction, failure_code, primary_seconds))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            SHADOW_BATCHES_DROPPED_TOTAL.inc()
+
+    def _ensure_started(self):
+        # Started on first use, in the process that scores (e.g. a consumer worker)
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="shadow-model", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            features, prediction, failure_code, primary_seconds = self._queue.get()
+            try:
+                start = time.perf_counter()
+                shadow_prediction, shadow_code = self.score(features)
+                shadow_seconds = time.perf_counter() - start
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = str(e)
+                continue
+            self._record(prediction, failure_code, shadow_prediction, shadow_code,
+                         primary_seconds, shadow_seconds)
+
+    def _record(self, prediction, failure_code, shadow_prediction, shadow_code,
+                primary_seconds: float, shadow_seconds: float):
+        n = len(prediction)
+        agreed = int((failure_code == shadow_code).sum())
+        with self._lock:
+            np.add.at(self._confusion, (failure_code, shadow_code), 1)
+            self.batches += 1
+            self.readings += n
+            self.alert_agreements += int((prediction == shadow_prediction).sum())
+            self._seconds["primary"] += primary_seconds
+            self._seconds["shadow"] += shadow_seconds
+        SHADOW_READINGS_TOTAL.inc(agreed, ("agree",))
+        SHADOW_READINGS_TOTAL.inc(n - agreed, ("disagree",))
+        MODEL_INFERENCE_SECONDS.observe(primary_seconds, ("primary",))
+        MODEL_INFERENCE_SECONDS.observe(shadow_seconds, ("shadow",))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            confusion = self._confusion.copy()
+            readings = self.readings
+            seconds = dict(self._seconds)
+            counts = {
+                "batches": self.batches,
+                "readings": readings,
+                "dropped_batches": self.dropped,
+                "errors": self.errors,
+                "last_error": self.last_error,
+            }
+            alert_agreements = self.alert_agreements
+
+        agreed = int(np.trace(confusion))
+        # Rows: primary failure_type, columns: shadow failure_type
+        present = [i for i in range(len(self.labels)) if confusion[i].any() or confusion[:, i].any()]
+        per_class = {
+            self.labels[i]: {
+                "primary": int(confusion[i].sum()),
+                "shadow": int(confusion[:, i].sum()),
+                "agreement": round(confusion[i, i] / confusion[i].sum(), 4) if confusion[i].any() else None,
+            }
+            for i in present
+        }
+        return {
+            **self.info,
+            "fraction": self.fraction,
+            "pending": self._queue.qsize(),
+            **counts,
+            "agreement": round(agreed / readings, 4) if readings else None,
+            "alert_agreement": round(alert_agreements / readings, 4) if readings else None,
+            "per_class": per_class,
+            "confusion": {
+                "labels": [self.labels[i] for i in present],
+                "matrix": confusion[np.ix_(present, present)].tolist(),
+            },
+            "latency_us_per_reading": {
+                model: round(s / readings * 1e6, 2) if readings else None
+                for model, s in seconds.items()
+            },
+        }
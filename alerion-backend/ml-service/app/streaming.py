@@ -0,0 +1,130 @@
+"""
+Alerion AI — Streaming Record Parsing
+
+Incremental parsing helpers for the bulk-scoring endpoints. Uploads are
+read line by line and grouped into fixed-size chunks, so memory stays
+bounded by the chunk size regardless of how large the upload is.
+
+Accepted formats:
+• NDJSON — one telemetry object per line (MachineData field names)
+• CSV    — the predictive_maintenance.csv schema (header row required)
+
+USAGE:
+    records = iter_records(request_lines, detect_format(content_type))
+    for chunk in chunked(records, STREAM_CHUNK_SIZE):
+        ...score the chunk and stream its results back...
+"""
+
+import csv
+import json
+from typing import Any, Iterable, Iterator
+
+# predictive_maintenance.csv column → MachineData field
+CSV_COLUMNS = {
+    "Product ID": "machine_id",
+    "Type": "machine_type",
+    "Air temperature [K]": "air_temperature",
+    "Process temperature [K]": "process_temperature",
+    "Rotational speed [rpm]": "rotational_speed",
+    "Torque [Nm]": "torque",
+    "Tool wear [min]": "tool_wear",
+}
+
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class RecordError:
+    """Placeholder for an input line that could not be parsed."""
+
+    __slots__ = ("message",)
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def detect_format(content_type: str | None, override: str | None = None) -> str:
+    """Pick "ndjson" or "csv" from an explicit override or the Content-Type."""
+    if override:
+        fmt = override.lower()
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError(f"Unsupported format {override!r}, expected 'ndjson' or 'csv'")
+        return fmt
+
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_CONTENT_TYPES:
+        return "csv"
+    return "ndjson"
+
+
+class RecordParser:
+    """
+    Line-at-a-time parser for NDJSON or CSV uploads.
+
+    feed() returns a telemetry dict, a RecordError, or None for lines that
+    carry no record (blank lines, the CSV header).
+    """
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self._csv_columns = None
+
+    def feed(self, line: bytes | str) -> dict[str, Any] | RecordError | None:
+        text = _decode(line).strip()
+        if not text:
+            return None
+        if self.fmt == "csv":
+            return self._feed_csv(text)
+        return self._feed_ndjson(text)
+
+    def _feed_ndjson(self, text: str) -> dict[str, Any] | RecordError:
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError as e:
+            return RecordError(f"Invalid JSON: {e}")
+        if not isinstance(record, dict):
+            return RecordError("Record must be a JSON object")
+        return record
+
+    def _feed_csv(self, text: str) -> dict[str, Any] | RecordError | None:
+        row = next(csv.reader([text]))
+        if self._csv_columns is None:
+            self._csv_columns = [CSV_COLUMNS.get(name.strip()) for name in row]
+            return None
+        if len(row) != len(self._csv_columns):
+            return RecordError(f"Expected {len(self._csv_columns)} CSV columns, got {len(row)}")
+        return {field: value for field, value in zip(self._csv_columns, row) if field is not None}
+
+
+def iter_records(lines: Iterable[bytes | str], fmt: str) -> Iterator[dict[str, Any] | RecordError]:
+    """Yield one telemetry dict (or RecordError) per input record."""
+    parser = RecordParser(fmt)
+    for line in lines:
+        record = parser.feed(line)
+        if record is not None:
+            yield record
+
+
+def chunked(records: Iterable[Any], size: int = DEFAULT_CHUNK_SIZE) -> Iterator[list[Any]]:
+    """Group an iterable into lists of at most `size` items."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_ndjson(obj: Any) -> bytes:
+    return json.dumps(obj).encode("utf-8") + b"\n"
+
+
+def _decode(line: bytes | str) -> str:
+    if isinstance(line, bytes):
+        # utf-8-sig drops the BOM that predictive_maintenance.csv starts with;
+        # undecodable bytes surface as a per-record parse error
+        return line.decode("utf-8-sig", errors="replace")
+    return line.lstrip("\ufeff")
@@ -0,0 +1,347 @@
+"""
+Alerion AI — Multi-Process Consumer Supervisor
+
+The Kafka consumer loop is GIL-bound (decode, features, inference and
+encode all run in Python), so one consumer thread keeps one core busy
+however many the box has. With CONSUMER_MODE=processes the FastAPI
+process runs no consumer itself; it supervises N worker processes that
+each load the model once and join the same consumer group, so Kafka
+spreads the partitions across them (N > partitions leaves workers idle).
+
+Each worker has two queues to the supervisor:
+
+• control  — supervisor → worker: ("stop",) drains the worker (finish the
+             current batch, flush the producer, close the consumer);
+             ("reload", path) hot-swaps its model
+• reports  — worker → supervisor: a snapshot every `report_interval_s`
+             and a final one on exit. Snapshot counters are cumulative;
+             the supervisor hands on the increase since the worker's
+             previous report, so restarts do not lose or double-count
+
+A worker that exits while the supervisor is running is restarted, with
+exponential backoff while it keeps dying within `stable_after_s`. Workers
+stop on their own if the supervisor process disappears.
+
+Workers are started with the "spawn" method: the FastAPI process already
+runs threads (batcher, watcher), which fork would copy in a broken state.
+
+USAGE:
+    supervisor = ConsumerSupervisor(consumer_worker, workers=4, on_report=merge)
+    supervisor.start()
+    supervisor.broadcast("reload", "/models/v42")
+    supervisor.stop()                     # drains every worker
+
+    def consumer_worker(link):            # module-level, runs in the child
+        link.start(snapshot, on_stop=..., on_reload=...)
+        try:
+            consume_until_stopped()
+        finally:
+            link.close(snapshot)
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+from logs import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def default_worker_count() -> int:
+    """CPUs this process may run on (respects container cpusets)."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def counter_deltas(previous: dict, current: dict) -> dict:
+    """
+    Per-counter, per-label increase from `previous` to `current`
+    ({name: {labels: value}}); a label set that went down belongs to a
+    fresh process, so its whole value is new.
+    """
+    deltas = {}
+    for name, values in current.items():
+        before = previous.get(name, {})
+        changed = {}
+        for labels, value in values.items():
+            base = before.get(labels, 0.0)
+            delta = value - base if value >= base else value
+            if delta:
+                changed[labels] = delta
+        if changed:
+            deltas[name] = changed
+    return deltas
+
+
+class WorkerLink:
+    """Worker-side end of the supervisor queues (passed to the target)."""
+
+    def __init__(self, worker_id: int, control, reports, report_interval_s: float):
+        self.worker_id = worker_id
+        self._control = control
+        self._reports = reports
+        self.report_interval_s = report_interval_s
+        self._parent = os.getppid()
+        # Thread state is created in the child (start), as it cannot be pickled
+        self._stopped = None
+        self._thread = None
+
+    def start(
+        self,
+        snapshot: Callable[[], dict],
+        on_stop: Callable[[], None],
+        on_reload: Callable[[str | None], Any] | None = None,
+    ):
+        """Serve control messages and send periodic reports on a thread."""
+        self._parent = os.getppid()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(snapshot, on_stop, on_reload),
+            name="supervisor-link", daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, snapshot, on_stop, on_reload):
+        while not self._stopped.is_set():
+            try:
+                command = self._control.get(timeout=self.report_interval_s)
+            except queue.Empty:
+                if os.getppid() != self._parent:
+                    logger.error("supervisor exited, stopping worker",
+                                 extra={"fields": {"worker": self.worker_id}})
+                    self._stopped.set()
+                    on_stop()
+                    return
+                self.report(snapshot())
+                continue
+
+            if command[0] == "stop":
+                self._stopped.set()
+                on_stop()
+            elif command[0] == "reload" and on_reload is not None:
+                try:
+                    on_reload(command[1])
+                except Exception as e:
+                    logger.error("worker model reload failed",
+                                 extra={"fields": {"worker": self.worker_id, "error": str(e)}})
+                self.report(snapshot())
+
+    def report(self, snapshot: dict):
+        self._reports.put((self.worker_id, os.getpid(), time.time(), snapshot))
+
+    def close(self, snapshot: Callable[[], dict]):
+        """Send the final report; call once the consumer loop has returned."""
+        if self._stopped is not None:
+            self._stopped.set()
+        self.report(snapshot())
+
+
+class _Worker:
+    """Supervisor-side bookkeeping for one worker slot."""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.process = None
+        self.control = None
+        self.started_at = None
+        self.restarts = 0
+        self.crashes = 0  # consecutive exits within stable_after_s
+        self.restart_at = None
+        self.last_exit = None
+        self.report = None
+        self.counters = {}
+
+
+class ConsumerSupervisor:
+    """
+    Runs `workers` processes of target(link) and keeps them running.
+
+    on_report(worker_id, report, deltas) is called on the supervisor's
+    monitor thread for every report, where `deltas` is the increase of the
+    report's "counters" since that worker's previous report.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[WorkerLink], None],
+        workers: int | None = None,
+        on_report: Callable[[int, dict, dict], None] | None = None,
+        report_interval_s: float = 2.0,
+        drain_timeout_s: float = 30.0,
+        restart_backoff_s: float = 1.0,
+        max_backoff_s: float = 30.0,
+        stable_after_s: float = 60.0,
+    ):
+        self.target = target
+        self.n_workers = max(1, workers or default_worker_count())
+        self.on_report = on_report
+        self.report_interval_s = report_interval_s
+        self.drain_timeout_s = drain_timeout_s
+        self.restart_backoff_s = restart_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.stable_after_s = stable_after_s
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._reports = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._workers = [_Worker(i) for i in range(self.n_workers)]
+        self._running = False
+        self._monitor_stop = threading.Event()
+        self._monitor = None
+
+    def start(self):
+        with self._lock:
+            self._running = True
+            for worker in self._workers:
+                self._spawn(worker)
+        self._monitor = threading.Thread(target=self._run, name="consumer-supervisor", daemon=True)
+        self._monitor.start()
+        print(f"[Supervisor] Started {self.n_workers} consumer worker processes")
+
+    def _spawn(self, worker: _Worker):
+        worker.control = self._ctx.Queue()
+        link = WorkerLink(worker.worker_id, worker.control, self._reports, self.report_interval_s)
+        worker.process = self._ctx.Process(
+            target=self.target, args=(link,),
+            name=f"consumer-worker-{worker.worker_id}", daemon=True,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+
+    def _run(self):
+        while not self._monitor_stop.is_set():
+            self._drain_reports(timeout=0.5)
+            with self._lock:
+                if self._running:
+                    self._check_workers()
+        self._drain_reports(timeout=0)
+
+    def _drain_reports(self, timeout: float):
+        """Apply queued reports (blocking up to `timeout` for the first one)."""
+        while True:
+            try:
+                worker_id, pid, at, report = self._reports.get(timeout=timeout)
+            except queue.Empty:
+                return
+            timeout = 0
+            worker = self._workers[worker_id]
+            with self._lock:
+                previous = worker.counters if worker.report and worker.report["pid"] == pid else {}
+                current = report.pop("counters", {})
+                deltas = counter_deltas(previous, current)
+                worker.counters = current
+                worker.report = {"pid": pid, "reported_at": at, **report}
+            if self.on_report is not None:
+                try:
+                    self.on_report(worker_id, worker.report, deltas)
+                except Exception as e:
+                    logger.error("worker report failed", extra={"fields": {"error": str(e)}})
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker in self._workers:
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    worker.restarts += 1
+                    self._spawn(worker)
+                continue
+            if worker.process.is_alive():
+                continue
+
+            worker.process.join()
+            worker.last_exit = worker.process.exitcode
+            uptime = now - worker.started_at
+            worker.crashes = 1 if uptime >= self.stable_after_s else worker.crashes + 1
+            delay = min(self.restart_backoff_s * 2 ** (worker.crashes - 1), self.max_backoff_s)
+            worker.restart_at = now + delay
+            logger.error("consumer worker exited, restarting", extra={"fields": {
+                "worker": worker.worker_id,
+                "pid": worker.process.pid,
+                "exitcode": worker.last_exit,
+                "uptime_s": round(uptime, 1),
+                "restart_in_s": delay,
+            }})
+
+    def broadcast(self, *command) -> int:
+        """Send a control command to every live worker; returns how many."""
+        sent = 0
+        with self._lock:
+            for worker in self._workers:
+                if worker.restart_at is None and worker.process.is_alive():
+                    worker.control.put(command)
+                    sent += 1
+        return sent
+
+    def stop(self):
+        """Drain all workers (terminating stragglers after drain_timeout_s)."""
+        with self._lock:
+            self._running = False
+            processes = []
+            for worker in self._workers:
+                if worker.restart_at is None and worker.process.is_alive():
+                    worker.control.put(("stop",))
+                    processes.append(worker.process)
+
+        # The monitor keeps reading reports meanwhile: a worker cannot exit
+        # while its queue feeder still has unread reports to flush
+        deadline = time.monotonic() + self.drain_timeout_s
+        for process in processes:
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+        for process in processes:
+            if process.is_alive():
+                logger.error("consumer worker did not drain, terminating",
+                             extra={"fields": {"pid": process.pid}})
+                process.terminate()
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+
+        self._monitor_stop.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout=5)
+            self._monitor = None
+        print("[Supervisor] All consumer workers stopped")
+
+    def reports(self) -> list[dict]:
+        """Latest report of each worker that has sent one."""
+        with self._lock:
+            return [w.report for w in self._workers if w.report is not None]
+
+    def alive(self) -> int:
+        with self._lock:
+            return sum(
+                1 for w in self._workers
+                if w.process is not None and w.restart_at is None and w.process.is_alive()
+            )
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            workers = []
+            for w in self._workers:
+                alive = w.restart_at is None and w.process is not None and w.process.is_alive()
+                workers.append({
+                    "worker": w.worker_id,
+                    "pid": w.process.pid if alive else None,
+                    "alive": alive,
+                    "uptime_s": round(now - w.started_at, 1) if alive else None,
+                    "restarts": w.restarts,
+                    "last_exitcode": w.last_exit,
+                    "report": w.report,
+                })
+        return {
+            "mode": "processes",
+            "workers": self.n_workers,
+            "alive": sum(1 for w in workers if w["alive"]),
+            "restarts": sum(w["restarts"] for w in workers),
+            "processes": workers,
+        }
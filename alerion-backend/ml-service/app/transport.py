@@ -0,0 +1,466 @@
+"""
+Alerion AI — Kafka Transports
+
+The consumer loop only talks to Kafka through the Consumer / Producer
+objects that create_kafka_consumer / create_kafka_producer return, so
+the client library is pluggable:
+
+• kafka   — confluent_kafka clients (production).
+• memory  — in-process broker with the same client interface: topics of
+            partitioned, offset-addressed logs, consumer groups with
+            range assignment and rebalancing, committed offsets,
+            auto-commit, pause/resume, watermarks and delivery reports.
+            Lets the full loop run (and be profiled or load-tested, see
+            ml/benchmarks/replay.py) with no broker. It lives in one
+            process; messages are not persisted.
+
+Only the client features the service uses are implemented. Delivery is
+immediate (no linger) and never fails unless the producer's queue
+(queue.buffering.max.messages of unserved delivery reports) is full, in
+which case produce() raises BufferError as confluent_kafka does.
+
+USAGE:
+    transport = get_transport("memory")
+    producer = transport.producer({"bootstrap.servers": "-"})
+    consumer = transport.consumer({"group.id": "g", "auto.offset.reset": "earliest"})
+    transport.broker.create_topic("machine-data", partitions=4)
+"""
+
+import itertools
+import threading
+import time
+import zlib
+from collections import deque
+
+from confluent_kafka import Consumer, Producer, TopicPartition
+
+TRANSPORT_NAMES = ("kafka", "memory")
+
+# Logical offsets, as in librdkafka
+OFFSET_BEGINNING = -2
+OFFSET_END = -1
+OFFSET_INVALID = -1001
+
+TIMESTAMP_CREATE_TIME = 1
+
+
+class Transport:
+    name = "transport"
+
+    def consumer(self, config: dict):
+        raise NotImplementedError
+
+    def producer(self, config: dict):
+        raise NotImplementedError
+
+
+class KafkaTransport(Transport):
+    name = "kafka"
+
+    def consumer(self, config: dict) -> Consumer:
+        return Consumer(config)
+
+    def producer(self, config: dict) -> Producer:
+        return Producer(config)
+
+
+# ─────────────────────────────────────────────────────────────
+# In-memory broker
+# ─────────────────────────────────────────────────────────────
+
+class MemoryMessage:
+    """confluent_kafka.Message look-alike."""
+
+    __slots__ = ("_topic", "_partition", "_offset", "_key", "_value", "_headers", "_timestamp")
+
+    def __init__(self, topic, partition, offset, key, value, headers, timestamp):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._headers = headers
+        self._timestamp = timestamp
+
+    def error(self):
+        return None
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return self._partition
+
+    def offset(self):
+        return self._offset
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+    def headers(self):
+        return self._headers
+
+    def timestamp(self):
+        return (TIMESTAMP_CREATE_TIME, self._timestamp)
+
+    def __len__(self):
+        return len(self._value) if self._value is not None else 0
+
+
+class _PartitionLog:
+    __slots__ = ("messages", "start")
+
+    def __init__(self):
+        self.messages = []
+        self.start = 0  # offset of messages[0] (advances on retention)
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.messages)
+
+
+class _Group:
+    __slots__ = ("members", "generation", "assignments")
+
+    def __init__(self):
+        self.members = {}  # member_id → subscribed topics
+        self.generation = 0
+        self.assignments = {}  # member_id → [(topic, partition)]
+
+
+class MemoryBroker:
+    """
+    Topics of partitioned logs, plus consumer-group state. Topics are
+    created on first use with `default_partitions`; each partition keeps
+    at most `retention_messages` (older ones are dropped, like size-based
+    retention).
+    """
+
+    def __init__(self, default_partitions: int = 4, retention_messages: int = 1_000_000):
+        self.default_partitions = default_partitions
+        self.retention_messages = retention_messages
+        self._cond = threading.Condition()
+        self._topics = {}  # name → [_PartitionLog]
+        self._groups = {}  # group id → _Group
+        self._committed = {}  # (group, topic, partition) → offset
+        self._member_ids = itertools.count(1)
+        self._round_robin = itertools.count()
+
+    # ─── Topics and logs ─────────────────────────────────────
+
+    def create_topic(self, name: str, partitions: int | None = None):
+        with self._cond:
+            self._topic(name, partitions)
+
+    def _topic(self, name: str, partitions: int | None = None) -> list:
+        logs = self._topics.get(name)
+        if logs is None:
+            logs = self._topics[name] = [
+                _PartitionLog() for _ in range(partitions or self.default_partitions)
+            ]
+            for group in self._groups.values():
+                if any(name in topics for topics in group.members.values()):
+                    self._rebalance(group)
+        return logs
+
+    def partitions(self, topic: str) -> int:
+        with self._cond:
+            return len(self._topic(topic))
+
+    def append(self, topic: str, partition: int, key, value, headers, timestamp: int) -> MemoryMessage:
+        with self._cond:
+            logs = self._topic(topic)
+            if partition < 0:
+                # Keyed messages stick to a partition; unkeyed ones spread
+                partition = (
+                    zlib.crc32(key) % len(logs) if key is not None
+                    else next(self._round_robin) % len(logs)
+                )
+            log = logs[partition]
+            msg = MemoryMessage(topic, partition, log.end, key, value, headers, timestamp)
+            log.messages.append(msg)
+            if len(log.messages) > self.retention_messages * 1.5:
+                drop = len(log.messages) - self.retention_messages
+                del log.messages[:drop]
+                log.start += drop
+            self._cond.notify_all()
+            return msg
+
+    def fetch(self, topic: str, partition: int, offset: int, max_messages: int) -> list:
+        with self._cond:
+            log = self._topics[topic][partition]
+            first = max(offset, log.start) - log.start
+            return log.messages[first:first + max_messages]
+
+    def watermarks(self, topic: str, partition: int) -> tuple[int, int]:
+        with self._cond:
+            log = self._topic(topic)[partition]
+            return log.start, log.end
+
+    # ─── Consumer groups ─────────────────────────────────────
+
+    def join(self, group_id: str, topics: list[str]) -> str:
+        with self._cond:
+            member_id = f"member-{next(self._member_ids)}"
+            group = self._groups.setdefault(group_id, _Group())
+            group.members[member_id] = list(topics)
+            for topic in topics:
+                self._topic(topic)
+            self._rebalance(group)
+            return member_id
+
+    def leave(self, group_id: str, member_id: str):
+        with self._cond:
+            group = self._groups.get(group_id)
+            if group is not None and group.members.pop(member_id, None) is not None:
+                self._rebalance(group)
+
+    def _rebalance(self, group: _Group):
+        """Range assignment per topic over the members subscribed to it."""
+        group.generation += 1
+        group.assignments = {member: [] for member in group.members}
+        for topic in sorted({t for topics in group.members.values() for t in topics}):
+            members = sorted(m for m, topics in group.members.items() if topic in topics)
+            n_partitions = len(self._topic(topic))
+            per, extra = divmod(n_partitions, len(members))
+            start = 0
+            for i, member in enumerate(members):
+                count = per + (1 if i < extra else 0)
+                group.assignments[member].extend((topic, p) for p in range(start, start + count))
+                start += count
+        self._cond.notify_all()
+
+    def assignment(self, group_id: str, member_id: str) -> tuple[int, list]:
+        with self._cond:
+            group = self._groups[group_id]
+            return group.generation, list(group.assignments.get(member_id, []))
+
+    def generation(self, group_id: str) -> int:
+        group = self._groups.get(group_id)
+        return group.generation if group is not None else 0
+
+    def commit(self, group_id: str, offsets: dict):
+        with self._cond:
+            for (topic, partition), offset in offsets.items():
+                self._committed[(group_id, topic, partition)] = offset
+
+    def committed(self, group_id: str, topic: str, partition: int) -> int | None:
+        with self._cond:
+            return self._committed.get((group_id, topic, partition))
+
+    def wait(self, timeout: float):
+        """Block until something is appended or a group rebalances (or timeout)."""
+        with self._cond:
+            self._cond.wait(timeout)
+
+
+class MemoryConsumer:
+    """confluent_kafka.Consumer subset backed by a MemoryBroker."""
+
+    def __init__(self, broker: MemoryBroker, config: dict):
+        self._broker = broker
+        self.group_id = config["group.id"]
+        self._auto_commit = str(config.get("enable.auto.commit", True)).lower() in ("true", "1")
+        self._auto_commit_interval = int(config.get("auto.commit.interval.ms", 5000)) / 1000
+        self._reset = config.get("auto.offset.reset", "latest")
+        self._member_id = None
+        self._generation = 0
+        self._positions = {}  # (topic, partition) → next offset to read
+        self._paused = set()
+        self._on_assign = self._on_revoke = None
+        self._next_auto_commit = 0.0
+        self._rotation = 0
+
+    def subscribe(self, topics: list[str], on_assign=None, on_revoke=None, **kwargs):
+        self._on_assign, self._on_revoke = on_assign, on_revoke
+        if self._member_id is not None:
+            self._broker.leave(self.group_id, self._member_id)
+        self._member_id = self._broker.join(self.group_id, topics)
+
+    def _sync_group(self):
+        if self._member_id is None or self._broker.generation(self.group_id) == self._generation:
+            return
+        generation, assigned = self._broker.assignment(self.group_id, self._member_id)
+        if self._positions:
+            revoked = [TopicPartition(t, p) for t, p in self._positions]
+            if self._on_revoke is not None:
+                self._on_revoke(self, revoked)
+            if self._auto_commit:
+                self._commit_positions()
+        self._generation = generation
+        self._positions = {tp: self._start_offset(*tp) for tp in assigned}
+        self._paused &= set(assigned)
+        if self._on_assign is not None:
+            self._on_assign(self, [TopicPartition(t, p) for t, p in assigned])
+
+    def _start_offset(self, topic: str, partition: int) -> int:
+        committed = self._broker.committed(self.group_id, topic, partition)
+        if committed is not None and committed >= 0:
+            return committed
+        low, high = self._broker.watermarks(topic, partition)
+        return low if self._reset in ("earliest", "beginning", "smallest") else high
+
+    def consume(self, num_messages: int = 1, timeout: float = -1) -> list:
+        deadline = time.monotonic() + (timeout if timeout >= 0 else 1e9)
+        while True:
+            self._sync_group()
+            if self._auto_commit and time.monotonic() >= self._next_auto_commit:
+                self._commit_positions()
+                self._next_auto_commit = time.monotonic() + self._auto_commit_interval
+
+            messages = self._fetch(num_messages)
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                return messages
+            self._broker.wait(min(remaining, 0.1))
+
+    def _fetch(self, num_messages: int) -> list:
+        active = [tp for tp in self._positions if tp not in self._paused]
+        if not active:
+            return []
+        # Start at a different partition each call so none is starved
+        self._rotation = (self._rotation + 1) % len(active)
+        active = active[self._rotation:] + active[:self._rotation]
+        out = []
+        for tp in active:
+            batch = self._broker.fetch(*tp, self._positions[tp], num_messages - len(out))
+            if batch:
+                out.extend(batch)
+                self._positions[tp] = batch[-1].offset() + 1
+                if len(out) >= num_messages:
+                    break
+        return out
+
+    def poll(self, timeout: float = -1):
+        messages = self.consume(1, timeout)
+        return messages[0] if messages else None
+
+    def assignment(self) -> list:
+        return [TopicPartition(t, p) for t, p in self._positions]
+
+    def position(self, partitions: list) -> list:
+        return [
+            TopicPartition(tp.topic, tp.partition,
+                           self._positions.get((tp.topic, tp.partition), OFFSET_INVALID))
+            for tp in partitions
+        ]
+
+    def get_watermark_offsets(self, partition, timeout=None, cached=False) -> tuple[int, int]:
+        return self._broker.watermarks(partition.topic, partition.partition)
+
+    def pause(self, partitions: list):
+        self._paused.update((tp.topic, tp.partition) for tp in partitions)
+
+    def resume(self, partitions: list):
+        self._paused.difference_update((tp.topic, tp.partition) for tp in partitions)
+
+    def commit(self, message=None, offsets=None, asynchronous=True):
+        if message is not None:
+            self._broker.commit(self.group_id, {
+                (message.topic(), message.partition()): message.offset() + 1,
+            })
+        elif offsets is not None:
+            self._broker.commit(self.group_id, {(tp.topic, tp.partition): tp.offset for tp in offsets})
+        else:
+            self._commit_positions()
+        return None if asynchronous else list(offsets or [])
+
+    def _commit_positions(self):
+        if self._positions:
+            self._broker.commit(self.group_id, dict(self._positions))
+
+    def committed(self, partitions: list, timeout=None) -> list:
+        out = []
+        for tp in partitions:
+            offset = self._broker.committed(self.group_id, tp.topic, tp.partition)
+            out.append(TopicPartition(
+                tp.topic, tp.partition, OFFSET_INVALID if offset is None else offset))
+        return out
+
+    def close(self):
+        if self._member_id is None:
+            return
+        if self._auto_commit:
+            self._commit_positions()
+        self._broker.leave(self.group_id, self._member_id)
+        self._member_id = None
+        self._positions = {}
+
+
+class MemoryProducer:
+    """confluent_kafka.Producer subset; messages are appended synchronously."""
+
+    def __init__(self, broker: MemoryBroker, config: dict):
+        self._broker = broker
+        self._max_queued = int(config.get("queue.buffering.max.messages", 100_000))
+        self._reports = deque()  # (callback, message) awaiting poll()
+        self._lock = threading.Lock()
+
+    def produce(self, topic: str, value=None, key=None, partition: int = -1,
+                on_delivery=None, callback=None, timestamp: int = 0, headers=None):
+        if len(self._reports) >= self._max_queued:
+            raise BufferError("Local: Queue full")
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        if isinstance(headers, dict):
+            headers = list(headers.items())
+        msg = self._broker.append(
+            topic, partition, key, value, headers, timestamp or int(time.time() * 1000)
+        )
+        with self._lock:
+            self._reports.append((callback or on_delivery, msg))
+
+    def poll(self, timeout: float = 0) -> int:
+        """Serve pending delivery reports; returns how many."""
+        with self._lock:
+            reports, self._reports = self._reports, deque()
+        for callback, msg in reports:
+            if callback is not None:
+                callback(None, msg)
+        return len(reports)
+
+    def flush(self, timeout: float = -1) -> int:
+        self.poll(0)
+        return len(self._reports)
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+
+class MemoryTransport(Transport):
+    name = "memory"
+
+    def __init__(self, broker: MemoryBroker | None = None):
+        self.broker = broker or MemoryBroker()
+
+    def consumer(self, config: dict) -> MemoryConsumer:
+        return MemoryConsumer(self.broker, config)
+
+    def producer(self, config: dict) -> MemoryProducer:
+        return MemoryProducer(self.broker, config)
+
+
+# One broker per process, shared by every memory transport client
+_memory_transport = None
+
+
+def get_transport(name: str) -> Transport:
+    """
+    Transport for a name (the memory transport is a per-process singleton).
+
+    Raises:
+        ValueError: for an unknown name.
+    """
+    global _memory_transport
+    if name == "kafka":
+        return KafkaTransport()
+    if name == "memory":
+        if _memory_transport is None:
+            _memory_transport = MemoryTransport()
+        return _memory_transport
+    raise ValueError(f"Unknown transport {name!r}, expected one of {TRANSPORT_NAMES}")
@@ -1,67 +1,139 @@
 import os
+import sys
 import json
 import numpy as np
-import pandas as pd
 import joblib
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 
 app = Flask(__name__)
 CORS(app)
 
-ARTIFACTS_DIR = os.path.join(os.path.dirname(__file__), 'model_artifacts')
-
-model = joblib.load(os.path.join(ARTIFACTS_DIR, 'model.pkl'))
-scaler = joblib.load(os.path.join(ARTIFACTS_DIR, 'scaler.pkl'))
-label_encoder = joblib.load(os.path.join(ARTIFACTS_DIR, 'label_encoder.pkl'))
-
-with open(os.path.join(ARTIFACTS_DIR, 'metadata.json')) as f:
-    metadata = json.load(f)
-
-FEATURE_COLS = metadata['feature_cols']
-CLASSES = metadata['classes']
-
-def build_feature_vector(data: dict) -> pd.DataFrame:
-    type_map = {'L': 0, 'M': 1, 'H': 2}
-
-    air_temp = float(data['air_temperature'])
-    proc_temp = float(data['process_temperature'])
-    rpm = float(data['rotational_speed'])
-    torque = float(data['torque'])
-    wear = float(data['tool_wear'])
-    mtype = str(data.get('machine_type', 'M')).upper()
-
-    type_enc = type_map.get(mtype, 1)
-    temp_diff = proc_temp - air_temp
-    power_W = torque * (rpm * 2 * np.pi / 60)
-    torque_x_wear = torque * wear
-    rpm_per_torque = rpm / (torque + 1e-6)
-
-    features = pd.DataFrame([{
-        'Air temperature [K]':      air_temp,
-        'Process temperature [K]':  proc_temp,
-        'Rotational speed [rpm]':   rpm,
-        'Torque [Nm]':              torque,
-        'Tool wear [min]':          wear,
-        'type_encoded':             type_enc,
-        'temp_diff':                temp_diff,
-        'power_W':                  power_W,
-        'torque_x_wear':            torque_x_wear,
-        'rpm_per_torque':           rpm_per_torque,
-    }])
-
-    return features[FEATURE_COLS]
+ARTIFACTS_DIR = os.environ.get('MODEL_ARTIFACTS_DIR') or os.path.join(
+    os.path.dirname(__file__), 'model_artifacts')
+
+# Inference modules shared with the Kafka ML service
+ML_SERVICE_APP_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'alerion-backend', 'ml-service', 'app')
+sys.path.insert(0, os.path.normpath(ML_SERVICE_APP_DIR))
+
+from features import TYPE_MAP, FeaturePipeline
+from forest import InferenceEngine
+from hotreload import (ArtifactSwap, ModelWatcher, ReloadError, ReloadInProgressError,
+                       artifact_version, file_sha256)
+from modelstore import load_model, process_memory
+from streaming import RecordError, chunked, detect_format, iter_records, to_ndjson
+
+# sklearn | compiled | auto — see alerion-backend/ml-service/app/forest.py
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'sklearn')
+COMPILED_MAX_BATCH = int(os.environ.get('COMPILED_MAX_BATCH', 256))
+
+# pickle | mmap — mmap shares one copy of the forest between workers
+# (e.g. gunicorn -w N), see alerion-backend/ml-service/app/modelstore.py
+MODEL_LOAD_MODE = os.environ.get('MODEL_LOAD_MODE', 'pickle')
+MODEL_ARRAY_DIR = os.environ.get('MODEL_ARRAY_DIR') or None
+
+# Poll the artifact directory and hot-swap changed artifacts (0 = disabled;
+# POST /model/reload works either way, and moves the watch to its
+# directory), see hotreload.py
+MODEL_WATCH_INTERVAL_S = float(os.environ.get('MODEL_WATCH_INTERVAL_S', 0))
+
+ARTIFACT_FILES = ('model.pkl', 'scaler.pkl', 'label_encoder.pkl', 'metadata.json')
+
+class ModelArtifacts:
+    """
+    One artifact directory loaded as a unit. Handlers read
+    `artifacts.current` once per request, so a reload never mixes the
+    scaler of one version with the model of another.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        model_path = os.path.join(directory, 'model.pkl')
+        self.model, self.load_info = load_model(model_path, MODEL_LOAD_MODE, MODEL_ARRAY_DIR)
+        self.scaler = joblib.load(os.path.join(directory, 'scaler.pkl'))
+        self.label_encoder = joblib.load(os.path.join(directory, 'label_encoder.pkl'))
+        self.engine = InferenceEngine(self.model, INFERENCE_ENGINE, COMPILED_MAX_BATCH)
+
+        with open(os.path.join(directory, 'metadata.json')) as f:
+            self.metadata = json.load(f)
+        self.feature_cols = self.metadata['feature_cols']
+        self.classes = self.metadata['classes']
+        # feature_cols + scaler compiled once; see ml-service/app/features.py
+        self.pipeline = FeaturePipeline.from_metadata(self.metadata, self.scaler)
+
+        self.sha256 = file_sha256(model_path)
+        self.version = artifact_version(directory, self.sha256)
+
+def warm_up(bundle: ModelArtifacts):
+    """Score a synthetic batch end to end before the bundle goes live."""
+    n = 64
+    columns = {
+        field: np.linspace(lo + (hi - lo) * 0.2, lo + (hi - lo) * 0.4, n)
+        for field, (lo, hi, _) in INPUT_RANGES.items()
+    }
+    columns['type_encoded'] = np.arange(n) % 3
+    pred_idx, prob = predict_columns(columns, bundle)
+    if prob.shape != (n, len(bundle.label_encoder.classes_)):
+        raise ValueError(f'warm-up returned probabilities of shape {prob.shape}')
+
+def reload_artifacts(directory: str | None = None) -> ModelArtifacts:
+    """
+    Load, warm up and swap in an artifact directory (default: the current
+    one); the watcher, if any, follows it.
+    """
+    bundle = artifacts.reload(directory or artifacts.current.directory)
+    if model_watcher is not None:
+        model_watcher.watch(artifact_paths(bundle.directory))
+    print(f"Model reloaded: version {bundle.version} from {bundle.directory} "
+          f"in {artifacts.last_reload_seconds}s")
+    return bundle
+
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 50000))
+STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 5000))
+
+INPUT_RANGES = {
+    'air_temperature':     (250, 400, 'Kelvin'),
+    'process_temperature': (250, 400, 'Kelvin'),
+    'rotational_speed':    (0, 10000, 'rpm'),
+    'torque':              (0, 300, 'Nm'),
+    'tool_wear':           (0, 500, 'minutes'),
+}
+
+_MISSING = object()
+
+artifacts = ArtifactSwap(ModelArtifacts, warm_up, current=ModelArtifacts(ARTIFACTS_DIR))
+
+def artifact_paths(directory: str) -> list[str]:
+    return [os.path.join(directory, name) for name in ARTIFACT_FILES]
+
+model_watcher = None
+if MODEL_WATCH_INTERVAL_S > 0:
+    model_watcher = ModelWatcher(artifact_paths(ARTIFACTS_DIR), reload_artifacts,
+                                 MODEL_WATCH_INTERVAL_S)
+    model_watcher.start()
+
+def build_feature_vector(data: dict, bundle: ModelArtifacts | None = None) -> np.ndarray:
+    """Scaled (1, k) model input for one validated reading."""
+    bundle = bundle or artifacts.current
+    return bundle.pipeline.transform_one(data)
+
+def build_feature_matrix(columns: dict[str, np.ndarray],
+                         bundle: ModelArtifacts | None = None) -> np.ndarray:
+    """Column-wise build_feature_vector over a whole batch of parsed readings."""
+    bundle = bundle or artifacts.current
+    return bundle.pipeline.transform(columns)
+
+def infer(features_scaled, bundle: ModelArtifacts | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Run the model once; labels are the argmax of the class probabilities."""
+    bundle = bundle or artifacts.current
+    prob = bundle.engine.predict_proba(features_scaled)
+    pred_idx = bundle.engine.classes_[prob.argmax(axis=1)]
+    return pred_idx, prob
 
 def validate_input(data: dict) -> list[str]:
     errors = []
-    required = {
-        'air_temperature':     (250, 400, 'Kelvin'),
-        'process_temperature': (250, 400, 'Kelvin'),
-        'rotational_speed':    (0, 10000, 'rpm'),
-        'torque':              (0, 300, 'Nm'),
-        'tool_wear':           (0, 500, 'minutes'),
-    }
-    for field, (lo, hi, unit) in required.items():
+    for field, (lo, hi, unit) in INPUT_RANGES.items():
         if field not in data:
             errors.append(f"Missing required field: '{field}'")
         else:
@@ -78,24 +150,137 @@ def validate_input(data: dict) -> list[str]:
 
     return errors
 
+def _parse_column(raw) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Parse one field across the batch into (values, missing, not_a_number) arrays."""
+    n = len(raw)
+    if isinstance(raw, np.ndarray) and raw.dtype.kind in 'biuf':
+        return raw.astype(np.float64), np.zeros(n, bool), np.zeros(n, bool)
+    try:
+        if _MISSING in raw or None in raw:
+            raise TypeError
+        return np.array(raw, dtype=np.float64), np.zeros(n, bool), np.zeros(n, bool)
+    except (ValueError, TypeError):
+        pass
+
+    # Slow path only for batches that actually contain bad values
+    values = np.full(n, np.nan)
+    missing = np.zeros(n, bool)
+    not_a_number = np.zeros(n, bool)
+    for i, v in enumerate(raw):
+        if v is _MISSING:
+            missing[i] = True
+            continue
+        try:
+            values[i] = float(v)
+        except (ValueError, TypeError):
+            not_a_number[i] = True
+    return values, missing, not_a_number
+
+def validate_batch(readings: list) -> tuple[dict[str, np.ndarray], np.ndarray, dict[int, list[str]]]:
+    """
+    Column-wise validate_input over a batch.
+
+    Returns the parsed feature columns, a boolean mask of valid rows and
+    the per-row error lists (same messages and order as validate_input)
+    for the rows that failed.
+    """
+    rows = [r if isinstance(r, dict) else {} for r in readings]
+    raw = {field: [r.get(field, _MISSING) for r in rows] for field in INPUT_RANGES}
+    machine_types = [r.get('machine_type', 'M') for r in rows]
+    return validate_columns(raw, machine_types)
+
+def validate_columns(raw: dict, machine_types) -> tuple[dict[str, np.ndarray], np.ndarray, dict[int, list[str]]]:
+    """
+    validate_batch for input that is already column-oriented (e.g. a
+    DataFrame chunk). Fields absent from `raw` are missing on every row.
+    """
+    n = len(machine_types)
+
+    columns = {}
+    checks = []
+    invalid = np.zeros(n, bool)
+    for field, (lo, hi, unit) in INPUT_RANGES.items():
+        values, missing, not_a_number = _parse_column(raw.get(field, [_MISSING] * n))
+        out_of_range = ~(missing | not_a_number) & ~((lo <= values) & (values <= hi))
+        columns[field] = values
+        checks.append((field, lo, hi, unit, values, missing, not_a_number, out_of_range))
+        invalid |= missing | not_a_number | out_of_range
+
+    machine_types = [str(t).upper() for t in machine_types]
+    bad_type = np.array([t not in TYPE_MAP for t in machine_types], dtype=bool)
+    columns['type_encoded'] = np.array([TYPE_MAP.get(t, 1) for t in machine_types])
+    invalid |= bad_type
+
+    errors = {}
+    for i in np.flatnonzero(invalid).tolist():
+        row_errors = []
+        for field, lo, hi, unit, values, missing, not_a_number, out_of_range in checks:
+            if missing[i]:
+                row_errors.append(f"Missing required field: '{field}'")
+            elif not_a_number[i]:
+                row_errors.append(f"'{field}' must be a number")
+            elif out_of_range[i]:
+                row_errors.append(
+                    f"'{field}' value {float(values[i])} out of expected range [{lo}, {hi}] {unit}")
+        if bad_type[i]:
+            row_errors.append("'machine_type' must be one of: 'L', 'M', 'H'")
+        errors[i] = row_errors
+
+    return columns, ~invalid, errors
+
+def predict_columns(columns: dict[str, np.ndarray],
+                    bundle: ModelArtifacts | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Feature engineering, scaling and inference over validated columns."""
+    bundle = bundle or artifacts.current
+    return infer(build_feature_matrix(columns, bundle), bundle)
+
 @app.route('/health', methods=['GET'])
 def health():
+    bundle = artifacts.current
     return jsonify({
         'status': 'ok',
-        'model': metadata['best_model'],
+        'model': bundle.metadata['best_model'],
+        'model_version': bundle.version,
+        'model_sha256': bundle.sha256,
+        'model_reload': artifacts.snapshot(),
+        'inference_engine': bundle.engine.describe(),
+        'model_memory': {**bundle.load_info, 'process': process_memory()},
         'version': '1.0.0'
     }), 200
 
 @app.route('/classes', methods=['GET'])
 def get_classes():
+    classes = artifacts.current.classes
     return jsonify({
-        'classes': CLASSES,
-        'count': len(CLASSES)
+        'classes': classes,
+        'count': len(classes)
     }), 200
 
 @app.route('/metadata', methods=['GET'])
 def get_metadata():
-    return jsonify(metadata), 200
+    return jsonify(artifacts.current.metadata), 200
+
+@app.route('/model/reload', methods=['POST'])
+def reload_model():
+    """
+    Load a new artifact directory ({"path": ...}, default: the current one),
+    warm it up and swap it in. Other requests keep being served by the old
+    version meanwhile, and if the new one fails to load.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        bundle = reload_artifacts(data.get('path'))
+    except ReloadInProgressError as e:
+        return jsonify({'error': str(e)}), 409
+    except ReloadError as e:
+        return jsonify({'error': 'Reload failed', 'details': str(e)}), 422
+
+    return jsonify({
+        'model_version': bundle.version,
+        'model_sha256': bundle.sha256,
+        'directory': bundle.directory,
+        'reload_seconds': artifacts.last_reload_seconds,
+    }), 200
 
 @app.route('/predict', methods=['POST'])
 def predict():
@@ -109,13 +294,11 @@ def predict():
         return jsonify({'error': 'Validation failed', 'details': errors}), 400
 
     try:
-        features_df = build_feature_vector(data)
-        features_scaled = scaler.transform(features_df)
-
-        pred_idx = int(model.predict(features_scaled)[0])
-        prob = model.predict_proba(features_scaled)[0]
+        bundle = artifacts.current
+        pred_idx, prob = infer(build_feature_vector(data, bundle), bundle)
+        pred_idx, prob = int(pred_idx[0]), prob[0]
 
-        predicted_class = label_encoder.classes_[pred_idx]
+        predicted_class = bundle.label_encoder.classes_[pred_idx]
         confidence = round(float(prob[pred_idx]) * 100, 2)
         is_failure = predicted_class != 'No Failure'
 
@@ -130,7 +313,7 @@ def predict():
 
         all_probs = {
             cls: round(float(p) * 100, 2)
-            for cls, p in zip(label_encoder.classes_, prob)
+            for cls, p in zip(bundle.label_encoder.classes_, prob)
         }
 
         response = {
@@ -159,38 +342,78 @@ def predict_batch():
     if not readings:
         return jsonify({'error': "'readings' array is required and cannot be empty"}), 400
 
-    if len(readings) > 100:
-        return jsonify({'error': 'Batch size cannot exceed 100 readings'}), 400
+    if not isinstance(readings, list):
+        return jsonify({'error': "'readings' must be an array"}), 400
 
-    results = []
-    for i, reading in enumerate(readings):
-        errors = validate_input(reading)
-        if errors:
-            results.append({'index': i, 'error': errors})
-            continue
+    if len(readings) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch size cannot exceed {MAX_BATCH_SIZE} readings'}), 400
+
+    results = score_readings(readings)
+    return jsonify({'results': results, 'total': len(results)}), 200
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """
+    Score an NDJSON or CSV upload of any size, streaming NDJSON results back.
 
+    The body is parsed incrementally and scored in chunks of
+    STREAM_CHUNK_SIZE records, so memory stays bounded by the chunk size.
+    """
+    try:
+        fmt = detect_format(request.content_type, request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    records = iter_records(request.stream, fmt)
+
+    def generate():
+        base = 0
+        for chunk in chunked(records, STREAM_CHUNK_SIZE):
+            scored = iter(score_readings([r for r in chunk if not isinstance(r, RecordError)]))
+            lines = []
+            for i, record in enumerate(chunk, start=base):
+                if isinstance(record, RecordError):
+                    result = {'index': i, 'error': record.message}
+                else:
+                    result = next(scored)
+                    result['index'] = i
+                lines.append(to_ndjson(result))
+            base += len(chunk)
+            yield b''.join(lines)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def score_readings(readings: list) -> list[dict]:
+    """Validate and score a batch column-wise; one result per reading, in order."""
+    bundle = artifacts.current
+    columns, valid, errors = validate_batch(readings)
+    valid_idx = np.flatnonzero(valid)
+
+    scored = {}
+    if len(valid_idx):
         try:
-            features_df = build_feature_vector(reading)
-            features_scaled = scaler.transform(features_df)
-
-            pred_idx = int(model.predict(features_scaled)[0])
-            prob = model.predict_proba(features_scaled)[0]
-            predicted_class = label_encoder.classes_[pred_idx]
-
-            results.append({
-                'index': i,
-                'predicted_failure_type': predicted_class,
-                'is_failure': predicted_class != 'No Failure',
-                'confidence': round(float(prob[pred_idx]) * 100, 2),
-            })
+            pred_idx, prob = predict_columns({k: v[valid_idx] for k, v in columns.items()}, bundle)
+            predicted = bundle.label_encoder.classes_[pred_idx].tolist()
+            confidence = (prob.max(axis=1) * 100).tolist()
+
+            for i, predicted_class, conf in zip(valid_idx.tolist(), predicted, confidence):
+                scored[i] = {
+                    'index': i,
+                    'predicted_failure_type': predicted_class,
+                    'is_failure': predicted_class != 'No Failure',
+                    'confidence': round(conf, 2),
+                }
         except Exception as e:
-            results.append({'index': i, 'error': str(e)})
+            scored = {i: {'index': i, 'error': str(e)} for i in valid_idx.tolist()}
 
-    return jsonify({'results': results, 'total': len(results)}), 200
+    return [
+        scored[i] if i in scored else {'index': i, 'error': errors[i]}
+        for i in range(len(readings))
+    ]
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
     print(f"\nAPI starting on http://localhost:{port}")
-    print(f"   Endpoints: /health  /predict  /predict/batch  /classes  /metadata\n")
+    print(f"   Endpoints: /health  /predict  /predict/batch  /predict/stream  /classes  /metadata  /model/reload\n")
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Compiled forest vs stock sklearn benchmark.
+
+Scores rows from predictive_maintenance.csv with the ml/app.py model using
+model.predict_proba and CompiledForest.predict_proba at batch sizes 1, 64
+and 4096. Exits non-zero unless the compiled probabilities are bit-identical
+to sklearn's (evaluated with n_jobs=1, whose summation order is fixed).
+
+USAGE (from the repo root, with ml/model_artifacts/model.pkl present):
+    python ml/benchmarks/bench_forest.py [--repeat 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ML_DIR, 'predictive_maintenance.csv')
+BATCH_SIZES = (1, 64, 4096)
+
+sys.path.insert(0, ML_DIR)
+
+
+def load_features(app, n_rows: int) -> np.ndarray:
+    df = pd.read_csv(DATA_PATH, nrows=n_rows)
+    readings = [
+        {
+            'machine_type':        row['Type'],
+            'air_temperature':     row['Air temperature [K]'],
+            'process_temperature': row['Process temperature [K]'],
+            'rotational_speed':    row['Rotational speed [rpm]'],
+            'torque':              row['Torque [Nm]'],
+            'tool_wear':           row['Tool wear [min]'],
+        }
+        for _, row in df.iterrows()
+    ]
+    return np.vstack([app.build_feature_vector(r) for r in readings])
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    import app
+    from forest import CompiledForest
+
+    X = load_features(app, max(BATCH_SIZES))
+    model = app.artifacts.current.model
+
+    start = time.perf_counter()
+    forest = CompiledForest.from_sklearn(model)
+    compile_ms = (time.perf_counter() - start) * 1e3
+    print(f'Compiled {forest.n_trees} trees (max depth {forest.max_depth}, '
+          f'{forest.nbytes / 1e6:.1f} MB) in {compile_ms:.0f} ms')
+
+    configured_jobs = model.n_jobs
+    model.n_jobs = 1
+    identical = np.array_equal(model.predict_proba(X), forest.predict_proba(X))
+    print(f'Bit-identical to predict_proba (n_jobs=1) on {len(X)} rows: {identical}\n')
+
+    print(f'{"batch":>6} {"sklearn n_jobs=" + str(configured_jobs):>20} '
+          f'{"sklearn n_jobs=1":>18} {"compiled":>12}')
+    for batch_size in BATCH_SIZES:
+        Xb = X[:batch_size]
+        model.n_jobs = configured_jobs
+        stock = best_of(lambda: model.predict_proba(Xb), args.repeat)
+        model.n_jobs = 1
+        serial = best_of(lambda: model.predict_proba(Xb), args.repeat)
+        compiled = best_of(lambda: forest.predict_proba(Xb), args.repeat)
+        print(f'{batch_size:>6} {stock * 1e3:>17.2f} ms {serial * 1e3:>15.2f} ms '
+              f'{compiled * 1e3:>9.2f} ms')
+    model.n_jobs = configured_jobs
+
+    if not identical:
+        print('FAIL: compiled forest probabilities differ from sklearn')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
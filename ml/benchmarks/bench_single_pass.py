@@ -0,0 +1,129 @@
+"""
+Single-pass inference check + benchmark.
+
+Compares the legacy two-call path (model.predict + model.predict_proba) with
+the single predict_proba pass used by ml/app.py and the ml-service
+ModelPredictor. Exits non-zero if any label differs from the legacy path.
+
+USAGE (from the repo root, with ml/model_artifacts/model.pkl present):
+    python ml/benchmarks/bench_single_pass.py [--rows 2000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_SERVICE_APP_DIR = os.path.normpath(
+    os.path.join(ML_DIR, '..', 'alerion-backend', 'ml-service', 'app'))
+DATA_PATH = os.path.join(ML_DIR, 'predictive_maintenance.csv')
+BATCH_SIZES = (1, 64, 1024)
+
+sys.path.insert(0, ML_DIR)
+sys.path.insert(0, ML_SERVICE_APP_DIR)
+
+
+def load_readings(n_rows: int) -> list[dict]:
+    df = pd.read_csv(DATA_PATH, nrows=n_rows)
+    return [
+        {
+            'machine_id':          str(row['Product ID']),
+            'machine_type':        row['Type'],
+            'air_temperature':     row['Air temperature [K]'],
+            'process_temperature': row['Process temperature [K]'],
+            'rotational_speed':    row['Rotational speed [rpm]'],
+            'torque':              row['Torque [Nm]'],
+            'tool_wear':           row['Tool wear [min]'],
+        }
+        for _, row in df.iterrows()
+    ]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def report(name: str, batch_size: int, legacy_s: float, single_s: float):
+    print(f'  {name:<16} batch={batch_size:<5} '
+          f'two-call {legacy_s * 1e3:9.2f} ms   '
+          f'single-pass {single_s * 1e3:9.2f} ms   '
+          f'speedup {legacy_s / single_s:5.2f}x')
+
+
+def bench_flask_app(readings: list[dict], repeat: int) -> bool:
+    import app
+
+    model = app.artifacts.current.model
+    features_scaled = np.vstack([app.build_feature_vector(r) for r in readings])
+
+    legacy = model.predict(features_scaled)
+    single, _ = app.infer(features_scaled)
+    identical = np.array_equal(legacy, single)
+    print(f'ml/app.py labels identical on {len(readings)} rows: {identical}')
+
+    for batch_size in BATCH_SIZES:
+        X = features_scaled[:batch_size]
+
+        def two_call():
+            model.predict(X)
+            model.predict_proba(X)
+
+        report('ml/app.py', batch_size, best_of(two_call, repeat),
+               best_of(lambda: app.infer(X), repeat))
+    return identical
+
+
+def bench_model_predictor(readings: list[dict], repeat: int) -> bool:
+    from predictor import ModelPredictor
+
+    predictor = ModelPredictor(os.getenv('MODEL_PATH', os.path.join(
+        ML_SERVICE_APP_DIR, '..', 'model', 'model.pkl')))
+    if not predictor.model_loaded:
+        print('ModelPredictor: no model loaded — skipped')
+        return True
+
+    features = np.array([predictor._extract_features(r) for r in readings])
+    legacy = predictor.model.predict(features)
+    single = np.array([predictor.predict(r)['prediction'] for r in readings])
+    batch = np.array([r['prediction'] for r in predictor.predict_batch(readings)])
+    identical = np.array_equal(legacy, single) and np.array_equal(legacy, batch)
+    print(f'ModelPredictor labels identical on {len(readings)} rows: {identical}')
+
+    for batch_size in BATCH_SIZES:
+        X = features[:batch_size]
+
+        def two_call():
+            predictor.model.predict(X)
+            predictor.model.predict_proba(X)
+
+        report('ModelPredictor', batch_size, best_of(two_call, repeat),
+               best_of(lambda: predictor.model.predict_proba(X), repeat))
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    readings = load_readings(args.rows)
+    ok = bench_flask_app(readings, args.repeat)
+    ok = bench_model_predictor(readings, args.repeat) and ok
+
+    if not ok:
+        print('FAIL: single-pass labels differ from predict()')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+"""
+Inference benchmark suite.
+
+Drives every inference entry point with synthetic telemetry sampled (with
+a fixed seed) from predictive_maintenance.csv, and reports throughput,
+p50/p99 latency per call and peak traced allocation per call:
+
+    predictor.predict        ModelPredictor, model and heuristic paths
+    predictor.predict_batch  ModelPredictor, several batch sizes
+    app.build_feature_vector ml/app.py feature construction
+    flask /predict           ml/app.py via the Flask test client
+    flask /predict/batch     ml/app.py, several batch sizes
+    kafka loop               ml-service kafka_consumer_loop on the
+                             in-process memory transport (transport.py),
+                             several BATCH_SIZEs
+
+Results are written as JSON; --compare prints the throughput change per
+case against an earlier run and --max-regression turns it into a gate.
+
+USAGE (from the repo root, with both model.pkl files present):
+    python ml/benchmarks/bench_suite.py
+    python ml/benchmarks/bench_suite.py --quick --compare ml/benchmarks/results/<earlier>.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(ML_DIR)
+ML_SERVICE_DIR = os.path.join(REPO_DIR, 'alerion-backend', 'ml-service')
+DATA_PATH = os.path.join(ML_DIR, 'predictive_maintenance.csv')
+RESULTS_DIR = os.path.join(ML_DIR, 'benchmarks', 'results')
+
+# The service reads these at import time
+os.environ.setdefault('MODEL_PATH', os.path.join(ML_SERVICE_DIR, 'model', 'model.pkl'))
+os.environ.setdefault('LOG_LEVEL', 'ERROR')  # keep alert logs out of the timings
+
+sys.path.insert(0, ML_DIR)
+sys.path.insert(0, os.path.join(ML_SERVICE_DIR, 'app'))
+
+SEED = 42
+BATCH_SIZES = (1, 16, 256, 4096)
+LOOP_BATCH_SIZES = (1, 16, 256)
+ALLOC_CALLS = 3
+
+CSV_FIELDS = {
+    'Air temperature [K]':     'air_temperature',
+    'Process temperature [K]': 'process_temperature',
+    'Rotational speed [rpm]':  'rotational_speed',
+    'Torque [Nm]':             'torque',
+    'Tool wear [min]':         'tool_wear',
+}
+
+
+def synthetic_readings(n: int, seed: int = SEED) -> list[dict]:
+    """Rows sampled with replacement from the dataset, with 1%-of-std jitter."""
+    rng = np.random.default_rng(seed)
+    df = pd.read_csv(DATA_PATH)
+    sample = df.iloc[rng.integers(0, len(df), n)].reset_index(drop=True)
+
+    readings = {'machine_type': sample['Type'].tolist()}
+    for column, field in CSV_FIELDS.items():
+        values = sample[column].to_numpy(dtype=np.float64)
+        jittered = values + rng.normal(0, 0.01 * df[column].std(), n)
+        readings[field] = np.clip(jittered, df[column].min(), df[column].max()).round(2).tolist()
+
+    return [
+        {
+            'machine_id': f'MACHINE-{i % 50:03d}',
+            'machine_type': readings['machine_type'][i],
+            **{field: readings[field][i] for field in CSV_FIELDS.values()},
+        }
+        for i in range(n)
+    ]
+
+
+# ─── Measurement ─────────────────────────────────────────────
+
+def summarize(name: str, batch_size: int, latencies: list[float], alloc_bytes: list[int]) -> dict:
+    ms = np.array(latencies) * 1000
+    total_s = float(np.sum(latencies))
+    result = {
+        'name': name,
+        'batch_size': batch_size,
+        'calls': len(latencies),
+        'throughput_items_s': round(len(latencies) * batch_size / total_s, 1),
+        'p50_ms': round(float(np.percentile(ms, 50)), 4),
+        'p99_ms': round(float(np.percentile(ms, 99)), 4),
+        'mean_ms': round(float(ms.mean()), 4),
+        'alloc_peak_bytes_per_call': int(np.mean(alloc_bytes)) if alloc_bytes else None,
+    }
+    print(f"  {name:<28} batch={batch_size:<5} {result['throughput_items_s']:>12,.0f} items/s  "
+          f"p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+          f"alloc {result['alloc_peak_bytes_per_call'] / 1024:9.1f} KiB/call")
+    return result
+
+
+def measure(name: str, batch_size: int, fn, batches: list, min_calls: int, max_seconds: float) -> dict:
+    """Time fn(batch) over the batches (cycled), then trace allocations of a few calls."""
+    for batch in batches[:2]:
+        fn(batch)  # warm-up
+
+    # At least min_calls, then keep going until max_seconds (capped at 100×)
+    latencies = []
+    deadline = time.perf_counter() + max_seconds
+    while True:
+        batch = batches[len(latencies) % len(batches)]
+        start = time.perf_counter()
+        fn(batch)
+        latencies.append(time.perf_counter() - start)
+        if len(latencies) >= min_calls and (
+            time.perf_counter() >= deadline or len(latencies) >= 100 * min_calls
+        ):
+            break
+
+    alloc = []
+    tracemalloc.start()
+    for batch in batches[:ALLOC_CALLS]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(batch)
+        alloc.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    return summarize(name, batch_size, latencies, alloc)
+
+
+def make_batches(readings: list[dict], batch_size: int, count: int) -> list[list[dict]]:
+    n = len(readings)
+    return [
+        [readings[(b * batch_size + j) % n] for j in range(batch_size)]
+        for b in range(count)
+    ]
+
+
+# ─── In-process Kafka (memory transport) ─────────────────────
+
+def timed_consumer(service, broker, group: str, total: int, trace_alloc: bool = False):
+    """
+    Memory-transport consumer that times the loop: each consume() call
+    marks the end of the previous batch, so the gaps between calls are
+    per-batch latencies. Stops the loop once `total` messages were handed
+    out. With trace_alloc, the traced allocation peak per batch is recorded.
+    """
+    from transport import MemoryConsumer
+
+    class TimedConsumer(MemoryConsumer):
+        def __init__(self):
+            super().__init__(broker, {'group.id': group, 'enable.auto.commit': False})
+            self.consumed = 0
+            self.latencies = []
+            self.alloc = []
+            self._last = None
+
+        def consume(self, num_messages: int = 1, timeout: float = -1):
+            now = time.perf_counter()
+            if self._last is not None:
+                self.latencies.append(now - self._last)
+                if trace_alloc:
+                    self.alloc.append(tracemalloc.get_traced_memory()[1] - self._alloc_base)
+            if self.consumed >= total:
+                service.running = False
+                return []
+
+            batch = super().consume(min(num_messages, total - self.consumed), timeout=0)
+            self.consumed += len(batch)
+            if trace_alloc:
+                tracemalloc.reset_peak()
+                self._alloc_base = tracemalloc.get_traced_memory()[0]
+            self._last = time.perf_counter()
+            return batch
+
+    return TimedConsumer()
+
+
+def run_consumer_loop(service, payloads: list[bytes], batch_size: int, trace_alloc: bool = False):
+    """Run kafka_consumer_loop over `payloads`, appended to the memory broker's input topic."""
+    from transport import get_transport
+
+    transport = get_transport('memory')
+    broker = transport.broker
+    topic_in, topic_out = service.MACHINE_DATA_TOPIC, service.PREDICTION_DATA_TOPIC
+    broker.create_topic(topic_in, partitions=1)
+    broker.create_topic(topic_out, partitions=1)
+
+    # A fresh group, committed at the end of the input, reads just these payloads
+    start = broker.watermarks(topic_in, 0)[1]
+    group = f'bench-suite-{start}'
+    broker.commit(group, {(topic_in, 0): start})
+    for payload in payloads:
+        broker.append(topic_in, 0, None, payload, None, 0)
+
+    consumer = timed_consumer(service, broker, group, len(payloads), trace_alloc)
+    produced_before = broker.watermarks(topic_out, 0)[1]
+    service.BATCH_SIZE = batch_size
+    service.running = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        service.kafka_consumer_loop(consumer, transport.producer({}))
+    service.running = True
+    produced = broker.watermarks(topic_out, 0)[1] - produced_before
+    if produced != len(payloads):
+        raise RuntimeError(f'Loop produced {produced} of {len(payloads)} messages')
+    return consumer
+
+
+# ─── Suite ───────────────────────────────────────────────────
+
+def run_suite(quick: bool) -> list[dict]:
+    min_calls = 20 if quick else 100
+    max_seconds = 0.5 if quick else 2.0
+    readings = synthetic_readings(10000)
+    results = []
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+        import main
+        from predictor import ModelPredictor
+        heuristic = ModelPredictor(model_path=os.path.join(ML_SERVICE_DIR, 'model', 'missing.pkl'))
+    predictor = main.predictor
+    print(f"ml-service model loaded: {predictor.model_loaded}")
+
+    print('ModelPredictor')
+    singles = [[r] for r in readings[:1000]]
+    results.append(measure('predictor.predict/model', 1,
+                           lambda b: predictor.predict(b[0]), singles, min_calls, max_seconds))
+    results.append(measure('predictor.predict/heuristic', 1,
+                           lambda b: heuristic.predict(b[0]), singles, min_calls, max_seconds))
+    for batch_size in BATCH_SIZES:
+        results.append(measure('predictor.predict_batch', batch_size, predictor.predict_batch,
+                               make_batches(readings, batch_size, 8), min_calls, max_seconds))
+
+    print('ml/app.py')
+    results.append(measure('app.build_feature_vector', 1,
+                           lambda b: app.build_feature_vector(b[0]), singles, min_calls, max_seconds))
+    client = app.app.test_client()
+
+    def post_predict(batch):
+        response = client.post('/predict', json=batch[0])
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    def post_batch(batch):
+        response = client.post('/predict/batch', json={'readings': batch})
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    results.append(measure('flask /predict', 1, post_predict, singles, min_calls, max_seconds))
+    for batch_size in BATCH_SIZES[1:]:
+        results.append(measure('flask /predict/batch', batch_size, post_batch,
+                               make_batches(readings, batch_size, 8), min_calls, max_seconds))
+
+    print('Kafka consumer loop (in-process memory transport)')
+    messages = [json.dumps(r).encode('utf-8') for r in readings]
+    for batch_size in LOOP_BATCH_SIZES:
+        n = min(len(messages), batch_size * min_calls)
+        run_consumer_loop(main, messages[:batch_size * 2], batch_size)  # warm-up
+        consumer = run_consumer_loop(main, messages[:n], batch_size)
+
+        tracemalloc.start()
+        traced = run_consumer_loop(main, messages[:batch_size * ALLOC_CALLS], batch_size, trace_alloc=True)
+        tracemalloc.stop()
+        results.append(summarize('kafka loop', batch_size, consumer.latencies, traced.alloc))
+
+    return results
+
+
+def environment() -> dict:
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': SEED,
+        'inference_engine': os.environ.get('INFERENCE_ENGINE', 'sklearn'),
+    }
+
+
+def compare(results: list[dict], baseline_path: str) -> float:
+    """Print throughput change per case; returns the worst regression (fraction)."""
+    with open(baseline_path) as f:
+        baseline = {(r['name'], r['batch_size']): r for r in json.load(f)['results']}
+
+    print(f'\nvs {baseline_path}')
+    worst = 0.0
+    for r in results:
+        old = baseline.get((r['name'], r['batch_size']))
+        if old is None:
+            continue
+        change = r['throughput_items_s'] / old['throughput_items_s'] - 1
+        worst = min(worst, change)
+        print(f"  {r['name']:<28} batch={r['batch_size']:<5} throughput {change:+7.1%}   "
+              f"p99 {old['p99_ms']:9.3f} → {r['p99_ms']:9.3f} ms")
+    return -worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='fewer calls per case')
+    parser.add_argument('--output', help=f'JSON results path (default: {RESULTS_DIR}/bench-<time>.json)')
+    parser.add_argument('--compare', help='earlier JSON results to compare against')
+    parser.add_argument('--max-regression', type=float,
+                        help='with --compare, exit 1 if any throughput drops by more than this fraction')
+    args = parser.parse_args()
+
+    results = run_suite(args.quick)
+    report = {'environment': environment(), 'results': results}
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare:
+        worst = compare(results, args.compare)
+        if args.max_regression is not None and worst > args.max_regression:
+            print(f'Throughput regression {worst:.1%} exceeds {args.max_regression:.1%}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
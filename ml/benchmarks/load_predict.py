@@ -0,0 +1,146 @@
+"""
+Concurrent-client load test for the FastAPI ML service /predict endpoint.
+
+Runs --clients concurrent clients, each posting readings from
+predictive_maintenance.csv back to back, while a separate probe polls
+/health. Reports throughput and p50/p95/p99 latency for both, plus the
+service's dynamic batching stats, so event-loop stalls show up directly
+as /health tail latency. Before the load run it checks that one
+malformed request (torque="abc") sent together with two good ones is
+rejected with 422 on its own while the good ones still score.
+
+By default the service is loaded in-process (httpx ASGI transport, no
+Kafka); pass --url to hit a running server instead.
+
+USAGE (from the repo root, with alerion-backend/ml-service/model/model.pkl present):
+    python ml/benchmarks/load_predict.py --clients 64 --requests 4000
+    PREDICT_BATCH_SIZE=1 python ml/benchmarks/load_predict.py        # no coalescing
+    python ml/benchmarks/load_predict.py --url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ML_DIR, 'predictive_maintenance.csv')
+ML_SERVICE_DIR = os.path.normpath(os.path.join(ML_DIR, '..', 'alerion-backend', 'ml-service'))
+HEALTH_INTERVAL = 0.05
+
+
+def load_readings(n_rows: int) -> list[dict]:
+    df = pd.read_csv(DATA_PATH, nrows=n_rows)
+    return [
+        {
+            'machine_id':          row['Product ID'],
+            'machine_type':        row['Type'],
+            'air_temperature':     float(row['Air temperature [K]']),
+            'process_temperature': float(row['Process temperature [K]']),
+            'rotational_speed':    float(row['Rotational speed [rpm]']),
+            'torque':              float(row['Torque [Nm]']),
+            'tool_wear':           float(row['Tool wear [min]']),
+        }
+        for _, row in df.iterrows()
+    ]
+
+
+def in_process_client() -> httpx.AsyncClient:
+    os.chdir(os.path.join(ML_SERVICE_DIR, 'app'))
+    os.environ.setdefault('MODEL_PATH', '../model/model.pkl')
+    sys.path.insert(0, os.getcwd())
+    import main
+
+    # No lifespan: the Kafka consumer stays off, the batcher starts lazily
+    transport = httpx.ASGITransport(app=main.app)
+    return httpx.AsyncClient(transport=transport, base_url='http://ml-service')
+
+
+def summarize(name: str, latencies: list[float], elapsed: float):
+    if not latencies:
+        print(f"{name:<10} no requests completed")
+        return
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"{name:<10} {len(ms):>7,} req  {len(ms) / elapsed:>9,.0f} req/s  "
+          f"p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  p99 {p99:7.2f} ms  max {ms.max():7.2f} ms")
+
+
+async def check_isolation(client: httpx.AsyncClient, reading: dict):
+    """Good / malformed / good sent concurrently, so they share one batch."""
+    bad = {**reading, 'torque': 'abc'}
+    responses = await asyncio.gather(*(client.post('/predict', json=r) for r in (reading, bad, reading)))
+    statuses = [response.status_code for response in responses]
+    print(f"isolation (good, bad, good): {statuses}")
+    if statuses != [200, 422, 200]:
+        sys.exit('a malformed request affected the requests batched with it')
+
+
+async def run(client: httpx.AsyncClient, readings: list[dict], clients: int, total: int):
+    latencies, statuses = [], {}
+    health_latencies = []
+    remaining = iter(range(total))
+    done = asyncio.Event()
+
+    async def worker():
+        for i in remaining:
+            start = time.perf_counter()
+            response = await client.post('/predict', json=readings[i % len(readings)])
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def health_probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get('/health')
+            health_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(HEALTH_INTERVAL)
+
+    probe = asyncio.create_task(health_probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe
+
+    summarize('/predict', latencies, elapsed)
+    summarize('/health', health_latencies, elapsed)
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+
+    stats = (await client.get('/stats')).json()
+    if 'http_batching' in stats:
+        print(f"batching: {stats['http_batching']}")
+
+
+async def main_async(args):
+    readings = load_readings(args.rows)
+    client = (
+        httpx.AsyncClient(base_url=args.url, timeout=30)
+        if args.url else in_process_client()
+    )
+    async with client:
+        # Warm-up: model caches, lazy batcher start
+        await client.post('/predict', json=readings[0])
+        await check_isolation(client, readings[0])
+        print(f"{args.clients} clients, {args.requests:,} requests "
+              f"({'in-process' if not args.url else args.url})")
+        await run(client, readings, args.clients, args.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='base URL of a running ML service (default: in-process)')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--rows', type=int, default=1000, help='distinct readings to cycle through')
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+"""
+End-to-end Kafka replay / load test for the ML service consumer loop.
+
+Pushes machine-data readings at a configurable rate, reads the enriched
+results back from prediction-data and reports throughput and end-to-end
+latency (produce → prediction received) percentiles.
+
+Sources:
+    csv        rows of predictive_maintenance.csv, in file order (cycled)
+    synthetic  streams modelled on alerion-backend/src/edge/edgeSimulator.ts:
+               Gaussian noise around the middle of each sensor range
+               (σ = 15% of the range × the node's variance factor), a slow
+               sin(tick / 200) × 5 drift of the temperatures, a 2% chance
+               per reading of a ×1.5 variance spike on speed and torque,
+               and tool wear growing by U(0, 0.5) per reading until the
+               tool is replaced at the range maximum. The first five
+               machines use the edgeNode1-5 configs.
+
+Transports:
+    memory  (default) the service's kafka_consumer_loop runs in this process
+            on the in-memory broker (KAFKA_TRANSPORT=memory) — no Kafka or
+            other services needed. Service settings (BATCH_SIZE,
+            COMMIT_MODE, CASCADE_MODE, ...) come from the environment.
+    kafka   only generate load: produce to KAFKA_BROKERS and read back the
+            predictions of an already running service.
+
+USAGE (from the repo root, with alerion-backend/ml-service/model/model.pkl present):
+    python ml/benchmarks/replay.py --rate 2000 --duration 20
+    BATCH_SIZE=256 python ml/benchmarks/replay.py --source synthetic --machines 500 --rate 0 --messages 100000
+    python ml/benchmarks/replay.py --transport kafka --rate 500 --duration 60
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import math
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(ML_DIR, 'predictive_maintenance.csv')
+ML_SERVICE_DIR = os.path.normpath(os.path.join(ML_DIR, '..', 'alerion-backend', 'ml-service'))
+sys.path.insert(0, os.path.join(ML_SERVICE_DIR, 'app'))
+
+# DEFAULT_TELEMETRY_BOUNDS in alerion-backend/src/types/machine.types.ts
+BOUNDS = {
+    'air_temperature':     (290.0, 320.0),
+    'process_temperature': (300.0, 340.0),
+    'rotational_speed':    (1000.0, 3000.0),
+    'torque':              (10.0, 80.0),
+    'tool_wear':           (0.0, 250.0),
+}
+# (machine type, variance factor) of edgeNode1.ts … edgeNode5.ts
+EDGE_NODES = (('L', 1.0), ('M', 1.1), ('H', 0.9), ('L', 1.2), ('M', 0.8))
+
+
+class EdgeSimulator:
+    """One simulated machine, following edgeSimulator.ts tick by tick."""
+
+    def __init__(self, machine_id: str, machine_type: str, variance_factor: float,
+                 rng: random.Random):
+        self.machine_id = machine_id
+        self.machine_type = machine_type
+        self.variance_factor = variance_factor
+        self.rng = rng
+        self.tick = 0
+        self.tool_wear = rng.random() * 50  # start with some initial wear
+
+    def _sensor(self, name: str, variance_factor: float, drift: float = 0.0) -> float:
+        low, high = BOUNDS[name]
+        value = self.rng.gauss((low + high) / 2 + drift, (high - low) * 0.15 * variance_factor)
+        return min(high, max(low, value))
+
+    def next(self) -> dict:
+        self.tick += 1
+        self.tool_wear += self.rng.random() * 0.5
+        if self.tool_wear > BOUNDS['tool_wear'][1]:
+            self.tool_wear = 0.0  # tool replaced
+
+        drift = math.sin(self.tick / 200) * 5
+        spike = 1.5 if self.rng.random() < 0.02 else 1.0
+        factor = self.variance_factor
+        return {
+            'machine_id':          self.machine_id,
+            'machine_type':        self.machine_type,
+            'air_temperature':     round(self._sensor('air_temperature', factor, drift), 2),
+            'process_temperature': round(self._sensor('process_temperature', factor, drift * 1.2), 2),
+            'rotational_speed':    round(self._sensor('rotational_speed', factor * spike)),
+            'torque':              round(self._sensor('torque', factor * spike), 2),
+            'tool_wear':           round(min(self.tool_wear, BOUNDS['tool_wear'][1])),
+            'timestamp':           datetime.now(timezone.utc).isoformat(),
+        }
+
+
+def synthetic_stream(machines: int, seed: int):
+    rng = random.Random(seed)
+    nodes = [
+        EdgeSimulator(f'MACHINE_{i + 1:03d}', *EDGE_NODES[i % len(EDGE_NODES)], rng)
+        for i in range(machines)
+    ]
+    for node in itertools.cycle(nodes):
+        yield node.next()
+
+
+def csv_stream(path: str):
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lstrip('﻿') for c in df.columns]
+    rows = [
+        {
+            'machine_id':          str(row['Product ID']),
+            'machine_type':        row['Type'],
+            'air_temperature':     float(row['Air temperature [K]']),
+            'process_temperature': float(row['Process temperature [K]']),
+            'rotational_speed':    float(row['Rotational speed [rpm]']),
+            'torque':              float(row['Torque [Nm]']),
+            'tool_wear':           float(row['Tool wear [min]']),
+        }
+        for _, row in df.iterrows()
+    ]
+    for row in itertools.cycle(rows):
+        yield dict(row)
+
+
+class ResultReader(threading.Thread):
+    """Consumes prediction-data and records end-to-end latency per replay_seq."""
+
+    def __init__(self, consumer, sent_at: np.ndarray, decode):
+        super().__init__(name='replay-results', daemon=True)
+        self.consumer = consumer
+        self.sent_at = sent_at
+        self.decode = decode
+        self.latencies = []
+        self.received = 0
+        self.alerts = 0
+        self.foreign = 0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            msgs = self.consumer.consume(num_messages=1000, timeout=0.1)
+            now = time.perf_counter()
+            for msg in msgs:
+                if msg.error():
+                    continue
+                result = self.decode(msg)
+                seq = result.get('replay_seq') if isinstance(result, dict) else None
+                if seq is None or not 0 <= seq < len(self.sent_at):
+                    self.foreign += 1
+                    continue
+                self.latencies.append(now - self.sent_at[seq])
+                self.received += 1
+                self.alerts += result.get('prediction') == 1
+
+    def stop(self):
+        self.running = False
+        self.join(timeout=5)
+        self.consumer.close()
+
+
+def start_in_process_service(partitions: int):
+    """Import the ML service on the memory transport and start its consumer loop."""
+    os.environ['KAFKA_TRANSPORT'] = 'memory'
+    os.environ.setdefault('MODEL_PATH', os.path.join(ML_SERVICE_DIR, 'model', 'model.pkl'))
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')  # alerts log at WARNING
+    from transport import get_transport
+
+    broker = get_transport('memory').broker
+    import main
+
+    for topic in (main.MACHINE_DATA_TOPIC, main.PREDICTION_DATA_TOPIC):
+        broker.create_topic(topic, partitions)
+    consumer = main.create_kafka_consumer()
+    loop = threading.Thread(target=main.kafka_consumer_loop, args=(consumer,),
+                            name='kafka-consumer', daemon=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        loop.start()
+        # Wait for the partition assignment so 'latest' does not skip the first readings
+        while not consumer.assignment():
+            time.sleep(0.01)
+    return main, loop
+
+
+def summarize(reader: ResultReader, sent: int, elapsed: float, label: str):
+    ms = np.array(reader.latencies) * 1000
+    line = f'{label:<8} sent {sent:>9,}  received {reader.received:>9,}  {reader.received / elapsed:>9,.0f} msg/s'
+    if len(ms):
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        line += f'  e2e p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  p99 {p99:7.2f} ms  max {ms.max():8.2f} ms'
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', choices=('csv', 'synthetic'), default='csv')
+    parser.add_argument('--csv', default=DATA_PATH)
+    parser.add_argument('--machines', type=int, default=5, help='synthetic machines (default 5)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--transport', choices=('memory', 'kafka'), default='memory')
+    parser.add_argument('--partitions', type=int, default=4, help='memory transport partitions per topic')
+    parser.add_argument('--rate', type=float, default=1000, help='messages/s (0 = as fast as possible)')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of sending')
+    parser.add_argument('--messages', type=int, help='stop after this many messages instead')
+    parser.add_argument('--drain-timeout', type=float, default=30,
+                        help='seconds to wait for outstanding predictions')
+    args = parser.parse_args()
+
+    from codec import HeaderCodecSelector, get_codec
+    from transport import get_transport
+
+    topic_in = os.getenv('MACHINE_DATA_TOPIC', 'machine-data')
+    topic_out = os.getenv('PREDICTION_DATA_TOPIC', 'prediction-data')
+    brokers = os.getenv('KAFKA_BROKERS', 'localhost:9092')
+    input_codec = get_codec(os.getenv('MESSAGE_CODEC', 'json').replace('auto', 'json'))
+    output_codecs = HeaderCodecSelector(get_codec('json'))
+
+    service = None
+    if args.transport == 'memory':
+        print('Starting the ML service consumer loop in-process (memory transport)...')
+        service, loop = start_in_process_service(args.partitions)
+        print(f'  model loaded: {service.predictor.model_loaded}   BATCH_SIZE={service.BATCH_SIZE}   '
+              f'COMMIT_MODE={service.COMMIT_MODE}   partitions={args.partitions}')
+
+    transport = get_transport(args.transport)
+    producer = transport.producer({'bootstrap.servers': brokers, 'linger.ms': 5})
+    consumer = transport.consumer({
+        'bootstrap.servers': brokers,
+        'group.id': f'alerion-replay-{os.getpid()}',
+        'auto.offset.reset': 'latest',
+    })
+    consumer.subscribe([topic_out])
+    while not consumer.assignment():
+        consumer.consume(num_messages=1, timeout=0.2)
+
+    limit = args.messages or (int(args.rate * args.duration) if args.rate else 10_000_000)
+    sent_at = np.zeros(limit)
+    reader = ResultReader(
+        consumer, sent_at,
+        lambda msg: output_codecs.for_headers(msg.headers()).decode(msg.value()),
+    )
+    reader.start()
+
+    readings = csv_stream(args.csv) if args.source == 'csv' else synthetic_stream(args.machines, args.seed)
+    print(f'Replaying {args.source} readings at {args.rate:,.0f} msg/s '
+          f'({"up to " if not args.messages else ""}{limit:,} messages)...')
+
+    start = time.perf_counter()
+    deadline = start + (args.duration if not args.messages else float('inf'))
+    next_report = start + 1
+    sent = 0
+    while sent < limit and time.perf_counter() < deadline:
+        now = time.perf_counter()
+        due = limit if not args.rate else min(limit, int((now - start) * args.rate) + 1)
+        while sent < due:
+            reading = next(readings)
+            reading['replay_seq'] = sent
+            sent_at[sent] = time.perf_counter()
+            try:
+                producer.produce(topic_in, key=reading['machine_id'].encode('utf-8'),
+                                 value=input_codec.encode(reading))
+            except BufferError:
+                producer.poll(0.05)
+                continue
+            sent += 1
+            if sent % 1000 == 0:
+                producer.poll(0)
+        producer.poll(0)
+        if now >= next_report:
+            summarize(reader, sent, now - start, f'{now - start:5.0f}s')
+            next_report += 1
+        if args.rate and sent < limit:
+            time.sleep(min(0.005, max(0.0, start + sent / args.rate - time.perf_counter())))
+    send_elapsed = time.perf_counter() - start
+    producer.flush(10)
+
+    drain_deadline = time.perf_counter() + args.drain_timeout
+    while reader.received < sent and time.perf_counter() < drain_deadline:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    reader.stop()
+
+    print(f'\nSent {sent:,} in {send_elapsed:.1f}s ({sent / send_elapsed:,.0f} msg/s offered)')
+    summarize(reader, sent, elapsed, 'total')
+    print(f'alerts {reader.alerts:,}   missing {sent - reader.received:,}')
+
+    if service is not None:
+        service.running = False
+        with contextlib.redirect_stdout(io.StringIO()):
+            loop.join(timeout=10)
+        import asyncio
+        stats = asyncio.run(service.stats())
+        print(f'service batches {stats["batches"]}')
+        for stage, snapshot in stats['stage_seconds'].items():
+            if snapshot.get('count'):
+                print(f'  {stage:<10} {snapshot}')
+
+
+if __name__ == '__main__':
+    main()
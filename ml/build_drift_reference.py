@@ -0,0 +1,72 @@
+"""
+Write the ML service's drift reference from the training data.
+
+Bins each monitored signal (the raw sensors, machine type, temperature
+difference and power) at its quantiles in predictive_maintenance.csv and
+stores the edges and bin shares as drift_reference.json, which the drift
+monitor (alerion-backend/ml-service/app/drift.py, DRIFT_WINDOW > 0)
+compares live readings against. ml/train.py writes the same file with
+every artifact set; this script covers models trained elsewhere, such as
+the ML service's original model.
+
+USAGE (from the repo root):
+    python ml/build_drift_reference.py
+    python ml/build_drift_reference.py --bins 20 --out /models/current/drift_reference.json
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_SERVICE_DIR = os.path.join(ML_DIR, '..', 'alerion-backend', 'ml-service')
+sys.path.insert(0, os.path.join(ML_SERVICE_DIR, 'app'))
+
+from drift import DEFAULT_BINS, REFERENCE_FILE, DriftMonitor, DriftReference
+from features import RAW_COLUMNS, TYPE_MAP
+from hotreload import file_sha256
+
+
+def load_raw(path: str) -> np.ndarray:
+    """Raw feature matrix (features.py column order) of the CSV."""
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lstrip('﻿') for c in df.columns]
+    df['type_encoded'] = df['Type'].map(TYPE_MAP).fillna(TYPE_MAP['M'])
+    return df[list(RAW_COLUMNS)].to_numpy(np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=os.path.join(ML_DIR, 'predictive_maintenance.csv'))
+    parser.add_argument('--out', default=os.path.join(ML_SERVICE_DIR, 'model', REFERENCE_FILE))
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS,
+                        help='bins per continuous signal')
+    parser.add_argument('--seed', type=int, default=42, help='seed of the sanity-check sample')
+    args = parser.parse_args()
+
+    raw = load_raw(args.csv)
+    reference = DriftReference.from_raw(
+        raw, args.bins,
+        info={'data_path': os.path.relpath(args.csv, ML_DIR), 'data_sha256': file_sha256(args.csv)},
+    )
+
+    # Sanity check: a random half of the data, seen as live readings,
+    # should score as stable against the reference. (The CSV is in time
+    # order, so its second half alone already drifts in temperature.)
+    sample = raw[np.random.default_rng(args.seed).permutation(len(raw))[:len(raw) // 2]]
+    monitor = DriftMonitor(reference, window=len(sample) + 1, slices=1, min_readings=1)
+    monitor.observe(sample)
+
+    reference.save(args.out)
+    print(f'{len(raw):,} rows → {args.out}')
+    print(f'{"signal":<22} {"bins":>5} {"psi (sample)":>15} {"ks":>8}')
+    for name, score in monitor.scores()['signals'].items():
+        print(f'{name:<22} {len(reference.proportions[name]):>5} {score["psi"]:>15.5f} '
+              f'{score["ks"]:>8.5f}')
+
+
+if __name__ == '__main__':
+    main()
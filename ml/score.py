@@ -0,0 +1,234 @@
+"""
+Offline bulk scoring for CSV / Parquet files.
+
+Runs the same validation, feature engineering, scaling and inference as
+the Flask API (app.py) over files too large for an HTTP request. The input
+is read in fixed-size chunks and the chunks are fanned out to a process
+pool; workers are forked after the model is loaded, so they share the
+parent's model pages instead of each loading a copy.
+
+Input columns may use the predictive_maintenance.csv headers
+("Air temperature [K]", ...) or the API field names ("air_temperature", ...).
+Output has one row per input row, in input order:
+
+    row, machine_id, predicted_failure_type, is_failure, confidence,
+    prob_<class> for every class (percent), error
+
+USAGE (from the repo root):
+    python ml/score.py ml/predictive_maintenance.csv predictions.csv
+    python ml/score.py readings.parquet predictions.parquet --workers 8 --chunk-size 100000
+
+Parquet input/output requires pyarrow.
+"""
+
+import argparse
+import collections
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import app
+from streaming import CSV_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DEFAULT_CHUNK_SIZE = 50000
+
+# Chunks submitted ahead of the writer, per worker. Bounds memory to a few
+# chunks regardless of the input size.
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+FORMATS = ('csv', 'parquet')
+
+
+def detect_file_format(path: str, override: str | None = None) -> str:
+    if override:
+        return override
+    return 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def read_chunks(path: str, fmt: str, chunk_size: int):
+    """Yield the input as DataFrames of at most chunk_size rows."""
+    if fmt == 'parquet':
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError('Parquet input requires pyarrow (pip install pyarrow)')
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, encoding='utf-8-sig')
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path: str, fmt: str):
+        if fmt == 'parquet' and not PYARROW_AVAILABLE:
+            raise RuntimeError('Parquet output requires pyarrow (pip install pyarrow)')
+        self.path = path
+        self.fmt = fmt
+        self._parquet_writer = None
+        self._header_written = False
+
+    def write(self, frame: pd.DataFrame):
+        if self.fmt == 'parquet':
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a' if self._header_written else 'w',
+                         header=not self._header_written, index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        elif not self._header_written:
+            # Empty input still produces a file with the expected columns
+            empty_frame(0).to_csv(self.path, index=False)
+
+
+def empty_frame(n: int) -> pd.DataFrame:
+    """Output frame with every row unscored; columns have fixed dtypes so
+    each Parquet chunk carries the same schema."""
+    frame = pd.DataFrame({
+        'row':                    np.zeros(n, dtype=np.int64),
+        'machine_id':             pd.array([None] * n, dtype='string'),
+        'predicted_failure_type': pd.array([None] * n, dtype='string'),
+        'is_failure':             pd.array([None] * n, dtype='boolean'),
+        'confidence':             np.full(n, np.nan),
+    })
+    for cls in app.artifacts.current.label_encoder.classes_:
+        frame[f'prob_{cls}'] = np.full(n, np.nan)
+    frame['error'] = pd.array([None] * n, dtype='string')
+    return frame
+
+
+def score_frame(chunk: pd.DataFrame, start: int) -> pd.DataFrame:
+    """Validate and score one input chunk. `start` is its first row number."""
+    chunk = chunk.rename(columns=lambda c: CSV_COLUMNS.get(str(c).strip(), c))
+    n = len(chunk)
+    bundle = app.artifacts.current
+
+    raw = {field: chunk[field].to_numpy() for field in app.INPUT_RANGES if field in chunk}
+    machine_types = chunk['machine_type'].fillna('M').to_numpy() if 'machine_type' in chunk else ['M'] * n
+    columns, valid, errors = app.validate_columns(raw, machine_types)
+
+    out = empty_frame(n)
+    out['row'] = np.arange(start, start + n)
+    if 'machine_id' in chunk:
+        out['machine_id'] = chunk['machine_id'].astype('string').to_numpy()
+
+    valid_idx = np.flatnonzero(valid)
+    if len(valid_idx):
+        try:
+            pred_idx, prob = app.predict_columns({k: v[valid_idx] for k, v in columns.items()}, bundle)
+            predicted = bundle.label_encoder.classes_[pred_idx]
+            out.loc[valid_idx, 'predicted_failure_type'] = predicted
+            out.loc[valid_idx, 'is_failure'] = predicted != 'No Failure'
+            out.loc[valid_idx, 'confidence'] = (prob.max(axis=1) * 100).round(2)
+            for j, cls in enumerate(bundle.label_encoder.classes_):
+                out.loc[valid_idx, f'prob_{cls}'] = (prob[:, j] * 100).round(2)
+        except Exception as e:
+            out.loc[valid_idx, 'error'] = str(e)
+
+    if errors:
+        error_idx = list(errors)
+        out.loc[error_idx, 'error'] = ['; '.join(errors[i]) for i in error_idx]
+    return out
+
+
+def _init_worker():
+    # One process per core already; keep sklearn from also spawning a
+    # thread per core inside every worker
+    model = app.artifacts.current.model
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = 1
+
+
+def _pool_context():
+    # fork shares the already-loaded model copy-on-write; elsewhere each
+    # worker re-imports app.py and loads its own copy
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+
+def run(input_path: str, output_path: str, input_format: str, output_format: str,
+        chunk_size: int, workers: int) -> int:
+    """Score input_path into output_path; returns the number of rows scored."""
+    chunks = read_chunks(input_path, input_format, chunk_size)
+    writer = ChunkWriter(output_path, output_format)
+    total = 0
+
+    try:
+        if workers <= 1:
+            for chunk in chunks:
+                writer.write(score_frame(chunk, total))
+                total += len(chunk)
+            return total
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                                 initializer=_init_worker) as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.submit(score_frame, chunk, total))
+                total += len(chunk)
+                if len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                    writer.write(pending.popleft().result())
+            while pending:
+                writer.write(pending.popleft().result())
+        return total
+    finally:
+        writer.close()
+
+
+def peak_rss_mb(who: int) -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help='CSV or Parquet file of sensor readings')
+    parser.add_argument('output', help='CSV or Parquet file to write predictions to')
+    parser.add_argument('--input-format', choices=FORMATS, help='default: from the file extension')
+    parser.add_argument('--output-format', choices=FORMATS, help='default: from the file extension')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'rows per chunk (default {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='scoring processes (default: CPU count, 1 = no pool)')
+    args = parser.parse_args()
+
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be positive')
+
+    start = time.perf_counter()
+    total = run(
+        args.input, args.output,
+        detect_file_format(args.input, args.input_format),
+        detect_file_format(args.output, args.output_format),
+        args.chunk_size, args.workers,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"Scored {total:,} rows in {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else 0:,.0f} rows/s, {args.workers} worker(s))")
+    print(f"Peak RSS: {peak_rss_mb(resource.RUSAGE_SELF):.1f} MB (main), "
+          f"{peak_rss_mb(resource.RUSAGE_CHILDREN):.1f} MB (largest worker)")
+    print(f"Predictions written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,447 @@
+"""
+Train the failure-type classifier and write a complete artifact set.
+
+Scripted form of training_notebook.ipynb (same features, stratified
+split, SMOTE and candidate models) for unattended retrains:
+
+• every candidate × CV fold, plus each candidate's final fit, is one
+  task; tasks run in parallel across --jobs cores (joblib), each fitting
+  its model with the cores left over
+• the split, scaling and SMOTE resampling of the holdout split and of
+  every CV fold are cached in --cache-dir, keyed by a hash of the CSV and
+  the preprocessing parameters, so a re-run with other model settings
+  goes straight to fitting
+• --out receives model.pkl (the candidate with the best mean CV macro
+  F1), one <candidate>.pkl per candidate, scaler.pkl, label_encoder.pkl,
+  drift_reference.json (the training part's sensor distributions, for the
+  ML service's drift monitor) and metadata.json with the version, CV and
+  holdout metrics and the training parameters. metadata.json is moved in last, so a watcher
+  (MODEL_WATCH_INTERVAL_S) sees the new version only once the set is
+  complete
+
+Features are built by the serving pipeline (alerion-backend/ml-service/
+app/features.py), so training and both APIs compute identical inputs.
+Each fold is scaled and resampled from its own training part only; the
+holdout is never resampled.
+
+USAGE (from the repo root):
+    python ml/train.py
+    python ml/train.py --models random_forest --cv-folds 3 --jobs 4
+    python ml/train.py --out alerion-backend/ml-service/model      # served by the ML service
+    python ml/train.py --out /models --versioned                  # /models/<version>, current -> it
+
+Requires imbalanced-learn; the xgboost candidate is skipped without xgboost.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from imblearn import __version__ as imblearn_version
+from imblearn.over_sampling import SMOTE
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix, f1_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.utils.class_weight import compute_class_weight
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ML_DIR, '..', 'alerion-backend', 'ml-service', 'app'))
+
+from drift import REFERENCE_FILE, DriftReference
+from features import RAW_FIELDS, TYPE_MAP, FeaturePipeline
+from hotreload import file_sha256
+
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+FEATURE_COLS = [
+    'Air temperature [K]',
+    'Process temperature [K]',
+    'Rotational speed [rpm]',
+    'Torque [Nm]',
+    'Tool wear [min]',
+    'type_encoded',
+    'temp_diff',
+    'power_W',
+    'torque_x_wear',
+    'rpm_per_torque',
+]
+TARGET_COL = 'Failure Type'
+
+# CSV column of each raw pipeline field
+CSV_FIELDS = {
+    'air_temperature':     'Air temperature [K]',
+    'process_temperature': 'Process temperature [K]',
+    'rotational_speed':    'Rotational speed [rpm]',
+    'torque':              'Torque [Nm]',
+    'tool_wear':           'Tool wear [min]',
+}
+
+# Bump when the cached preprocessing output changes shape or meaning
+CACHE_FORMAT = 1
+
+METRICS = ('accuracy', 'macro_f1', 'weighted_f1')
+
+
+def build_random_forest(class_weight: dict, n_jobs: int, seed: int):
+    return RandomForestClassifier(
+        n_estimators=300,
+        max_depth=None,
+        min_samples_split=5,
+        min_samples_leaf=2,
+        class_weight=class_weight,
+        n_jobs=n_jobs,
+        random_state=seed,
+    )
+
+
+def build_xgboost(class_weight: dict, n_jobs: int, seed: int):
+    return xgb.XGBClassifier(
+        n_estimators=400,
+        max_depth=6,
+        learning_rate=0.05,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        objective='multi:softprob',
+        eval_metric='mlogloss',
+        n_jobs=n_jobs,
+        random_state=seed,
+    )
+
+
+# name → (metadata.json display name, builder, takes class_weight natively)
+CANDIDATES = {
+    'random_forest': ('Random Forest', build_random_forest, True),
+    'xgboost':       ('XGBoost', build_xgboost, False),
+}
+
+
+def load_dataset(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """Raw feature matrix (features.py column order) and the target labels."""
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lstrip('﻿') for c in df.columns]
+    raw = np.column_stack(
+        [df[CSV_FIELDS[field]].to_numpy(np.float64) for field in RAW_FIELDS]
+        + [df['Type'].map(TYPE_MAP).fillna(TYPE_MAP['M']).to_numpy(np.float64)]
+    )
+    return raw, df[TARGET_COL].astype(str).to_numpy()
+
+
+def fit_scaler(raw: np.ndarray) -> tuple[StandardScaler, FeaturePipeline]:
+    """Scaler fitted on the engineered features of `raw`, and the scaled pipeline."""
+    unscaled = FeaturePipeline(FEATURE_COLS).transform_raw(raw)
+    scaler = StandardScaler().fit(pd.DataFrame(unscaled, columns=FEATURE_COLS))
+    return scaler, FeaturePipeline.from_metadata({'feature_cols': FEATURE_COLS}, scaler)
+
+
+def prepare_split(raw_train, y_train, raw_val, y_val, smote_k: int, seed: int) -> dict:
+    """Scale a split by its training part and SMOTE-resample the training part."""
+    scaler, pipeline = fit_scaler(raw_train)
+    smote = SMOTE(sampling_strategy='not majority', k_neighbors=smote_k, random_state=seed)
+    X_res, y_res = smote.fit_resample(pipeline.transform_raw(raw_train), y_train)
+    return {
+        'X_train': X_res,
+        'y_train': y_res,
+        'X_val': pipeline.transform_raw(raw_val),
+        'y_val': y_val,
+        'scaler': scaler,
+        'resampled_from': len(y_train),
+    }
+
+
+def holdout_split(y, args) -> tuple[np.ndarray, np.ndarray]:
+    """Row indices of the holdout split's training and test parts."""
+    return train_test_split(
+        np.arange(len(y)), test_size=args.test_size, random_state=args.seed, stratify=y)
+
+
+def preprocess(raw, y, args, n_jobs: int) -> dict:
+    """Holdout split plus --cv-folds folds of its training part, each prepared."""
+    train_idx, test_idx = holdout_split(y, args)
+    splits = {'holdout': (train_idx, test_idx)}
+    if args.cv_folds > 1:
+        folds = StratifiedKFold(n_splits=args.cv_folds, shuffle=True, random_state=args.seed)
+        for k, (fold_train, fold_val) in enumerate(folds.split(train_idx, y[train_idx])):
+            splits[f'fold{k}'] = (train_idx[fold_train], train_idx[fold_val])
+
+    prepared = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(prepare_split)(
+            raw[tr], y[tr], raw[va], y[va], args.smote_k, args.seed)
+        for tr, va in splits.values()
+    )
+    return dict(zip(splits, prepared))
+
+
+def cache_key(data_sha256: str, args) -> str:
+    params = {
+        'format': CACHE_FORMAT,
+        'data': data_sha256,
+        'feature_cols': FEATURE_COLS,
+        'target': TARGET_COL,
+        'test_size': args.test_size,
+        'cv_folds': args.cv_folds,
+        'smote_k': args.smote_k,
+        'seed': args.seed,
+        'sklearn': sklearn.__version__,
+        'imblearn': imblearn_version,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_or_preprocess(raw, y, key: str, args, n_jobs: int) -> tuple[dict, bool]:
+    """Prepared splits from the cache, or computed and stored; (splits, cache hit)."""
+    path = os.path.join(args.cache_dir, f'{key}.joblib') if args.cache_dir else None
+    if path and os.path.exists(path):
+        return joblib.load(path), True
+
+    splits = preprocess(raw, y, args, n_jobs)
+    if path:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        tmp = f'{path}.tmp-{os.getpid()}'
+        joblib.dump(splits, tmp)
+        os.replace(tmp, path)
+    return splits, False
+
+
+def evaluate(y_true, y_pred, labels) -> dict:
+    return {
+        'accuracy': float(accuracy_score(y_true, y_pred)),
+        'macro_f1': float(f1_score(y_true, y_pred, average='macro', labels=labels, zero_division=0)),
+        'weighted_f1': float(f1_score(y_true, y_pred, average='weighted', labels=labels,
+                                      zero_division=0)),
+    }
+
+
+def fit_candidate(name: str, split: dict, n_classes: int, n_jobs: int, seed: int, keep: bool):
+    """
+    One task: fit a candidate on a prepared split and score its validation
+    part. Returns (model if keep else None, metrics, predictions, fit seconds).
+    """
+    _, build, native_weights = CANDIDATES[name]
+    X, y = split['X_train'], split['y_train']
+    classes = np.unique(y)
+    weights = dict(zip(classes, compute_class_weight('balanced', classes=classes, y=y)))
+
+    start = time.perf_counter()
+    model = build(weights if native_weights else None, n_jobs, seed)
+    if native_weights:
+        model.fit(X, y)
+    else:
+        model.fit(X, y, sample_weight=np.array([weights[label] for label in y]))
+    fit_s = time.perf_counter() - start
+
+    predictions = np.asarray(model.predict(split['X_val']), dtype=np.int64)
+    metrics = evaluate(split['y_val'], predictions, list(range(n_classes)))
+    return (model if keep else None), metrics, predictions, fit_s
+
+
+def summarize_cv(fold_metrics: list[dict]) -> dict:
+    return {
+        metric: {
+            'mean': round(float(np.mean([m[metric] for m in fold_metrics])), 4),
+            'std': round(float(np.std([m[metric] for m in fold_metrics])), 4),
+        }
+        for metric in METRICS
+    }
+
+
+def write_artifacts(out: str, versioned: bool, version: str, files: dict, metadata: dict) -> str:
+    """
+    Write the artifact set to a staging directory next to its destination
+    and move it in: as <out>/<version> with <out>/current repointed
+    (--versioned), or file by file into <out> with metadata.json last.
+    .json files are written as JSON, everything else with joblib.
+    """
+    os.makedirs(out, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.train-', dir=out)
+    os.chmod(staging, 0o755)
+    try:
+        for name, obj in files.items():
+            if name.endswith('.json'):
+                with open(os.path.join(staging, name), 'w') as f:
+                    json.dump(obj, f, indent=2)
+            else:
+                joblib.dump(obj, os.path.join(staging, name))
+        with open(os.path.join(staging, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+        if versioned:
+            target = os.path.join(out, version)
+            os.rename(staging, target)
+            link = os.path.join(out, f'.current-{os.getpid()}')
+            os.symlink(version, link)
+            os.replace(link, os.path.join(out, 'current'))
+            return target
+
+        for name in [*files, 'metadata.json']:
+            os.replace(os.path.join(staging, name), os.path.join(out, name))
+        return out
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=os.path.join(ML_DIR, 'predictive_maintenance.csv'))
+    parser.add_argument('--out', default=os.path.join(ML_DIR, 'model_artifacts'))
+    parser.add_argument('--versioned', action='store_true',
+                        help='write to <out>/<version> and point <out>/current at it')
+    parser.add_argument('--version', help='artifact version (default: UTC timestamp)')
+    parser.add_argument('--models', default=','.join(CANDIDATES),
+                        help=f'comma-separated candidates ({", ".join(CANDIDATES)})')
+    parser.add_argument('--cv-folds', type=int, default=5, help='0 or 1 disables CV')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--smote-k', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jobs', type=int, default=-1, help='parallel tasks (default: all cores)')
+    parser.add_argument('--cache-dir', default=os.path.join(ML_DIR, '.cache'),
+                        help="preprocessing cache ('' disables it)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.models.split(',') if name.strip()]
+    unknown = [name for name in names if name not in CANDIDATES]
+    if unknown:
+        sys.exit(f'Unknown candidates: {", ".join(unknown)} (choose from {", ".join(CANDIDATES)})')
+    if 'xgboost' in names and not XGBOOST_AVAILABLE:
+        print('⚠️  xgboost not installed — skipping the xgboost candidate')
+        names.remove('xgboost')
+    if not names:
+        sys.exit('No candidates to train')
+
+    started = time.perf_counter()
+    cores = joblib.cpu_count()
+    n_jobs = cores if args.jobs < 1 else min(args.jobs, cores)
+    version = args.version or datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+
+    raw, labels = load_dataset(args.csv)
+    encoder = LabelEncoder()
+    y = encoder.fit_transform(labels)
+    n_classes = len(encoder.classes_)
+    data_sha256 = file_sha256(args.csv)
+    key = cache_key(data_sha256, args)
+
+    stage = time.perf_counter()
+    splits, cache_hit = load_or_preprocess(raw, y, key, args, n_jobs)
+    preprocess_s = time.perf_counter() - stage
+    holdout = splits['holdout']
+    folds = [name for name in splits if name != 'holdout']
+    print(f'Data: {len(y):,} rows, {n_classes} classes, sha256 {data_sha256[:12]}')
+    print(f'Preprocessing: {"cache hit" if cache_hit else "computed"} ({key}) in {preprocess_s:.1f}s — '
+          f'holdout {holdout["resampled_from"]:,} → {len(holdout["y_train"]):,} rows after SMOTE, '
+          f'{len(folds)} CV folds')
+
+    # Final fits and CV fits as one pool of single-model tasks
+    tasks = [(name, split, split == 'holdout') for name in names for split in ['holdout', *folds]]
+    inner_jobs = max(1, n_jobs // len(tasks))
+    print(f'Fitting {len(tasks)} models ({len(names)} candidates × {len(folds) + 1} splits) '
+          f'on {n_jobs} workers × {inner_jobs} threads ...')
+    stage = time.perf_counter()
+    results = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(fit_candidate)(name, splits[split], n_classes, inner_jobs, args.seed, keep)
+        for name, split, keep in tasks
+    )
+    fit_s = time.perf_counter() - stage
+
+    models, holdout_metrics, cv_metrics, predictions, fit_seconds = {}, {}, {}, {}, {}
+    for (name, split, keep), (model, metrics, predicted, seconds) in zip(tasks, results):
+        if keep:
+            models[name] = model
+            holdout_metrics[name] = metrics
+            predictions[name] = predicted
+            fit_seconds[name] = round(seconds, 2)
+        else:
+            cv_metrics.setdefault(name, []).append(metrics)
+    cv_summary = {name: summarize_cv(m) for name, m in cv_metrics.items()}
+
+    # Best by mean CV macro F1 (holdout macro F1 without CV); the holdout
+    # metrics stay an unbiased report of the chosen model
+    selected_by = 'cv_macro_f1' if cv_summary else 'holdout_macro_f1'
+    best = max(names, key=lambda name: (
+        cv_summary[name]['macro_f1']['mean'] if cv_summary else holdout_metrics[name]['macro_f1']))
+
+    print(f'\n{"candidate":<15} {"cv macro F1":>14} {"holdout acc":>12} {"macro F1":>9} '
+          f'{"weighted F1":>12} {"fit":>7}')
+    for name in names:
+        cv = cv_summary.get(name, {}).get('macro_f1')
+        cv_text = f'{cv["mean"]:.4f}±{cv["std"]:.4f}' if cv else '—'
+        m = holdout_metrics[name]
+        marker = '  ← model.pkl' if name == best else ''
+        print(f'{name:<15} {cv_text:>14} {m["accuracy"]:>12.4f} {m["macro_f1"]:>9.4f} '
+              f'{m["weighted_f1"]:>12.4f} {fit_seconds[name]:>6.1f}s{marker}')
+
+    best_predictions = predictions[best]
+    metadata = {
+        'version': version,
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'feature_cols': FEATURE_COLS,
+        'target_col': TARGET_COL,
+        'classes': encoder.classes_.tolist(),
+        'class_mapping': {str(i): c for i, c in enumerate(encoder.classes_)},
+        'best_model': CANDIDATES[best][0],
+        'selected_by': selected_by,
+        'model_metrics': {
+            CANDIDATES[name][0]: {k: round(v, 4) for k, v in holdout_metrics[name].items()}
+            for name in names
+        },
+        'cv_metrics': {CANDIDATES[name][0]: summary for name, summary in cv_summary.items()},
+        'holdout': {
+            'rows': int(len(holdout['y_val'])),
+            'per_class_f1': dict(zip(encoder.classes_.tolist(), np.round(f1_score(
+                holdout['y_val'], best_predictions, average=None,
+                labels=list(range(n_classes)), zero_division=0), 4).tolist())),
+            'confusion_matrix': confusion_matrix(
+                holdout['y_val'], best_predictions, labels=list(range(n_classes))).tolist(),
+        },
+        'candidates': {CANDIDATES[name][0]: f'{name}.pkl' for name in names},
+        'training': {
+            'data_path': os.path.relpath(args.csv, ML_DIR),
+            'data_sha256': data_sha256,
+            'rows': int(len(y)),
+            'train_rows': int(holdout['resampled_from']),
+            'train_rows_resampled': int(len(holdout['y_train'])),
+            'test_size': args.test_size,
+            'cv_folds': len(folds),
+            'smote': {'sampling_strategy': 'not majority', 'k_neighbors': args.smote_k},
+            'seed': args.seed,
+            'preprocess_cache_key': key,
+            'fit_seconds': fit_seconds,
+            'total_seconds': round(time.perf_counter() - started, 1),
+            'library_versions': {
+                'scikit-learn': sklearn.__version__,
+                'imbalanced-learn': imblearn_version,
+                **({'xgboost': xgb.__version__} if XGBOOST_AVAILABLE else {}),
+            },
+        },
+    }
+
+    files = {
+        'model.pkl': models[best],
+        **{f'{name}.pkl': models[name] for name in names},
+        'scaler.pkl': holdout['scaler'],
+        'label_encoder.pkl': encoder,
+        REFERENCE_FILE: DriftReference.from_raw(
+            raw[holdout_split(y, args)[0]],
+            info={'version': version, 'data_sha256': data_sha256},
+        ).to_dict(),
+    }
+    target = write_artifacts(args.out, args.versioned, version, files, metadata)
+    print(f'\nVersion {version}: {CANDIDATES[best][0]} written to {target} '
+          f'(fitting {fit_s:.1f}s, total {time.perf_counter() - started:.1f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Derive and evaluate the ML service's cascade gate.
+
+Splits predictive_maintenance.csv into a training part and a stratified
+holdout, derives the healthy-box gate (alerion-backend/ml-service/app/
+cascade.py) from the training part for each target failure rate, and
+scores the holdout both ways with the ML service model:
+
+    skip       share of holdout readings the gate answers without the model
+    disagree   share of holdout readings where the cascade's label differs
+               from full-model scoring (gated readings the model flags)
+    missed     labelled failures (Target = 1) inside the gate
+    speedup    full-model time / cascade time on the holdout
+
+Pass --out to write the gate for --target, then enable it with
+CASCADE_MODE=on (the file must sit next to the model as cascade.json).
+
+USAGE (from the repo root, with alerion-backend/ml-service/model/model.pkl present):
+    python ml/tune_cascade.py
+    python ml/tune_cascade.py --target 0.002 --out alerion-backend/ml-service/model/cascade.json
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_SERVICE_DIR = os.path.join(ML_DIR, '..', 'alerion-backend', 'ml-service')
+sys.path.insert(0, os.path.join(ML_SERVICE_DIR, 'app'))
+
+from cascade import CascadeGate, gate_signals
+from predictor import ModelPredictor
+
+DEFAULT_TARGETS = (0.01, 0.005, 0.002, 0.001)
+TYPE_MAP = {'L': 0, 'M': 1, 'H': 2}
+
+
+def load_dataset(path: str) -> tuple[np.ndarray, np.ndarray]:
+    """Feature matrix in ModelPredictor column order, and the Target labels."""
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lstrip('﻿') for c in df.columns]
+    features = np.column_stack([
+        df['Air temperature [K]'],
+        df['Process temperature [K]'],
+        df['Rotational speed [rpm]'],
+        df['Torque [Nm]'],
+        df['Tool wear [min]'],
+        df['Type'].map(TYPE_MAP).fillna(1),
+    ]).astype(np.float64)
+    return features, df['Target'].to_numpy() == 1
+
+
+def signals_of(features: np.ndarray) -> np.ndarray:
+    return gate_signals(*(features[:, j] for j in range(5)))
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=os.path.join(ML_DIR, 'predictive_maintenance.csv'))
+    parser.add_argument('--model', default=os.getenv(
+        'MODEL_PATH', os.path.join(ML_SERVICE_DIR, 'model', 'model.pkl')))
+    parser.add_argument('--holdout', type=float, default=0.2, help='holdout share (default 0.2)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--targets', default=','.join(map(str, DEFAULT_TARGETS)),
+                        help='comma-separated target in-box failure rates to compare')
+    parser.add_argument('--min-coverage', type=float, default=0.3)
+    parser.add_argument('--target', type=float, default=0.002, help='gate written by --out')
+    parser.add_argument('--out', help='write the --target gate to this JSON file')
+    args = parser.parse_args()
+
+    features, labels = load_dataset(args.csv)
+    train_x, test_x, train_y, test_y = train_test_split(
+        features, labels, test_size=args.holdout, random_state=args.seed, stratify=labels)
+
+    predictor = ModelPredictor(args.model)
+    if not predictor.model_loaded:
+        sys.exit(f'Model not loaded from {args.model}')
+    state = predictor.swap.current
+
+    full = predictor.predict_array(test_x, state)['prediction']
+    full_s = best_of(lambda: predictor.predict_array(test_x, state))
+    print(f'\nHoldout: {len(test_x):,} readings, {int(test_y.sum())} labelled failures, '
+          f'model flags {int(full.sum())}, full scoring {full_s * 1e3:.1f} ms\n')
+
+    targets = sorted({float(t) for t in args.targets.split(',')} | {args.target}, reverse=True)
+    print(f'{"target":>8} {"skip":>7} {"disagree":>9} {"missed":>7} {"speedup":>8}   gate limits')
+    chosen = None
+    train_signals, test_signals = signals_of(train_x), signals_of(test_x)
+    for target in targets:
+        gate = CascadeGate.derive(train_signals, train_y, target, args.min_coverage)
+        gated = gate.passes(test_signals)
+        cascade = np.where(gated, 0, full)
+        ambiguous = test_x[~gated]
+
+        def run_cascade():
+            gate.passes(signals_of(test_x))
+            if len(ambiguous):
+                predictor.predict_array(ambiguous, state)
+
+        cascade_s = best_of(run_cascade)
+        limits = ', '.join(
+            f'{name} {lo:.4g}..{hi:.4g}' for name, (lo, hi) in gate.describe()['limits'].items())
+        print(f'{target:>8} {gated.mean():>7.1%} {np.mean(cascade != full):>9.3%} '
+              f'{int((gated & test_y).sum()):>7} {full_s / cascade_s:>7.1f}x   {limits}')
+        if target == args.target:
+            chosen = gate
+            chosen.info['holdout'] = {
+                'rows': int(len(test_x)),
+                'skip_rate': round(float(gated.mean()), 4),
+                'disagreement': round(float(np.mean(cascade != full)), 5),
+                'missed_failures': int((gated & test_y).sum()),
+            }
+
+    if args.out:
+        chosen.save(args.out)
+        print(f'\nGate for target {args.target} written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()